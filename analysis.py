@@ -1,38 +1,485 @@
-#!/usr/bin/env python
-
-''' analysis.py - analyzes results of a break_detector run '''
-
-import os.path
-
-class Analysis(object):
-    '''Reads and analyzes the results of a break_detector run'''
-    def __init__(self, simresults, threshold=0.1):
-        self.results_fn = simresults
-        self.threshold = threshold
-        self.resistances = {}
-
-    def check_obvious_collisions(self):
-        '''Checks for obvious collisions in the simulation results:
-        a single resistance reading caused by more than one combination
-        of sensor failures
-        '''
-        if os.path.exists(self.results_fn):
-            collisions = {}
-            with open(self.results_fn,'rb') as results:
-                for line in results:
-                    if not line.startswith('#'):
-                        elements = line.strip().split(',')
-                        resistance_reading = elements[1]
-                        failures = sorted(elements[2:])
-                        # Checks for collisions in the data -
-                        # a single resistance reading caused by
-                        # more than one combination of failed
-                        # sensors
-                        if not resistance_reading in self.resistances:
-                            self.resistances[resistance_reading] = failures
-                        else:
-                            if self.resistances[resistance_reading] != failures:
-                                collisions[resistance_reading] = (self.resistances[resistance_reading], failures)
-            return collisions
-        else:
-            raise IOError("File not found")
\ No newline at end of file
+#!/usr/bin/env python
+
+''' analysis.py - analyzes results of a break_detector run '''
+
+import json
+import math
+import os.path
+
+# Default number of blocks in a row without anything new before Convergence stops a run
+PATIENCE = 5
+# Default fraction of its reading a band must widen by to count as growth
+BAND_GROWTH = 1e-3
+
+def unique_pairs(resistances, combinations):
+    '''Returns the distinct (resistance, combination) pairs of the two arrays as a tuple
+    of arrays, sorted by resistance and then combination'''
+    import numpy as np
+    order = np.lexsort((combinations, resistances))
+    resistances = resistances[order]
+    combinations = combinations[order]
+    keep = np.ones(len(resistances), dtype=bool)
+    keep[1:] = (resistances[1:] != resistances[:-1]) | (combinations[1:] != combinations[:-1])
+    return resistances[keep], combinations[keep]
+
+def subset_conductances(strand_resistances):
+    '''Returns the conductance of every subset of intact strands:  element k along the
+    last axis is the subset with bit i of k set for each intact strand i.  The last axis
+    of strand_resistances holds the strands, so several networks can be computed at once.
+    Built up one strand (one bit of the subset's index) at a time.'''
+    import numpy as np
+    conductances = np.zeros(strand_resistances.shape[:-1] + (1,))
+    for strand in range(strand_resistances.shape[-1]):
+        strand_conductance = 1. / strand_resistances[..., strand:strand + 1]
+        conductances = np.concatenate([conductances, conductances + strand_conductance], axis=-1)
+    return conductances
+
+def resistance_bands(strand_minimum, strand_maximum):
+    '''Returns a tuple (minimum, maximum) of the network resistance of every subset of intact
+    strands (see subset_conductances()), given the limits of each strand's resistance'''
+    import numpy as np
+    with np.errstate(divide='ignore'):
+        minimum = 1. / subset_conductances(strand_minimum)
+        maximum = 1. / subset_conductances(strand_maximum)
+    return minimum, maximum
+
+def band_separation(minimum, maximum):
+    '''Returns the smallest relative gap between neighbouring resistance bands:  the
+    distance from the highest maximum so far to the next band's minimum, as a fraction
+    of that maximum.  Negative if any bands overlap.  Works along the last axis, so
+    several networks can be scored at once.'''
+    import numpy as np
+    order = np.argsort(minimum, axis=-1, kind='mergesort')
+    minimum = np.take_along_axis(minimum, order, axis=-1)
+    highest = np.maximum.accumulate(np.take_along_axis(maximum, order, axis=-1), axis=-1)
+    with np.errstate(invalid='ignore'):
+        gaps = minimum[..., 1:] / highest[..., :-1] - 1.
+    return np.nanmin(gaps, axis=-1)
+
+class NetworkBands(object):
+    '''Analytic check of a network design without Monte Carlo (requires NumPy).
+    For every combination of failed sensors, computes the band of network
+    resistances it can produce given the resistor and wire tolerances.  Since the
+    parallel resistance only increases with each strand's resistance, the band runs
+    from the network of minimum strand resistances to the one of maximum strand
+    resistances.
+
+    failures - bitmask of the failed sensors of each band (bit i is sensor i)
+    minimum, maximum - the limits of each band in ohms
+    '''
+    def __init__(self, part_configurations):
+        import numpy as np
+        from components import batchsim
+        from components import wire
+        parameters = batchsim.NetworkParameters(part_configurations)
+        self.names = parameters.names
+        strand_minimum = (parameters.resistance * (1 - parameters.tolerance) +
+            parameters.wire_resistance * (1 - wire.Wire.tolerance))
+        strand_maximum = (parameters.resistance * (1 + parameters.tolerance) +
+            parameters.wire_resistance * (1 + wire.Wire.tolerance))
+        num_sensors = len(self.names)
+        intact = np.arange(1 << num_sensors, dtype=np.uint64)
+        self.failures = np.uint64((1 << num_sensors) - 1) ^ intact
+        self.minimum, self.maximum = resistance_bands(strand_minimum, strand_maximum)
+
+    def failure_names(self, band):
+        '''Returns the sorted names of the failed sensors of band number band'''
+        mask = int(self.failures[band])
+        return sorted([name for idx, name in enumerate(self.names) if mask & (1 << idx)])
+
+    def overlaps(self):
+        '''Returns a list of (lower band, overlapping band) index pairs.  Bands are swept
+        in order of their minimum; a band overlaps a lower one if it starts below the
+        highest maximum seen so far, and is paired with the band reaching that maximum.'''
+        import numpy as np
+        order = np.argsort(self.minimum, kind='mergesort')
+        minimum = self.minimum[order]
+        maximum = self.maximum[order]
+        highest = np.maximum.accumulate(maximum)
+        highest_band = np.maximum.accumulate(np.where(maximum >= highest,
+            np.arange(len(maximum)), 0))
+        overlapping = np.nonzero(minimum[1:] <= highest[:-1])[0] + 1
+        return list(zip(order[highest_band[overlapping - 1]].tolist(), order[overlapping].tolist()))
+
+    def separation(self):
+        '''Returns the smallest relative gap between bands (negative if any overlap)'''
+        return float(band_separation(self.minimum, self.maximum))
+
+class Convergence(object):
+    '''Decides when a run has seen enough simulations, for adaptive runs fed to a
+    StreamingAnalysis a block at a time.  A run has converged once either
+
+    - patience blocks in a row have turned up no new combination of failed sensors
+      and widened no combination's band of readings by more than band_growth (as a
+      fraction of the reading), or
+    - the estimated chance that the next reading comes from a combination not seen
+      yet (combinations seen only once / readings, the Good-Turing estimate) is
+      below 1 - confidence, if confidence is given.
+
+    bands - {combination of failed sensors:[lowest reading, highest reading]}
+    '''
+    def __init__(self, patience=PATIENCE, confidence=None, band_growth=BAND_GROWTH):
+        self.patience = patience
+        self.confidence = confidence
+        self.band_growth = band_growth
+        self.bands = {}
+        self.changed = False
+        self.stale_blocks = 0
+        self.num_blocks = 0
+        self.converged = False
+
+    def add_reading(self, resistance, failures):
+        '''Adds a new reading (in ohms) caused by the tuple failures of failed sensors'''
+        band = self.bands.get(failures)
+        if band is None:
+            self.bands[failures] = [resistance, resistance]
+            self.changed = True
+        elif resistance < band[0]:
+            if resistance < band[0] * (1 - self.band_growth):
+                self.changed = True
+            band[0] = resistance
+        elif resistance > band[1]:
+            if resistance > band[1] * (1 + self.band_growth):
+                self.changed = True
+            band[1] = resistance
+
+    def unseen_probability(self, counts, num_readings):
+        '''Returns the estimated probability that the next reading comes from a
+        combination not seen yet, given the number of readings of each combination'''
+        if num_readings == 0:
+            return 1.
+        return len([count for count in counts.values() if count == 1]) / float(num_readings)
+
+    def end_block(self, counts, num_readings):
+        '''Records the end of a block of simulations (counts and num_readings are as
+        in StreamingAnalysis).  Returns True once the run has converged.'''
+        self.num_blocks += 1
+        if self.changed:
+            self.stale_blocks = 0
+        else:
+            self.stale_blocks += 1
+        self.changed = False
+        if self.stale_blocks >= self.patience:
+            self.converged = True
+        elif self.confidence is not None and num_readings > 0:
+            self.converged = self.unseen_probability(counts, num_readings) < 1 - self.confidence
+        return self.converged
+
+class StreamingAnalysis(object):
+    '''Analyzes results as they are produced, rather than reading back a results
+    file:  feed it text lines (see sensornetwork.gen_line) or binary records.
+
+    resistances - the first combination of failed sensors seen for each reading
+    obvious_collisions - {reading:(first combination, colliding combination)}, as
+        returned by Analysis.check_obvious_collisions()
+    collisions - {(lower combination, upper combination):(lower reading, upper reading)}
+        for each pair of combinations of failed sensors with readings within threshold
+        (a fraction of the lower reading) of each other
+    counts - number of readings seen of each combination of failed sensors
+    pairs - number of readings seen of each distinct (reading, combination) pair;
+        saved by save_index() so the analyses of shards can be merged
+
+    Readings are bucketed by log(reading) / log(1 + threshold), so a reading can only
+    collide with readings in its own or the neighbouring buckets; each bucket keeps
+    the lowest and highest reading of every combination it holds.
+
+    The run feeding the analysis stops early if stop_on_collision is True and a
+    collision is found, or once convergence (a Convergence, if not None) decides
+    enough simulations have run; the run calls end_block() after each block.
+    '''
+    def __init__(self, threshold=0.1, stop_on_collision=False, convergence=None):
+        self.threshold = threshold
+        self.stop_on_collision = stop_on_collision
+        self.convergence = convergence
+        self.resistances = {}
+        self.obvious_collisions = {}
+        self.collisions = {}
+        self.counts = {}
+        self.pairs = {}
+        self.buckets = {}
+        self.num_readings = 0
+
+    def add_reading(self, resistance_reading, failures, count=1):
+        '''Adds count readings (a string, as written in the results) caused by the
+        sorted tuple failures of failed sensors'''
+        self.num_readings += count
+        self.counts[failures] = self.counts.get(failures, 0) + count
+        pair = (resistance_reading, failures)
+        if pair in self.pairs:
+            # Already indexed
+            self.pairs[pair] += count
+            return
+        self.pairs[pair] = count
+        first_failures = self.resistances.get(resistance_reading)
+        if first_failures is None:
+            self.resistances[resistance_reading] = list(failures)
+        else:
+            self.obvious_collisions[resistance_reading] = (first_failures, list(failures))
+        resistance = float(resistance_reading)
+        if self.convergence is not None:
+            self.convergence.add_reading(resistance, failures)
+        if self.threshold > 0:
+            self.index_reading(resistance, failures)
+
+    def index_reading(self, resistance, failures):
+        '''Checks resistance against the neighbouring readings of other combinations
+        of failed sensors and adds it to its bucket'''
+        if not 0 < resistance < float('inf'):
+            return
+        bucket = int(math.floor(math.log(resistance) / math.log(1 + self.threshold)))
+        for neighbour in (bucket - 1, bucket, bucket + 1):
+            for other_failures, (lowest, highest) in self.buckets.get(neighbour, {}).items():
+                if other_failures == failures:
+                    continue
+                if lowest >= resistance:
+                    if lowest <= resistance * (1 + self.threshold):
+                        self.add_collision((failures, resistance), (other_failures, lowest))
+                elif highest <= resistance:
+                    if resistance <= highest * (1 + self.threshold):
+                        self.add_collision((other_failures, highest), (failures, resistance))
+                else:
+                    # Readings on both sides in this bucket, so within threshold
+                    self.add_collision((other_failures, lowest), (failures, resistance))
+        limits = self.buckets.setdefault(bucket, {}).get(failures)
+        if limits is None:
+            self.buckets[bucket][failures] = (resistance, resistance)
+        else:
+            self.buckets[bucket][failures] = (min(limits[0], resistance), max(limits[1], resistance))
+
+    def add_collision(self, lower, upper):
+        '''Records a collision between the (failures, reading) pairs lower and upper'''
+        key = (lower[0], upper[0])
+        if key not in self.collisions and (upper[0], lower[0]) not in self.collisions:
+            self.collisions[key] = (lower[1], upper[1])
+
+    def add_lines(self, lines):
+        '''Adds the readings in lines of text results'''
+        for line in lines:
+            if not line.startswith('#'):
+                elements = line.strip().split(',')
+                if len(elements) > 1:
+                    self.add_reading(elements[1], tuple(sorted(name for name in elements[2:] if name)))
+
+    def add_records(self, records, names):
+        '''Adds the readings in an array of resultsfile.RECORD_DTYPE records, given
+        the names of the sensors'''
+        from components import sensormasks
+        combinations = {}
+        for resistance, mask in zip(records['resistance'].tolist(), records['failures'].tolist()):
+            failures = combinations.get(mask)
+            if failures is None:
+                failures = combinations[mask] = tuple(sensormasks.failure_names(mask, names))
+            self.add_reading(str(resistance), failures)
+
+    def add_histogram(self, histogram, names):
+        '''Adds the readings counted in a histogram.Histogram, given the names of the
+        sensors.  Only the lowest and highest reading of each bin are known, which is
+        enough to find collisions within threshold as long as the bins are narrower
+        than threshold; obvious collisions are only found between those readings.'''
+        from components import sensormasks
+        combinations = {}
+        for (mask, bin_number), (count, lowest, highest) in histogram.bins.items():
+            failures = combinations.get(mask)
+            if failures is None:
+                failures = combinations[mask] = tuple(sensormasks.failure_names(mask, names))
+            if highest == lowest:
+                self.add_reading(str(lowest), failures, count)
+            else:
+                self.add_reading(str(lowest), failures, count - 1)
+                self.add_reading(str(highest), failures, 1)
+
+    def save_index(self, fname, shard=None):
+        '''Saves the distinct (reading, combination) pairs and their counts to fname
+        as JSON, along with the description of the shard analyzed (if any)'''
+        index = {'shard':shard, 'num_readings':self.num_readings,
+            'pairs':[[resistance_reading, list(failures), count]
+                for (resistance_reading, failures), count in self.pairs.items()]}
+        with open(fname, 'w') as fidout:
+            json.dump(index, fidout)
+
+    def found_collisions(self):
+        '''Returns True if any collision (obvious or within tolerance) has been seen'''
+        return len(self.obvious_collisions) > 0 or len(self.collisions) > 0
+
+    def stops_early(self):
+        '''Returns True if the run feeding this analysis may stop early'''
+        return self.stop_on_collision or self.convergence is not None
+
+    def end_block(self):
+        '''Called by the run feeding this analysis after each block of simulations'''
+        if self.convergence is not None:
+            self.convergence.end_block(self.counts, self.num_readings)
+
+    def converged(self):
+        '''Returns True if the run has converged (see Convergence)'''
+        return self.convergence is not None and self.convergence.converged
+
+    def should_stop(self):
+        '''Returns True if the run feeding this analysis can stop early'''
+        return (self.stop_on_collision and self.found_collisions()) or self.converged()
+
+def merge_indexes(fnames, threshold=0.1):
+    '''Returns the StreamingAnalysis of all the readings in the indexes fnames (see
+    StreamingAnalysis.save_index()).  The work done is proportional to the number of
+    distinct readings in the indexes rather than the number of readings simulated.
+    If the indexes are of shards, checks they are every shard of one run.'''
+    analyzer = StreamingAnalysis(threshold)
+    descriptions = []
+    for fname in fnames:
+        with open(fname, 'r') as fidin:
+            index = json.load(fidin)
+        if index.get('shard') is not None:
+            descriptions.append(index['shard'])
+        for resistance_reading, failures, count in index['pairs']:
+            analyzer.add_reading(str(resistance_reading), tuple(str(name) for name in failures), count)
+    if len(descriptions) > 0:
+        from components import shards
+        if len(descriptions) != len(fnames):
+            raise ValueError("Indexes of shards can't be merged with other indexes")
+        shards.check_shards(descriptions)
+    return analyzer
+
+class Analysis(object):
+    '''Reads and analyzes the results of a break_detector run, either
+    ASCII delimited text, the binary format in components.resultsfile or a
+    components.histogram file (binary and histogram results require NumPy)'''
+    def __init__(self, simresults, threshold=0.1):
+        self.results_fn = simresults
+        self.threshold = threshold
+        self.resistances = {}
+
+    def is_binary(self):
+        '''Returns True if the results are a components.resultsfile binary file;
+        anything else is read as text, with or without a header'''
+        try:
+            from components import resultsfile
+        except ImportError:
+            # Without NumPy only text results can be read
+            return False
+        return resultsfile.is_results_file(self.results_fn)
+
+    def is_histogram(self):
+        '''Returns True if the results are a histogram file'''
+        from components import histogram
+        return histogram.is_histogram_file(self.results_fn)
+
+    def check_obvious_collisions(self):
+        '''Checks for obvious collisions in the simulation results:
+        a single resistance reading caused by more than one combination
+        of sensor failures
+        '''
+        if os.path.exists(self.results_fn):
+            if self.is_binary() or self.is_histogram():
+                return self.find_collisions(0.)
+            collisions = {}
+            with open(self.results_fn,'rb') as results:
+                for line in results:
+                    if not line.startswith('#'):
+                        elements = line.strip().split(',')
+                        resistance_reading = elements[1]
+                        failures = sorted(elements[2:])
+                        # Checks for collisions in the data -
+                        # a single resistance reading caused by
+                        # more than one combination of failed
+                        # sensors
+                        if not resistance_reading in self.resistances:
+                            self.resistances[resistance_reading] = failures
+                        else:
+                            if self.resistances[resistance_reading] != failures:
+                                collisions[resistance_reading] = (self.resistances[resistance_reading], failures)
+            return collisions
+        else:
+            raise IOError("File not found")
+
+    def check_collisions(self):
+        '''Checks for collisions within the tolerance:  two readings at most
+        threshold * (the lower reading) apart, caused by different combinations
+        of sensor failures.  Returns a dict keyed by the lower reading of the
+        combinations of failed sensors (requires NumPy).
+        '''
+        if not os.path.exists(self.results_fn):
+            raise IOError("File not found")
+        return self.find_collisions(self.threshold)
+
+    def find_collisions(self, threshold):
+        '''Returns the collisions within relative tolerance threshold as a dict
+        {reading:(combination of failed sensors, colliding combination)}.
+
+        The distinct (reading, combination) pairs are sorted by reading, so the
+        closest higher reading from a different combination is the first pair after
+        the current run of pairs with the same combination; the check is
+        O(n log n) in the number of distinct pairs.'''
+        import numpy as np
+        resistances, combinations, combination_names = self.distinct_readings()
+        num_readings = len(resistances)
+        collisions = {}
+        if num_readings < 2:
+            return collisions
+        run_ends = np.append(np.nonzero(combinations[1:] != combinations[:-1])[0], num_readings - 1)
+        next_different = run_ends[np.searchsorted(run_ends, np.arange(num_readings))] + 1
+        has_next = next_different < num_readings
+        lower = np.nonzero(has_next)[0]
+        upper = next_different[has_next]
+        colliding = resistances[upper] <= resistances[lower] * (1 + threshold)
+        lower = lower[colliding]
+        upper = upper[colliding]
+        for resistance, lower_combination, upper_combination in zip(resistances[lower].tolist(),
+            combinations[lower].tolist(), combinations[upper].tolist()):
+            resistance_reading = str(resistance)
+            if resistance_reading not in collisions:
+                collisions[resistance_reading] = (combination_names[lower_combination],
+                    combination_names[upper_combination])
+        return collisions
+
+    def distinct_readings(self):
+        '''Returns a tuple (resistances, combinations, combination_names) of the distinct
+        (reading, combination of failed sensors) pairs in the results, sorted by reading
+        and then combination.  resistances and combinations are arrays; combination_names maps each combination to its
+        sorted list of failed sensors.
+
+        Binary results are memory-mapped and reduced a chunk at a time, so the whole
+        file is never loaded at once.  For histograms, the lowest and highest reading
+        of each bin are used.'''
+        import numpy as np
+        if self.is_histogram():
+            from components import histogram
+            from components import sensormasks
+            results_histogram, names = histogram.read_histogram(self.results_fn)
+            bins = list(results_histogram.bins.items())
+            masks = np.array([mask for (mask, bin_number), counts in bins] * 2, dtype=np.uint64)
+            resistances = np.array([counts[1] for key, counts in bins] +
+                [counts[2] for key, counts in bins], dtype=float)
+            resistances, masks = unique_pairs(resistances, masks)
+            combination_names = dict((mask, sensormasks.failure_names(mask, names))
+                for mask in np.unique(masks).tolist())
+            return resistances, masks, combination_names
+        if self.is_binary():
+            from components import resultsfile
+            from components import sensormasks
+            header, records = resultsfile.read_results(self.results_fn)
+            chunk_resistances = [np.zeros(0)]
+            chunk_failures = [np.zeros(0, dtype=np.uint64)]
+            for chunk in resultsfile.gen_chunks(records):
+                resistances, failures = unique_pairs(chunk['resistance'], chunk['failures'])
+                chunk_resistances.append(resistances)
+                chunk_failures.append(failures)
+            resistances, failures = unique_pairs(np.concatenate(chunk_resistances),
+                np.concatenate(chunk_failures))
+            combination_names = dict((mask, sensormasks.failure_names(mask, header['sensors']))
+                for mask in np.unique(failures).tolist())
+            return resistances, failures, combination_names
+        combination_ids = {}
+        distinct_pairs = set()
+        with open(self.results_fn, 'rb') as results:
+            for line in results:
+                if not line.startswith('#'):
+                    elements = line.strip().split(',')
+                    failures = tuple(sorted(name for name in elements[2:] if name))
+                    combination = combination_ids.setdefault(failures, len(combination_ids))
+                    distinct_pairs.add((float(elements[1]), combination))
+        combination_names = dict((combination, list(failures))
+            for failures, combination in combination_ids.items())
+        resistances, combinations = unique_pairs(
+            np.array([pair[0] for pair in distinct_pairs], dtype=float),
+            np.array([pair[1] for pair in distinct_pairs], dtype=np.int64))
+        return resistances, combinations, combination_names
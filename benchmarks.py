@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+
+'''benchmarks.py - measures simulation and analysis throughput across network sizes,
+horizons and run lengths.  Results are saved as JSON so runs from different commits
+(or Python implementations) can be compared with --compare.'''
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import os.path
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from components import instrumentedpart
+from components import resistor
+from components import sensornetwork
+import analysis
+
+# Default sweep
+SENSOR_COUNTS = [3, 5, 8]
+MTTFS = [15., 50.]
+SIMULATION_COUNTS = [1000, 10000]
+# Sweep used by --quick
+QUICK_SENSOR_COUNTS = [3, 5]
+QUICK_MTTFS = [15.]
+QUICK_SIMULATION_COUNTS = [200]
+# Number of calls timed by the microbenchmarks
+MICRO_CALLS = 10000
+# Relative drop in rate reported as a regression by --compare
+REGRESSION_TOLERANCE = 0.1
+# Number of times each command is started by the startup benchmark (--quick uses 2)
+STARTUP_RUNS = 10
+# Modules break_detector.py should only load once the selected mode needs them
+LAZY_MODULES = ('multiprocessing', 'numpy', 'optimizer', 'sweep', 'components.batchsim',
+    'components.histogram', 'components.resultsfile', 'components.shards')
+
+def build_part_configs(num_sensors, mttf):
+    '''Returns the part configurations of a network of num_sensors sensors
+    (1 kohm, 4 kohm, 16 kohm...) with a mean time to failure of mttf cycles'''
+    return [{"mttf":mttf, "resistance":1e3 * 4 ** sensor} for sensor in range(num_sensors)]
+
+def available_engines():
+    '''Returns the simulation engines that can run here (batch requires NumPy)'''
+    try:
+        import numpy
+    except ImportError:
+        return [engine for engine in sensornetwork.ENGINES if engine != 'batch']
+    return list(sensornetwork.ENGINES)
+
+def timed(func, *args, **kwargs):
+    '''Returns a tuple (seconds, return value) of calling func once'''
+    start = time.time()
+    value = func(*args, **kwargs)
+    return time.time() - start, value
+
+def result(benchmark, seconds, count, unit, **params):
+    '''Returns a benchmark result:  count units processed in seconds'''
+    entry = {'benchmark':benchmark, 'seconds':seconds, 'count':count, 'unit':unit,
+        'rate':count / seconds if seconds > 0 else float('inf')}
+    entry.update(params)
+    return entry
+
+def bench_simulate(engine, num_simulations, num_cycles, part_configs):
+    '''Times num_simulations calls to the engine's single-network simulator'''
+    simulator = {'cycle':sensornetwork.simulate, 'event':sensornetwork.simulate_events}[engine]
+    rng = random.Random(0)
+    start = time.time()
+    for simulation in range(num_simulations):
+        simulator(num_cycles, part_configs, rng=rng)
+    return time.time() - start
+
+def count_readings(fname):
+    '''Returns the number of readings in the text results file fname'''
+    with open(fname, 'rb') as results:
+        return len([line for line in results if not line.startswith('#')])
+
+def bench_runs(engines, sensor_counts, mttfs, simulation_counts, num_processes=None):
+    '''Returns the results of the simulation and analysis benchmarks'''
+    results = []
+    fname = os.path.join(tempfile.gettempdir(), 'benchmark_results.csv')
+    for num_sensors in sensor_counts:
+        for mttf in mttfs:
+            part_configs = build_part_configs(num_sensors, mttf)
+            num_cycles = 3 * mttf
+            for num_simulations in simulation_counts:
+                params = {'num_sensors':num_sensors, 'mttf':mttf, 'num_cycles':num_cycles,
+                    'num_simulations':num_simulations}
+                for engine in engines:
+                    if engine != 'batch':
+                        seconds = bench_simulate(engine, num_simulations, num_cycles, part_configs)
+                        results.append(result('simulate', seconds, num_simulations,
+                            'simulations', engine=engine, **params))
+                    seconds, value = timed(sensornetwork.multirun_simulation, num_simulations,
+                        num_cycles, part_configs, num_processes=num_processes, fname=fname,
+                        engine=engine, seed=0)
+                    results.append(result('multirun_simulation', seconds, num_simulations,
+                        'simulations', engine=engine, num_processes=num_processes or
+                        multiprocessing.cpu_count(), **params))
+                    seconds, value = timed(sensornetwork.run_simulation, num_simulations,
+                        num_cycles, part_configs, fname=fname, engine=engine, seed=0)
+                    results.append(result('run_simulation', seconds, num_simulations,
+                        'simulations', engine=engine, **params))
+                # Analysis of the last run's results
+                num_readings = count_readings(fname)
+                seconds, value = timed(analysis.Analysis(fname).check_obvious_collisions)
+                results.append(result('check_obvious_collisions', seconds, num_readings,
+                    'readings', **params))
+                with open(fname, 'rb') as results_file:
+                    lines = results_file.readlines()
+                seconds, value = timed(analysis.StreamingAnalysis().add_lines, lines)
+                results.append(result('streaming_analysis', seconds, num_readings,
+                    'readings', **params))
+    if os.path.exists(fname):
+        os.remove(fname)
+    return results
+
+def bench_parts(sensor_counts, num_calls=MICRO_CALLS):
+    '''Returns the results of the ParallelResistance and part construction microbenchmarks'''
+    results = []
+    for num_sensors in sensor_counts:
+        part_configs = build_part_configs(num_sensors, 15.)
+        parts = sensornetwork.SensorNetwork(part_configs).parts
+        seconds = timeit.Timer(lambda: resistor.ParallelResistance(parts)).timeit(num_calls)
+        results.append(result('ParallelResistance', seconds, num_calls, 'calls',
+            num_sensors=num_sensors))
+        seconds = timeit.Timer(lambda: sensornetwork.SensorNetwork(part_configs)).timeit(
+            num_calls // num_sensors)
+        results.append(result('SensorNetwork', seconds, num_calls // num_sensors * num_sensors,
+            'parts', num_sensors=num_sensors))
+    for part_class in (instrumentedpart.Part, instrumentedpart.Strand):
+        seconds = timeit.Timer(lambda: part_class(15., 1e3)).timeit(num_calls)
+        results.append(result(part_class.__name__, seconds, num_calls, 'parts'))
+    return results
+
+def script_dir():
+    '''Returns the directory holding break_detector.py'''
+    return os.path.dirname(os.path.abspath(__file__))
+
+def bench_startup(num_runs=STARTUP_RUNS):
+    '''Returns the results of the startup benchmark:  num_runs fresh interpreters each
+    importing break_detector, printing its --help and making a 10 simulation run (plus
+    a bare interpreter for comparison)'''
+    fname = os.path.join(tempfile.gettempdir(), 'startup_results.csv')
+    commands = [('interpreter', ['-c', 'pass']),
+        ('import', ['-c', 'import break_detector']),
+        ('help', ['break_detector.py', '--help']),
+        ('small_run', ['break_detector.py', '-n', '10', '-o', fname])]
+    results = []
+    with open(os.devnull, 'wb') as devnull:
+        for command, arguments in commands:
+            start = time.time()
+            for run in range(num_runs):
+                subprocess.check_call([sys.executable] + arguments, stdout=devnull, cwd=script_dir())
+            results.append(result('startup', time.time() - start, num_runs, 'invocations',
+                command=command))
+    if os.path.exists(fname):
+        os.remove(fname)
+    return results
+
+def startup_modules():
+    '''Returns the LAZY_MODULES a fresh interpreter has loaded after importing break_detector'''
+    output = subprocess.check_output([sys.executable, '-c',
+        'import sys, break_detector; print(",".join(sorted(sys.modules)))'], cwd=script_dir())
+    loaded = output.decode('ascii').strip().split(',')
+    return [module for module in LAZY_MODULES if module in loaded]
+
+def git_commit():
+    '''Returns the commit the benchmarks were run on, or None outside a git checkout'''
+    try:
+        with open(os.devnull, 'wb') as devnull:
+            commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=devnull,
+                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit.decode('ascii').strip()
+
+def machine_info():
+    '''Returns a dict describing the machine and Python the benchmarks ran on'''
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {'python':platform.python_version(),
+        'implementation':platform.python_implementation(),
+        'platform':platform.platform(),
+        'processor':platform.processor(),
+        'cpu_count':multiprocessing.cpu_count(),
+        'numpy':numpy_version,
+        'commit':git_commit(),
+        'timestamp':datetime.datetime.utcnow().isoformat()}
+
+def run_benchmarks(engines=None, sensor_counts=SENSOR_COUNTS, mttfs=MTTFS,
+    simulation_counts=SIMULATION_COUNTS, num_processes=None, num_calls=MICRO_CALLS,
+    startup_runs=STARTUP_RUNS):
+    '''Runs every benchmark and returns a dict {'machine':machine_info(), 'results':[...]}'''
+    if engines is None:
+        engines = available_engines()
+    results = bench_startup(startup_runs)
+    results.extend(bench_parts(sensor_counts, num_calls))
+    results.extend(bench_runs(engines, sensor_counts, mttfs, simulation_counts, num_processes))
+    return {'machine':machine_info(), 'results':results}
+
+def result_key(entry):
+    '''Returns the parameters identifying a benchmark result'''
+    return tuple(sorted((name, value) for name, value in entry.items()
+        if name not in ('seconds', 'count', 'rate')))
+
+def compare_results(baseline, current, tolerance=REGRESSION_TOLERANCE):
+    '''Returns a list of (benchmark result, rate relative to baseline, True if a regression)
+    for every result of current also found in baseline'''
+    baseline_rates = dict((result_key(entry), entry['rate']) for entry in baseline['results'])
+    comparisons = []
+    for entry in current['results']:
+        baseline_rate = baseline_rates.get(result_key(entry))
+        if baseline_rate:
+            ratio = entry['rate'] / baseline_rate
+            comparisons.append((entry, ratio, ratio < 1 - tolerance))
+    return comparisons
+
+def describe(entry):
+    '''Returns a one-line description of a benchmark result'''
+    params = ', '.join('{0}={1}'.format(name, value) for name, value in sorted(entry.items())
+        if name not in ('benchmark', 'seconds', 'count', 'rate', 'unit'))
+    return "{0} ({1})".format(entry['benchmark'], params)
+
+def main():
+    '''Main entry point of the benchmarks'''
+    parser = argparse.ArgumentParser(description='break_detector benchmarks')
+    parser.add_argument('-o', action='store', type=str, default='benchmarks.json',
+        dest='output_file', help='Store results in specified JSON file (defaults to benchmarks.json)')
+    parser.add_argument('--quick', action='store_true', default=False,
+        dest='quick', help='Run a small sweep, e.g. to check the benchmarks still work')
+    parser.add_argument('--compare', action='store', type=str, default=None, metavar='BASELINE',
+        dest='baseline', help='Compare the results with an earlier JSON results file')
+    parser.add_argument('-p', action='store', type=int, default=None,
+        dest='num_processes', help='Number of processes used by multirun_simulation (defaults to cpu_count())')
+    args = parser.parse_args()
+    if args.quick:
+        benchmarks = run_benchmarks(sensor_counts=QUICK_SENSOR_COUNTS, mttfs=QUICK_MTTFS,
+            simulation_counts=QUICK_SIMULATION_COUNTS, num_processes=args.num_processes,
+            num_calls=MICRO_CALLS // 10, startup_runs=2)
+    else:
+        benchmarks = run_benchmarks(num_processes=args.num_processes)
+    for entry in benchmarks['results']:
+        print("{0}:  {1:.1f} {2}/s".format(describe(entry), entry['rate'], entry['unit']))
+    eager_modules = startup_modules()
+    if eager_modules:
+        print("*** break_detector.py loads {0} at startup".format(', '.join(eager_modules)))
+    with open(args.output_file, 'w') as fidout:
+        json.dump(benchmarks, fidout, indent=1, sort_keys=True)
+    print("Results saved to '{0}'".format(args.output_file))
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as fidin:
+            baseline = json.load(fidin)
+        print("\nCompared with '{0}' (commit {1}):".format(args.baseline,
+            baseline['machine'].get('commit')))
+        for entry, ratio, regression in compare_results(baseline, benchmarks):
+            print("{0}{1}:  {2:.2f}x".format('*** ' if regression else '', describe(entry), ratio))
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
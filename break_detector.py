@@ -1,64 +1,275 @@
-#!/usr/bin/env python
-
-''' break_detector.py - runs a Monte Carlo simulation of ALT of parts '''
-
-import argparse
-import multiprocessing
-from components import sensornetwork
-import analysis
-
-def build_part_configs():
-    '''Builds a five sensor network based on resistances that produce useful results.
-    Feel free to experiment; five or six parts per network seems to be about the most
-    this system can differentiate.'''
-    resistances = [2e6, 3e6, 4e6, 5e6] # Should work in most scenarios
-    # If you'd prefer testing something known to not work:
-    # resistances = [1e3, 2e3, 3e3, 4e3, 5e3]
-    mean_time_to_failure = 15.
-    part_configs = []
-    for partnum in resistances:
-        part_config = {"mttf":mean_time_to_failure,
-            "resistance":partnum}
-        part_configs.append(part_config)
-    return part_configs
-
-def main():
-    '''Main entry point of the program'''
-    parser = argparse.ArgumentParser(description='Monte Carlo ALT simulation')
-    parser.add_argument('-n', action="store", type=int, default=1000,
-        dest="num_sims", help="Specify number of simulations to run (default 1000)")
-    parser.add_argument('-m', action="store_true", default=False,
-        dest='multicore', help='Use multiprocess mode (defaults to single process)')
-    parser.add_argument('-o', action="store", type=str, default="results.csv",
-        dest='output_file', help="Store output in specified file")
-    parser.add_argument('-c', action="store_true", default=False,
-        dest='check_results', help='Analyze the results and report if the network appears valid')
-    parser.add_argument('-t', action='store', type=float, default=0.1,
-        dest='collision_threshold', help='Specifies tolerance for calling a collision (defaults to 0.1)')
-    args = parser.parse_args()
-    part_configurations = build_part_configs()
-    number_of_cycles = 3*part_configurations[0].get('mttf')
-
-    if not args.multicore:
-        print("Running single process:  {0} simulations, output saved to '{1}'\n".format(
-            args.num_sims, args.output_file))
-        sensornetwork.run_simulation(num_simulations=args.num_sims, num_cycles=number_of_cycles,
-            part_configurations=part_configurations, start_time=0, fname=args.output_file)
-    else:
-        print("Running multiple processes:  {0} simulations, output saved to '{1}'\n".format(
-            args.num_sims, args.output_file))
-        sensornetwork.multirun_simulation(num_simulations=args.num_sims, num_cycles=number_of_cycles,
-            part_configurations=part_configurations, start_time=0, fname=args.output_file)
-    if args.check_results:
-        print("Analyzing results")
-        analyzer = analysis.Analysis(args.output_file, threshold=args.collision_threshold)
-        obvious_collisions = analyzer.check_obvious_collisions()
-        num_collisions = len(obvious_collisions)
-        if num_collisions == 0:
-            print("No obvious collisions found.")
-        else:
-            print("{0} obvious collisions found.".format(num_collisions))
-
-if __name__ == "__main__":
-    multiprocessing.freeze_support()
+#!/usr/bin/env python
+
+''' break_detector.py - runs a Monte Carlo simulation of ALT of parts '''
+
+import argparse
+import sys
+from components import checkpoints
+from components import profiling
+from components import sensornetwork
+from components import streams
+import analysis
+
+def build_part_configs():
+    '''Builds a five sensor network based on resistances that produce useful results.
+    Feel free to experiment (or let --optimize search for you); five or six parts per
+    network seems to be about the most this system can differentiate.'''
+    resistances = [2e6, 3e6, 4e6, 5e6] # Should work in most scenarios
+    # If you'd prefer testing something known to not work:
+    # resistances = [1e3, 2e3, 3e3, 4e3, 5e3]
+    mean_time_to_failure = 15.
+    part_configs = []
+    for partnum in resistances:
+        part_config = {"mttf":mean_time_to_failure,
+            "resistance":partnum}
+        part_configs.append(part_config)
+    return part_configs
+
+def check_bands(part_configurations, max_reported=10):
+    '''Reports the combinations of failed sensors whose resistance bands overlap'''
+    bands = analysis.NetworkBands(part_configurations)
+    overlaps = bands.overlaps()
+    print("Checked {0} combinations of failed sensors.".format(len(bands.failures)))
+    if len(overlaps) == 0:
+        print("No overlapping resistance bands found.")
+    else:
+        print("{0} overlapping resistance bands found:".format(len(overlaps)))
+        for lower_band, upper_band in overlaps[:max_reported]:
+            print("  [{0}] {1:.1f}-{2:.1f} ohms overlaps [{3}] {4:.1f}-{5:.1f} ohms".format(
+                ','.join(bands.failure_names(lower_band)), bands.minimum[lower_band], bands.maximum[lower_band],
+                ','.join(bands.failure_names(upper_band)), bands.minimum[upper_band], bands.maximum[upper_band]))
+
+def report_analysis(analyzer, collision_threshold):
+    '''Prints the results of an analysis.StreamingAnalysis'''
+    print("Analyzed {0} readings of {1} combinations of failed sensors.".format(
+        analyzer.num_readings, len(analyzer.counts)))
+    num_collisions = len(analyzer.obvious_collisions)
+    if num_collisions == 0:
+        print("No obvious collisions found.")
+    else:
+        print("{0} obvious collisions found.".format(num_collisions))
+    num_collisions = len(analyzer.collisions)
+    if num_collisions == 0:
+        print("No collisions found within {0:.1%} tolerance.".format(collision_threshold))
+    else:
+        print("{0} pairs of combinations of failed sensors collide within {1:.1%} tolerance.".format(
+            num_collisions, collision_threshold))
+
+def merge_shards(shard_fnames, output_file, check_results, index_only, collision_threshold):
+    '''Merges the results of the shards of a run into output_file (unless index_only),
+    and reports the merged analysis of their indexes if check_results or index_only'''
+    from components import shards
+    if not index_only:
+        run = shards.merge_results(shard_fnames, output_file)
+        print("Merged {0} shards ({1} simulations, seed {2}) into '{3}'".format(len(shard_fnames),
+            run['total_simulations'], run['seed'], output_file))
+    if check_results or index_only:
+        analyzer = analysis.merge_indexes([shards.index_fname(shard_fname) for shard_fname in shard_fnames],
+            threshold=collision_threshold)
+        report_analysis(analyzer, collision_threshold)
+
+def run_sweep(config_fname, num_simulations, seed, engine, threshold, num_processes, output_file):
+    '''Runs the designs of a sweep config file and reports their summaries'''
+    import sweep
+    designs = sweep.read_config(config_fname)
+    if seed is None:
+        seed = streams.new_seed()
+    print("Sweeping {0} designs:  {1} simulations each (seed {2}), summary saved to '{3}'\n".format(
+        len(designs), num_simulations, seed, output_file))
+    summaries = sweep.run_sweep(designs, num_simulations, seed, engine, threshold, num_processes)
+    sweep.write_summary(summaries, output_file)
+    print("\n".join(sweep.format_summary(summaries)))
+
+def main():
+    '''Main entry point of the program'''
+    parser = argparse.ArgumentParser(description='Monte Carlo ALT simulation')
+    parser.add_argument('-n', action="store", type=int, default=1000,
+        dest="num_sims", help="Specify number of simulations to run (default 1000)")
+    parser.add_argument('-m', action="store_true", default=False,
+        dest='multicore', help='Use multiprocess mode (defaults to single process)')
+    parser.add_argument('-o', action="store", type=str, default="results.csv",
+        dest='output_file', help="Store output in specified file")
+    parser.add_argument('-c', action="store_true", default=False,
+        dest='check_results', help='Analyze the results and report if the network appears valid')
+    parser.add_argument('-t', action='store', type=float, default=0.1,
+        dest='collision_threshold', help='Specifies tolerance for calling a collision, as a fraction of the reading (defaults to 0.1)')
+    parser.add_argument('--stop-on-collision', action='store_true', default=False,
+        dest='stop_on_collision', help='With -c, stop the run as soon as a collision is found')
+    parser.add_argument('--adaptive', action='store_true', default=False,
+        dest='adaptive', help='Stop once the results converge (see --patience and --confidence); -n is the most simulations run')
+    parser.add_argument('--patience', action='store', type=int, default=analysis.PATIENCE,
+        dest='patience', help='With --adaptive, stop after this many blocks of {0} simulations without a new combination of failed sensors or a wider resistance band (defaults to {1})'.format(sensornetwork.BLOCK_SIZE, analysis.PATIENCE))
+    parser.add_argument('--confidence', action='store', type=float, default=None,
+        dest='confidence', help='With --adaptive, also stop once the estimated chance of the next reading being from a combination not seen yet is below 1 - CONFIDENCE (e.g. 0.999)')
+    parser.add_argument('-e', action='store', type=str, default='cycle', choices=sensornetwork.ENGINES,
+        dest='engine', help="Simulation engine:  'cycle' (default), 'event' or 'batch' (requires NumPy)")
+    parser.add_argument('-f', action='store', type=str, default='text', choices=['text', 'binary', 'histogram'],
+        dest='output_format', help="Output format:  'text' (default), 'binary' (requires NumPy) or 'histogram' (counts of readings per combination of failed sensors and resistance bin)")
+    parser.add_argument('-s', action='store', type=int, default=None,
+        dest='seed', help='Master random seed; the same seed gives the same results in single or multiple process mode')
+    parser.add_argument('-a', action='store_true', default=False,
+        dest='analytic', help='Check the network analytically (resistance bands of every combination of failed sensors) instead of simulating (requires NumPy)')
+    parser.add_argument('--optimize', action='store', type=int, default=None, metavar='NUM_SENSORS',
+        dest='optimize', help='Search for NUM_SENSORS resistances that keep every combination of failed sensors distinguishable (requires NumPy)')
+    parser.add_argument('--series', action='store', type=str, default=None, choices=['E6', 'E12', 'E24'],
+        dest='series', help='Restrict --optimize to standard resistor values from this E-series')
+    parser.add_argument('--range', action='store', type=float, nargs=2, default=[1e3, 1e7], metavar=('MIN', 'MAX'),
+        dest='resistance_range', help='Range of resistances in ohms searched by --optimize (defaults to 1e3 1e7)')
+    parser.add_argument('--restarts', action='store', type=int, default=32,
+        dest='restarts', help='Number of independent searches run by --optimize (defaults to 32)')
+    parser.add_argument('--decode', action='store', type=str, default=None, metavar='READINGS_FILE',
+        dest='decode', help='Work out the failed sensors of each resistance reading (one per line) in READINGS_FILE, saving them to the output file (requires NumPy)')
+    parser.add_argument('--sweep', action='store', type=str, default=None, metavar='CONFIG',
+        dest='sweep', help='Simulate (-n each) and analyze every design in the JSON file CONFIG on one worker pool, saving a summary table to the output file')
+    parser.add_argument('--chamber', action='store_true', default=False,
+        dest='chamber', help='Simulate a chamber of -n networks cycled together, saving every reading to the output file and reporting when the networks were fully decoded (requires NumPy)')
+    parser.add_argument('--shard', action='store', type=str, default=None, metavar='I/K',
+        dest='shard', help='Run shard I (from 0) of K of the simulations seeded with -s, for merging with --merge')
+    parser.add_argument('--merge', action='store', type=str, nargs='+', default=None, metavar='SHARD',
+        dest='merge', help='Merge the results files of every shard of a run into the output file')
+    parser.add_argument('--index-only', action='store_true', default=False,
+        dest='index_only', help="With --merge, only analyze the merged shards' indexes")
+    parser.add_argument('--resume', action='store_true', default=False,
+        dest='resume', help='Resume an interrupted run from its checkpoint, appending to the output file')
+    parser.add_argument('--checkpoint-interval', action='store', type=float, default=checkpoints.INTERVAL,
+        dest='checkpoint_interval', help='Seconds between checkpoints of the run (defaults to {0:g})'.format(checkpoints.INTERVAL))
+    parser.add_argument('--profile', action='store', type=str, nargs='?', default=None, const='',
+        metavar='JSON_FILE', dest='profile', help='Print where the time goes in the run, and save it to JSON_FILE if given')
+    parser.add_argument('--replay', action='store', type=int, default=None,
+        dest='replay', help='Print the results of the given simulation number of the run seeded with -s and exit')
+    args = parser.parse_args()
+    part_configurations = build_part_configs()
+    number_of_cycles = 3*part_configurations[0].get('mttf')
+
+    if args.optimize is not None:
+        import optimizer
+        separation, resistances = optimizer.optimize(args.optimize, args.resistance_range[0],
+            args.resistance_range[1], args.series, args.restarts, seed=args.seed)
+        print("Best separation between resistance bands:  {0:.1%}".format(separation))
+        if separation < 0:
+            print("(negative:  no design without overlapping bands was found)")
+        print("Part configurations:")
+        print(optimizer.build_part_configs(resistances, part_configurations[0].get('mttf')))
+        return
+    if args.analytic:
+        check_bands(part_configurations)
+        return
+    if args.decode is not None:
+        import decoder
+        num_readings, num_ambiguous, num_unexplained = decoder.decode_file(
+            decoder.FailureDecoder.from_part_configurations(part_configurations), args.decode,
+            args.output_file)
+        print("Decoded {0} readings into '{1}':  {2} ambiguous, {3} outside every band.".format(
+            num_readings, args.output_file, num_ambiguous, num_unexplained))
+        return
+    if args.sweep is not None:
+        run_sweep(args.sweep, args.num_sims, args.seed, args.engine, args.collision_threshold,
+            None if args.multicore else 1, args.output_file)
+        return
+    if args.chamber:
+        import chamber
+        result = chamber.simulate_chamber(args.num_sims, number_of_cycles, part_configurations, args.seed)
+        result.write_csv(args.output_file)
+        print("\n".join(result.summary()))
+        return
+    if args.replay is not None:
+        if args.seed is None:
+            parser.error("--replay requires the run's seed (-s)")
+        status_log = sensornetwork.replay_simulation(args.replay, number_of_cycles, part_configurations,
+            args.seed, start_time=0, engine=args.engine)
+        for line in sensornetwork.gen_output([status_log], args.replay):
+            print(line.strip())
+        return
+    if args.merge is not None:
+        try:
+            merge_shards(args.merge, args.output_file, args.check_results, args.index_only,
+                args.collision_threshold)
+        except (IOError, ValueError) as err:
+            parser.error(str(err))
+        return
+    first_simulation = 0
+    shard = None
+    if args.shard is not None:
+        from components import shards
+        if args.seed is None:
+            parser.error("--shard requires a seed (-s) shared by every shard")
+        if args.adaptive:
+            parser.error("--adaptive can't be used with --shard:  every shard must run all its simulations")
+        try:
+            shard_number, num_shards = shards.parse_shard(args.shard)
+        except ValueError as err:
+            parser.error(str(err))
+        shard = shards.describe_shard(shard_number, num_shards, args.num_sims, number_of_cycles,
+            part_configurations, args.seed, args.engine)
+        first_simulation = shard['first_simulation']
+        args.num_sims = shard['num_simulations']
+        print("Shard {0}:  simulations {1} to {2}".format(args.shard, first_simulation,
+            first_simulation + args.num_sims - 1))
+    if args.resume:
+        try:
+            checkpoint = checkpoints.read_checkpoint(checkpoints.checkpoint_fname(args.output_file))
+            if args.seed is None:
+                args.seed = checkpoint['seed']
+            checkpoints.check_checkpoint(checkpoint, checkpoints.describe_run(args.num_sims,
+                number_of_cycles, part_configurations, 0, args.seed, args.engine,
+                sensornetwork.BLOCK_SIZE, args.output_format, first_simulation))
+        except (IOError, ValueError) as err:
+            parser.error(str(err))
+        print("Resuming after {0} simulations".format(checkpoint['completed_simulations']))
+    if args.seed is None:
+        args.seed = streams.new_seed()
+
+    analyzer = None
+    if args.check_results or args.adaptive or shard is not None:
+        convergence = None
+        if args.adaptive:
+            convergence = analysis.Convergence(args.patience, args.confidence)
+        analyzer = analysis.StreamingAnalysis(args.collision_threshold,
+            args.stop_on_collision and shard is None, convergence)
+
+    if args.profile is not None:
+        profiling.set_profiler(profiling.Profiler())
+    try:
+        if not args.multicore:
+            print("Running single process:  {0} simulations (seed {2}), output saved to '{1}'\n".format(
+                args.num_sims, args.output_file, args.seed))
+            simulations_run = sensornetwork.run_simulation(num_simulations=args.num_sims,
+                num_cycles=number_of_cycles, part_configurations=part_configurations, start_time=0,
+                fname=args.output_file, engine=args.engine, seed=args.seed,
+                output_format=args.output_format, analyzer=analyzer, first_simulation=first_simulation,
+                shard=shard, checkpoint_interval=args.checkpoint_interval, resume=args.resume)
+        else:
+            print("Running multiple processes:  {0} simulations (seed {2}), output saved to '{1}'\n".format(
+                args.num_sims, args.output_file, args.seed))
+            simulations_run = sensornetwork.multirun_simulation(num_simulations=args.num_sims,
+                num_cycles=number_of_cycles, part_configurations=part_configurations, start_time=0,
+                fname=args.output_file, engine=args.engine, seed=args.seed,
+                output_format=args.output_format, analyzer=analyzer, first_simulation=first_simulation,
+                shard=shard, checkpoint_interval=args.checkpoint_interval, resume=args.resume)
+    except KeyboardInterrupt:
+        print("\nInterrupted:  run again with --resume to carry on from the last checkpoint.")
+        return
+    if args.profile is not None:
+        profiler = profiling.get_profiler()
+        print("\n".join(profiler.summary()))
+        if args.profile:
+            profiler.save(args.profile)
+            print("Profile saved to '{0}'".format(args.profile))
+    if shard is not None:
+        analyzer.save_index(shards.index_fname(args.output_file), shard)
+    if args.adaptive and analyzer.converged():
+        print("Converged after {0} simulations (estimated chance of a combination not seen yet:  {1:.2g}).".format(
+            simulations_run, analyzer.convergence.unseen_probability(analyzer.counts, analyzer.num_readings)))
+    elif args.adaptive:
+        print("Not converged after {0} simulations; use a larger -n.".format(simulations_run))
+    if args.check_results:
+        if simulations_run < args.num_sims and analyzer.found_collisions() and not analyzer.converged():
+            print("Stopped after {0} simulations:  collision found.".format(simulations_run))
+        report_analysis(analyzer, args.collision_threshold)
+
+if __name__ == "__main__":
+    if getattr(sys, 'frozen', False):
+        # Only frozen Windows executables need freeze_support() to start workers
+        import multiprocessing
+        multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+''' chamber.py - simulates an ALT chamber:  many networks of the same design cycled
+together (requires NumPy).
+
+The lifetimes and strand resistances of every network in the chamber are drawn as
+(networks, sensors) arrays and run through the batch engine (see batchsim.py), so
+each network's sequence of readings comes from array operations across the whole
+chamber.  The readings come back as a table of columns, along with when each network
+was fully decoded:  every sensor failed, and every reading on the way there fell in
+exactly one resistance band, so the failure cycle of every sensor is known. '''
+
+import numpy as np
+import decoder
+from components import batchsim
+from components import sensormasks
+from components import streams
+
+# Columns of the table of readings
+COLUMNS = ('network', 'cycle', 'resistance', 'failures', 'num_bands')
+
+class ChamberResult(object):
+    '''Readings of every network in a chamber.
+
+    columns - {column:array} with an entry per reading, in order of network then cycle:
+    the network number, the cycle on which the reading was first seen, the network
+    resistance in ohms, the bitmask of the failed sensors (bit i is sensor i, as
+    sensormasks) and the number of resistance bands holding the reading (see
+    decoder.FailureDecoder.decode)
+    complete_cycle - cycle on which each network's last sensor failed (inf if it
+    didn't within the run)
+    decoded_cycle - cycle on which each network was fully decoded (inf if never)
+    '''
+    def __init__(self, names, columns, complete_cycle, decoded_cycle):
+        self.names = names
+        self.columns = columns
+        self.complete_cycle = complete_cycle
+        self.decoded_cycle = decoded_cycle
+
+    def __len__(self):
+        return len(self.columns['network'])
+
+    @property
+    def num_networks(self):
+        '''Returns the number of networks in the chamber'''
+        return len(self.complete_cycle)
+
+    def networks_decoded(self, cycle):
+        '''Returns the number of networks fully decoded by cycle'''
+        return int(np.count_nonzero(self.decoded_cycle <= cycle))
+
+    def time_to_decode(self, num_networks):
+        '''Returns the cycle by which num_networks networks had been fully decoded, or
+        inf if fewer were'''
+        if num_networks <= 0:
+            return 0.
+        if num_networks > self.num_networks:
+            return float('inf')
+        return float(np.partition(self.decoded_cycle, num_networks - 1)[num_networks - 1])
+
+    def decoded_curve(self):
+        '''Returns a tuple of arrays (cycle, number of networks fully decoded by then) with
+        an entry for every cycle on which a network was fully decoded'''
+        cycles, counts = np.unique(self.decoded_cycle[np.isfinite(self.decoded_cycle)],
+            return_counts=True)
+        return cycles, np.cumsum(counts)
+
+    def summary(self, fractions=(0.5, 0.9, 1.)):
+        '''Returns a list of lines summarizing the chamber, with the cycles by which each
+        fraction of its networks had been fully decoded'''
+        num_decoded = int(np.count_nonzero(np.isfinite(self.decoded_cycle)))
+        num_complete = int(np.count_nonzero(np.isfinite(self.complete_cycle)))
+        lines = ["{0} networks, {1} readings:  {2} with every sensor failed, {3} fully decoded".format(
+            self.num_networks, len(self), num_complete, num_decoded)]
+        for fraction in fractions:
+            num_networks = int(np.ceil(fraction * self.num_networks))
+            lines.append("  {0} of {1} networks fully decoded by cycle {2:g}".format(num_networks,
+                self.num_networks, self.time_to_decode(num_networks)))
+        return lines
+
+    def write_csv(self, fname):
+        '''Writes the table of readings to fname as comma-delimited text, with the
+        failed sensors listed by name'''
+        failure_names = {}
+        for mask in np.unique(self.columns['failures']).tolist():
+            failure_names[mask] = ';'.join(sensormasks.failure_names(mask, self.names))
+        with open(fname, 'wb') as fidout:
+            fidout.write("# Sensors:  {0}\n".format(','.join(self.names)))
+            fidout.write("# Format:  Network, Cycle, Resistance In Ohms, Number Of Matching Bands, Failed Sensors\n")
+            fidout.writelines("{0},{1:g},{2!r},{3},{4}\n".format(network, cycle, resistance, bands,
+                failure_names[mask]) for network, cycle, resistance, mask, bands in
+                zip(*[self.columns[column].tolist() for column in COLUMNS]))
+
+def run_chamber(lifetimes, strand_resistances, num_cycles, part_configurations, start_time=0):
+    '''Runs a chamber of networks given (networks, sensors) arrays of their parts'
+    lifetimes and strand resistances (in the order of part_configurations) through
+    num_cycles, and returns a ChamberResult'''
+    result = batchsim.evaluate(lifetimes, strand_resistances, num_cycles, start_time)
+    failure_decoder = decoder.FailureDecoder.from_part_configurations(part_configurations)
+    num_bands = failure_decoder.decode(result.resistance)[1]
+    rows, states = np.nonzero(result.recorded)
+    columns = {'network':rows,
+        'cycle':result.cycle[rows, states],
+        'resistance':result.resistance[rows, states],
+        'failures':result.masks()[rows, states],
+        'num_bands':num_bands[rows, states]}
+    complete = result.recorded[:, -1]
+    complete_cycle = np.where(complete, result.cycle[:, -1], np.inf)
+    unambiguous = np.all((num_bands == 1) | ~result.recorded, axis=1)
+    decoded_cycle = np.where(complete & unambiguous, complete_cycle, np.inf)
+    return ChamberResult(failure_decoder.names, columns, complete_cycle, decoded_cycle)
+
+def simulate_chamber(num_networks, num_cycles, part_configurations, seed=None, start_time=0):
+    '''Simulates a chamber of num_networks networks of part_configurations run together
+    through num_cycles and returns a ChamberResult.  The same seed gives the same chamber.'''
+    if seed is None:
+        random_state = np.random.RandomState()
+    else:
+        random_state = streams.random_state(seed, 'chamber')
+    parameters = batchsim.NetworkParameters(part_configurations)
+    lifetimes, strand_resistances = parameters.draw(num_networks, random_state)
+    return run_chamber(lifetimes, strand_resistances, num_cycles, part_configurations, start_time)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+'''batchsim.py - vectorized Monte Carlo engine for networks of instrumented parts.
+Requires NumPy.'''
+
+import math
+import numpy as np
+from components import instrumentedpart
+from components import resistor
+from components import wire
+
+class NetworkParameters(object):
+    '''Per-sensor parameters of a network as arrays, built from the same
+    part configurations used by SensorNetwork'''
+    def __init__(self, part_configurations):
+        self.names = []
+        mttf = []
+        shape = []
+        scale = []
+        nominal_resistance = []
+        wire_resistance = []
+        for part_config in part_configurations:
+            if 'resistance' in part_config:
+                resistance = part_config.get('resistance')
+                length = part_config.get('length', None)
+                gauge = part_config.get('gauge', None)
+                if length is None:
+                    length = instrumentedpart.DEFAULT_LENGTH
+                if gauge is None:
+                    gauge = instrumentedpart.DEFAULT_GAUGE
+                part_shape = part_config.get('shape', None)
+                part_scale = part_config.get('scale', None)
+                if part_shape is None:
+                    part_shape = instrumentedpart.DEFAULT_SHAPE
+                if part_scale is None:
+                    part_scale = instrumentedpart.DEFAULT_SCALE
+                name = part_config.get('name', None)
+                if name is None:
+                    name = str(resistance)
+                self.names.append(name)
+                mttf.append(part_config.get('mttf'))
+                shape.append(part_shape)
+                scale.append(part_scale)
+                nominal_resistance.append(resistance)
+                wire_resistance.append(wire.nominal_resistance(length, gauge))
+        self.mttf = np.array(mttf, dtype=float)
+        self.shape = np.array(shape, dtype=float)
+        self.scale = np.array(scale, dtype=float)
+        self.resistance = np.array(nominal_resistance, dtype=float)
+        self.wire_resistance = np.array(wire_resistance, dtype=float)
+        self.tolerance = resistor.DEFAULT_TOLERANCE
+
+    @property
+    def num_parts(self):
+        '''Returns the number of sensors in the network'''
+        return len(self.names)
+
+    def draw(self, num_simulations, random_state=np.random):
+        '''Draws the lifetimes and strand resistances of num_simulations networks.
+        Returns a tuple of (num_simulations, num_parts) arrays.  Each simulation
+        uses its own row of uniform random numbers, so the first k simulations
+        drawn are the same whatever num_simulations is.'''
+        num_parts = self.num_parts
+        uniforms = random_state.random_sample((num_simulations, 3 * num_parts))
+        lifetimes = self.mttf * self.scale * np.power(-np.log1p(-uniforms[:, :num_parts]),
+            1. / self.shape)
+        resistances = self.resistance * (1 + self.tolerance * (2 * uniforms[:, num_parts:2 * num_parts] - 1))
+        wire_resistances = self.wire_resistance * (1 + wire.Wire.tolerance *
+            (2 * uniforms[:, 2 * num_parts:] - 1))
+        return lifetimes, resistances + wire_resistances
+
+def num_ticks(num_cycles, start_time=0):
+    '''Returns the number of cycles simulate() steps through before stopping.'''
+    if num_cycles <= start_time:
+        return 0
+    return int(math.ceil(num_cycles - start_time))
+
+class BatchResult(object):
+    '''Readings of a batch of simulations.  For each simulation, state k is the
+    network after its k shortest-lived parts have failed.
+
+    order - (N, n) part indices in order of failure
+    resistance - (N, n + 1) network resistance of each state
+    recorded - (N, n + 1) True if the state was observed during the simulation
+    cycle - (N, n + 1) cycle on which each state is first reached
+    '''
+    def __init__(self, order, resistance, recorded, cycle=None):
+        self.order = order
+        self.resistance = resistance
+        self.recorded = recorded
+        self.cycle = cycle
+
+    def __len__(self):
+        return self.order.shape[0]
+
+    def status_logs(self, names):
+        '''Returns a list of status logs (one per simulation) in the same format
+        as sensornetwork.simulate()'''
+        logs = []
+        for order, resistances, recorded in zip(self.order.tolist(),
+            self.resistance.tolist(), self.recorded.tolist()):
+            failed_names = [names[idx] for idx in order]
+            status_log = {}
+            for num_failed, resistance in enumerate(resistances):
+                if recorded[num_failed]:
+                    res_key = str(round(resistance, 1))
+                    if res_key not in status_log:
+                        status_log[res_key] = ','.join(failed_names[:num_failed])
+            logs.append(status_log)
+        return logs
+
+    def masks(self):
+        '''Returns the (N, n + 1) bitmasks of the failed parts in each state'''
+        masks = np.zeros(self.resistance.shape, dtype=np.uint64)
+        masks[:, 1:] = np.bitwise_or.accumulate(np.left_shift(np.uint64(1),
+            self.order.astype(np.uint64)), axis=1)
+        return masks
+
+    def records(self, first_simulation=0):
+        '''Returns the readings as a resultsfile.RECORD_DTYPE array.  Like the status
+        logs, each simulation only keeps the first state giving each rounded reading.'''
+        from components import resultsfile
+        num_sims, num_states = self.resistance.shape
+        masks = self.masks()
+        simulations = np.repeat(np.arange(num_sims), num_states).reshape(num_sims, num_states)
+        simulations = simulations[self.recorded]
+        resistances = np.array([round(resistance, 1)
+            for resistance in self.resistance[self.recorded].tolist()])
+        keep = np.ones(len(resistances), dtype=bool)
+        keep[1:] = (simulations[1:] != simulations[:-1]) | (resistances[1:] != resistances[:-1])
+        records = np.empty(np.count_nonzero(keep), dtype=resultsfile.RECORD_DTYPE)
+        records['simulation'] = simulations[keep] + first_simulation
+        records['resistance'] = resistances[keep]
+        records['failures'] = masks[self.recorded][keep]
+        return records
+
+def evaluate(lifetimes, strand_resistances, num_cycles, start_time=0):
+    '''Computes the readings of each simulated network given its parts' lifetimes
+    and strand resistances.  Returns a BatchResult.'''
+    num_sims, num_parts = lifetimes.shape
+    order = np.argsort(lifetimes, axis=1, kind='mergesort')
+    rows = np.arange(num_sims)[:, np.newaxis]
+    sorted_lifetimes = lifetimes[rows, order]
+    with np.errstate(divide='ignore'):
+        conductance = 1. / strand_resistances[rows, order]
+    # Remaining conductance after the first k parts fail is the suffix sum
+    remaining = np.zeros((num_sims, num_parts + 1))
+    remaining[:, :num_parts] = np.cumsum(conductance[:, ::-1], axis=1)[:, ::-1]
+    with np.errstate(divide='ignore'):
+        resistance = 1. / remaining
+    # Cycle (counted from start_time) on which each part is first seen as failed
+    fail_tick = np.maximum(1., np.ceil(sorted_lifetimes - start_time))
+    first_tick = np.empty((num_sims, num_parts + 1))
+    first_tick[:, 0] = 1.
+    first_tick[:, 1:] = fail_tick
+    last_tick = np.empty((num_sims, num_parts + 1))
+    last_tick[:, :num_parts] = fail_tick - 1.
+    last_tick[:, num_parts] = np.inf
+    ticks = num_ticks(num_cycles, start_time)
+    recorded = first_tick <= np.minimum(last_tick, ticks)
+    return BatchResult(order, resistance, recorded, start_time + first_tick)
+
+def simulate_batch(num_simulations, num_cycles, part_configurations, start_time=0,
+    random_state=None):
+    '''Runs num_simulations simulations at once.  Returns a list of status logs
+    in the same format as sensornetwork.simulate().  If random_state is None a
+    new RandomState seeded from the OS is used.'''
+    if random_state is None:
+        random_state = np.random.RandomState()
+    parameters = NetworkParameters(part_configurations)
+    lifetimes, strand_resistances = parameters.draw(num_simulations, random_state)
+    result = evaluate(lifetimes, strand_resistances, num_cycles, start_time)
+    return result.status_logs(parameters.names)
+
+def simulate_records(num_simulations, num_cycles, part_configurations, start_time=0,
+    random_state=None, first_simulation=0):
+    '''Same as simulate_batch(), but returns the readings as a resultsfile.RECORD_DTYPE
+    array (simulations numbered from first_simulation) without building status logs.'''
+    if random_state is None:
+        random_state = np.random.RandomState()
+    parameters = NetworkParameters(part_configurations)
+    lifetimes, strand_resistances = parameters.draw(num_simulations, random_state)
+    result = evaluate(lifetimes, strand_resistances, num_cycles, start_time)
+    return result.records(first_simulation)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+'''checkpoints.py - records the progress of a long run so it can be resumed after an
+interruption.
+
+Every simulation draws from a random stream derived from the run's seed and its
+simulation number (see streams.py), so the state of a run is just its settings, the
+number of simulations completed (always whole blocks) and how much of the results
+file they filled.  A resumed run truncates the results file to that size and carries
+on from the next block, giving the same results as an uninterrupted run.  Histogram
+runs only write their results at the end, so their checkpoints also hold the
+histogram so far.'''
+
+import json
+import os
+import os.path
+
+# Appended to a results file name to give its checkpoint
+SUFFIX = '.checkpoint'
+# Default number of seconds between checkpoints
+INTERVAL = 60.
+# Settings that must match for a run to resume from a checkpoint
+RUN_SETTINGS = ('num_simulations', 'num_cycles', 'part_configurations', 'start_time', 'seed',
+    'engine', 'block_size', 'output_format', 'first_simulation')
+
+def checkpoint_fname(fname):
+    '''Returns the name of the checkpoint of the results file fname'''
+    return fname + SUFFIX
+
+def describe_run(num_simulations, num_cycles, part_configurations, start_time, seed, engine,
+    block_size, output_format, first_simulation=0):
+    '''Returns the description of a run recorded in its checkpoints'''
+    return {'num_simulations':num_simulations,
+        'num_cycles':num_cycles,
+        'part_configurations':part_configurations,
+        'start_time':start_time,
+        'seed':seed,
+        'engine':engine,
+        'block_size':block_size,
+        'output_format':output_format,
+        'first_simulation':first_simulation}
+
+def save_checkpoint(fname, run, completed, fidout, offset, run_histogram=None):
+    '''Records that the first completed simulations of run filled the first offset
+    bytes of the results file fidout (and run_histogram if a histogram run).  The
+    results are flushed to disk first, and the checkpoint is replaced atomically so
+    an interruption never leaves a partial checkpoint.'''
+    fidout.flush()
+    os.fsync(fidout.fileno())
+    checkpoint = dict(run)
+    checkpoint['completed_simulations'] = completed
+    checkpoint['offset'] = offset
+    if run_histogram is not None:
+        checkpoint['histogram'] = {'bin_width':run_histogram.bin_width,
+            'bins':[[mask, bin_number] + counts
+                for (mask, bin_number), counts in run_histogram.bins.items()]}
+    temp_fname = fname + '.tmp'
+    with open(temp_fname, 'w') as fidcheckpoint:
+        json.dump(checkpoint, fidcheckpoint)
+        fidcheckpoint.flush()
+        os.fsync(fidcheckpoint.fileno())
+    try:
+        os.rename(temp_fname, fname)
+    except OSError:
+        # Windows won't rename over an existing file
+        os.remove(fname)
+        os.rename(temp_fname, fname)
+
+def read_checkpoint(fname):
+    '''Returns the checkpoint saved in fname; raises IOError if there isn't one'''
+    if not os.path.exists(fname):
+        raise IOError("No checkpoint found ({0})".format(fname))
+    with open(fname, 'r') as fidcheckpoint:
+        return json.load(fidcheckpoint)
+
+def check_checkpoint(checkpoint, run):
+    '''Raises ValueError if checkpoint wasn't saved by a run with the same settings as run'''
+    for setting in RUN_SETTINGS:
+        if checkpoint[setting] != run[setting]:
+            raise ValueError("Checkpoint is from a different run ({0} differs)".format(setting))
+
+def read_histogram(checkpoint):
+    '''Returns the histogram.Histogram saved in checkpoint'''
+    from components import histogram
+    run_histogram = histogram.Histogram(checkpoint['histogram']['bin_width'])
+    for mask, bin_number, count, lowest, highest in checkpoint['histogram']['bins']:
+        bin_number = histogram.OPEN_BIN if bin_number == histogram.OPEN_BIN else int(bin_number)
+        run_histogram.bins[(mask, bin_number)] = [count, lowest, highest]
+    return run_histogram
+
+def remove_checkpoint(fname):
+    '''Removes the checkpoint fname (if any) once its run is complete'''
+    if os.path.exists(fname):
+        os.remove(fname)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+'''histogram.py - aggregated simulation results.  Instead of one line per reading, a
+histogram holds, for each combination of failed sensors (as a sensormasks bitmask) and
+resistance bin, the number of readings and the lowest and highest reading.  Bins are
+bin_width wide as a fraction of the reading, so the size of a histogram depends on the
+network rather than on the number of simulations.
+
+A histogram file is a text header (the first line is HEADER) followed by one line per
+bin:  failures bitmask, bin number, count, lowest and highest resistance in ohms and the
+list of failed sensors.  Readings that aren't finite and positive (e.g. the open
+circuit once every sensor has failed) go in bin OPEN_BIN.'''
+
+import json
+import math
+from components import sensormasks
+
+HEADER = "# Monte Carlo Simulation Histogram\n"
+# Default width of a bin as a fraction of the reading
+BIN_WIDTH = 1e-4
+OPEN_BIN = 'open'
+
+class Histogram(object):
+    '''Counts of readings per (failures bitmask, resistance bin).
+
+    bins - {(mask, bin number):[count, lowest reading, highest reading]}
+    '''
+    def __init__(self, bin_width=BIN_WIDTH):
+        self.bin_width = bin_width
+        self.log_width = math.log1p(bin_width)
+        self.bins = {}
+
+    def bin_number(self, resistance):
+        '''Returns the number of the bin holding resistance'''
+        if not 0 < resistance < float('inf'):
+            return OPEN_BIN
+        return int(math.floor(math.log(resistance) / self.log_width))
+
+    def add(self, mask, resistance, count=1, highest=None, bin_number=None):
+        '''Adds count readings of combination mask, from resistance to highest
+        (defaults to resistance), to bin number bin_number (defaults to the bin
+        holding resistance)'''
+        if highest is None:
+            highest = resistance
+        if bin_number is None:
+            bin_number = self.bin_number(resistance)
+        key = (mask, bin_number)
+        counts = self.bins.get(key)
+        if counts is None:
+            self.bins[key] = [count, resistance, highest]
+        else:
+            counts[0] += count
+            if resistance < counts[1]:
+                counts[1] = resistance
+            if highest > counts[2]:
+                counts[2] = highest
+
+    def add_status_logs(self, simulation_runs, bits):
+        '''Adds the readings of simulation_runs (status logs as returned by
+        sensornetwork.simulate()), given the bits of each sensor name'''
+        masks = {}
+        for simulation_run in simulation_runs:
+            for resistance_reading, failures_str in simulation_run.items():
+                mask = masks.get(failures_str)
+                if mask is None:
+                    mask = masks[failures_str] = sensormasks.failure_mask(failures_str, bits)
+                self.add(mask, float(resistance_reading))
+
+    def add_records(self, records):
+        '''Adds the readings of an array of resultsfile.RECORD_DTYPE records (requires
+        NumPy).  Records are grouped by bin with NumPy, then added a bin at a time.'''
+        import numpy as np
+        resistances = records['resistance']
+        masks = records['failures']
+        finite = np.isfinite(resistances) & (resistances > 0)
+        bin_numbers = np.zeros(len(resistances), dtype=np.int64)
+        bin_numbers[finite] = np.floor(np.log(resistances[finite]) / self.log_width)
+        order = np.lexsort((resistances, bin_numbers, ~finite, masks))
+        keys = np.column_stack((masks[order].astype(np.int64), bin_numbers[order], finite[order]))
+        starts = np.nonzero(np.append(True, np.any(keys[1:] != keys[:-1], axis=1)))[0]
+        ends = np.append(starts[1:], len(order))
+        sorted_resistances = resistances[order]
+        for start, end, mask, bin_number, is_finite in zip(starts.tolist(), ends.tolist(),
+            masks[order][starts].tolist(), bin_numbers[order][starts].tolist(),
+            finite[order][starts].tolist()):
+            if not is_finite:
+                bin_number = OPEN_BIN
+            self.add(mask, float(sorted_resistances[start]), end - start,
+                float(sorted_resistances[end - 1]), bin_number)
+
+    def update(self, other):
+        '''Merges the counts of Histogram other (of the same bin width) into this one'''
+        for (mask, bin_number), (count, lowest, highest) in other.bins.items():
+            counts = self.bins.get((mask, bin_number))
+            if counts is None:
+                self.bins[(mask, bin_number)] = [count, lowest, highest]
+            else:
+                counts[0] += count
+                counts[1] = min(counts[1], lowest)
+                counts[2] = max(counts[2], highest)
+
+    @property
+    def num_readings(self):
+        '''Returns the number of readings counted'''
+        return sum(counts[0] for counts in self.bins.values())
+
+    def gen_lines(self, names):
+        '''Generator function returning the line of each bin, in order of combination
+        and then resistance, given the names of the sensors'''
+        for (mask, bin_number), (count, lowest, highest) in sorted(self.bins.items(),
+            key=lambda item: (item[0][0], item[1][1])):
+            yield "{0},{1},{2},{3},{4},{5}\n".format(mask, bin_number, count, lowest, highest,
+                ','.join(sensormasks.failure_names(mask, names)))
+
+def gen_header(part_configurations, num_simulations, num_cycles, seed=None, bin_width=BIN_WIDTH,
+    shard=None):
+    '''Generates the header of a histogram file (shard is as in sensornetwork.gen_header())'''
+    header_str = [HEADER,
+        "# {0} simulations of {1} cycles\n".format(num_simulations, int(num_cycles))]
+    if seed is not None:
+        header_str.append("# Seed:  {0}\n".format(seed))
+    if shard is not None:
+        header_str.append("# Shard:  {0}\n".format(json.dumps(shard, sort_keys=True)))
+    header_str.extend(["# Bin width:  {0!r}\n".format(bin_width),
+        "# Sensors:  {0}\n".format(','.join(sensormasks.sensor_names(part_configurations))),
+        "# Format:  Failures Bitmask, Bin, Count, Lowest Resistance In Ohms, " +
+            "Highest Resistance In Ohms, List of Failed Sensors\n"])
+    return header_str
+
+def is_histogram_file(fname):
+    '''Returns True if fname is a histogram file'''
+    with open(fname, 'rb') as fidin:
+        return fidin.readline() == HEADER
+
+def read_histogram(fname):
+    '''Returns a tuple (Histogram, names of the sensors) read from the histogram file fname'''
+    with open(fname, 'rb') as fidin:
+        if fidin.readline() != HEADER:
+            raise IOError("{0} is not a histogram file".format(fname))
+        names = []
+        histogram = None
+        for line in fidin:
+            if line.startswith('# Bin width:'):
+                histogram = Histogram(float(line.split(':', 1)[1]))
+            elif line.startswith('# Sensors:'):
+                names = [name for name in line.split(':', 1)[1].strip().split(',') if name]
+            elif not line.startswith('#'):
+                elements = line.strip().split(',')
+                bin_number = elements[1]
+                if bin_number != OPEN_BIN:
+                    bin_number = int(bin_number)
+                histogram.bins[(int(elements[0]), bin_number)] = [int(elements[2]),
+                    float(elements[3]), float(elements[4])]
+    return histogram, names
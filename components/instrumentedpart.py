@@ -1,83 +1,141 @@
-#!/usr/bin/env python
-
-''' instrumentedpart.py - simulates a part that fails instrumented with
-a resistor'''
-
-from components import partfailure
-from components import wire
-from components import resistor
-
-class BreakSensor(object):
-    '''Creates the break sensor:  a standard resistor strapped to a part
-    that breaks.'''
-    def __init__(self, resistance, length, gauge):
-        self.create_resistor(resistance)
-        self.create_wire(length, gauge)
-
-    def create_resistor(self, resistance):
-        '''Creates the resistor used to detect the breakage of the part'''
-        self.resistor = resistor.Resistor(resistance)
-
-    def create_wire(self, length, gauge):
-        '''Creates the wire leads used to connect the resistor'''
-        self.wire = wire.Wire(length, gauge)
-
-    @property
-    def resistance(self):
-        '''Returns the sensor's electrical resistance in ohms.'''
-        return resistor.SeriesResistance([self.resistor, self.wire])
-
-    @property
-    def broken(self):
-        '''Indicates that the instrumented part has failed and 
-        so our sensor's leads are as well'''
-        return self.wire.broken
-    @broken.setter
-    def broken(self, is_broken=True):
-        '''Sets the sensor's condition to is_broken (True by default) -
-        part has failed.'''
-        self.wire.broken = is_broken
-
-class Part(object):
-    '''Model for an instrumented part'''
-    def __init__(self, mttf, resistance, length=None, gauge=None, shape=None, 
-        scale=None, name=None):
-        self.create_part(mttf, shape, scale)
-        self.create_breaksensor(resistance, length, gauge)
-        if name is not None:
-            self.name = name
-        else:
-            self.name = str(resistance)
-
-    def create_part(self, mttf, shape, scale):
-        '''Creates the part to fail being monitored'''
-        if shape is None:
-            shape = 3
-        if scale is None:
-            scale = 1
-        self.part = partfailure.Part(mttf, shape, scale)
-
-    def create_breaksensor(self, resistance, length, gauge):
-        '''Creates the break sensor used to monitor the part'''
-        if length is None:
-            length = 6.
-        if gauge is None:
-            gauge = 24
-        self.sensor = BreakSensor(resistance, length, gauge)
-
-    @property
-    def resistance(self):
-        '''Returns the electrical resistance of the part'''
-        return self.sensor.resistance
-
-    @property
-    def lifetime(self):
-        '''Returns the lifetime in cycles of the part'''
-        return self.part.lifetime
-
-    def failed(self, cycle_number):
-        '''Returns True if the part has failed by cycle_number'''
-        part_failed = self.part.failed(cycle_number)
-        if part_failed:
-            self.sensor.broken = True
-        return part_failed
\ No newline at end of file
+#!/usr/bin/env python
+
+''' instrumentedpart.py - simulates a part that fails instrumented with
+a resistor'''
+
+import random
+from components import partfailure
+from components import wire
+from components import resistor
+
+# Defaults used when a part configuration doesn't specify them
+DEFAULT_LENGTH = 6.
+DEFAULT_GAUGE = 24
+DEFAULT_SHAPE = 3
+DEFAULT_SCALE = 1
+
+class BreakSensor(object):
+    '''Creates the break sensor:  a standard resistor strapped to a part
+    that breaks.'''
+    def __init__(self, resistance, length, gauge, rng=None):
+        self.create_resistor(resistance, rng)
+        self.create_wire(length, gauge, rng)
+
+    def create_resistor(self, resistance, rng=None):
+        '''Creates the resistor used to detect the breakage of the part'''
+        self.resistor = resistor.Resistor(resistance, rng=rng)
+
+    def create_wire(self, length, gauge, rng=None):
+        '''Creates the wire leads used to connect the resistor'''
+        self.wire = wire.Wire(length, gauge, rng)
+
+    @property
+    def resistance(self):
+        '''Returns the sensor's electrical resistance in ohms.'''
+        return resistor.SeriesResistance([self.resistor, self.wire])
+
+    @property
+    def broken(self):
+        '''Indicates that the instrumented part has failed and 
+        so our sensor's leads are as well'''
+        return self.wire.broken
+    @broken.setter
+    def broken(self, is_broken=True):
+        '''Sets the sensor's condition to is_broken (True by default) -
+        part has failed.'''
+        self.wire.broken = is_broken
+
+class Part(object):
+    '''Model for an instrumented part.  Random numbers are drawn from rng
+    (a random.Random instance), or the random module if rng is None.
+    strand_resistance is the resistance of the intact sensor's strand (resistor
+    and wire), fixed when the part is built.'''
+    def __init__(self, mttf, resistance, length=None, gauge=None, shape=None, 
+        scale=None, name=None, rng=None):
+        self.create_part(mttf, shape, scale, rng)
+        self.create_breaksensor(resistance, length, gauge, rng)
+        self.strand_resistance = self.sensor.resistance
+        if name is not None:
+            self.name = name
+        else:
+            self.name = str(resistance)
+
+    def create_part(self, mttf, shape, scale, rng=None):
+        '''Creates the part to fail being monitored'''
+        if shape is None:
+            shape = DEFAULT_SHAPE
+        if scale is None:
+            scale = DEFAULT_SCALE
+        self.part = partfailure.Part(mttf, shape, scale, rng)
+
+    def create_breaksensor(self, resistance, length, gauge, rng=None):
+        '''Creates the break sensor used to monitor the part'''
+        if length is None:
+            length = DEFAULT_LENGTH
+        if gauge is None:
+            gauge = DEFAULT_GAUGE
+        self.sensor = BreakSensor(resistance, length, gauge, rng)
+
+    @property
+    def resistance(self):
+        '''Returns the electrical resistance of the part'''
+        return self.sensor.resistance
+
+    @property
+    def lifetime(self):
+        '''Returns the lifetime in cycles of the part'''
+        return self.part.lifetime
+
+    def failed(self, cycle_number):
+        '''Returns True if the part has failed by cycle_number'''
+        part_failed = self.part.failed(cycle_number)
+        if part_failed:
+            self.sensor.broken = True
+        return part_failed
+
+class Strand(object):
+    '''Compact stand-in for Part used by the simulations:  keeps only what a
+    SensorNetwork needs (lifetime, intact strand resistance, name and whether it has
+    broken) in __slots__ instead of building a Part, partfailure.Part, BreakSensor,
+    Resistor and Wire.  Draws the same random numbers in the same order as Part, so
+    the same rng gives the same lifetime and strand resistance.'''
+    __slots__ = ('lifetime', 'strand_resistance', 'name', 'broken')
+
+    def __init__(self, mttf, resistance, length=None, gauge=None, shape=None,
+        scale=None, name=None, rng=None):
+        if rng is None:
+            rng = random
+        if shape is None:
+            shape = DEFAULT_SHAPE
+        if scale is None:
+            scale = DEFAULT_SCALE
+        if length is None:
+            length = DEFAULT_LENGTH
+        if gauge is None:
+            gauge = DEFAULT_GAUGE
+        self.lifetime = mttf * rng.weibullvariate(alpha=scale, beta=shape)
+        wire_resistance = wire.nominal_resistance(length, gauge)
+        self.strand_resistance = sum([
+            rng.uniform(resistance * (1 - resistor.DEFAULT_TOLERANCE),
+                resistance * (1 + resistor.DEFAULT_TOLERANCE)),
+            rng.uniform(wire_resistance * (1 - wire.Wire.tolerance),
+                wire_resistance * (1 + wire.Wire.tolerance))])
+        if name is not None:
+            self.name = name
+        else:
+            self.name = str(resistance)
+        self.broken = False
+
+    @property
+    def resistance(self):
+        '''Returns the electrical resistance of the strand (infinite once broken)'''
+        if self.broken:
+            return float('inf')
+        return self.strand_resistance
+
+    def failed(self, cycle_number):
+        '''Returns True if the part has failed by cycle_number'''
+        part_failed = cycle_number >= self.lifetime
+        if part_failed:
+            self.broken = True
+        return part_failed
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+'''profiling.py - opt-in timings and counters of where a run spends its time.
+
+Runs report to the profiler returned by get_profiler():  a NullProfiler that ignores
+everything unless a Profiler has been installed with set_profiler().  Runs only check
+profiler.enabled once per block, and only switch to the instrumented simulation
+(see sensornetwork.ProfiledSensorNetwork) when it is True, so profiling costs nothing
+when it's off.'''
+
+import json
+import timeit
+
+# Clock used for timings
+timer = timeit.default_timer
+
+class Phase(object):
+    '''Context manager adding the time spent in its block to a phase of a Profiler'''
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add_time(self.name, timer() - self.started)
+        return False
+
+class Profiler(object):
+    '''Collects the time spent in each phase of a run and counts of what it did.
+
+    timings - {phase:seconds}
+    counters - {counter:count}, e.g. simulations, cycles, readings, bytes_written
+    workers - {worker process name:seconds spent simulating blocks}
+    '''
+    enabled = True
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+        self.workers = {}
+
+    def add_time(self, phase, seconds):
+        '''Adds seconds to the time spent in phase'''
+        self.timings[phase] = self.timings.get(phase, 0.) + seconds
+
+    def count(self, counter, number=1):
+        '''Adds number to counter'''
+        self.counters[counter] = self.counters.get(counter, 0) + number
+
+    def phase(self, name):
+        '''Returns a context manager timing its block as part of phase name'''
+        return Phase(self, name)
+
+    def add_worker_time(self, worker, seconds):
+        '''Adds seconds to the time worker spent simulating'''
+        self.workers[worker] = self.workers.get(worker, 0.) + seconds
+
+    def update(self, profile):
+        '''Merges the timings and counters of profile (as returned by as_dict(), e.g.
+        from a worker process) into this profiler'''
+        for phase, seconds in profile['timings'].items():
+            self.add_time(phase, seconds)
+        for counter, number in profile['counters'].items():
+            self.count(counter, number)
+        for worker, seconds in profile['workers'].items():
+            self.add_worker_time(worker, seconds)
+
+    def as_dict(self):
+        '''Returns the timings and counters as a dict (e.g. to save as JSON).  Each
+        worker's idle time is the time of the whole run less its busy time.'''
+        run_seconds = self.timings.get('run', 0.)
+        return {'timings':dict(self.timings),
+            'counters':dict(self.counters),
+            'workers':dict(self.workers),
+            'idle':dict((worker, max(0., run_seconds - busy)) for worker, busy in self.workers.items())}
+
+    def summary(self):
+        '''Returns a list of lines summarizing the timings and counters'''
+        run_seconds = self.timings.get('run', 0.)
+        lines = ["Profile ({0:.3f} s run):".format(run_seconds)]
+        for phase, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            if phase != 'run':
+                share = " ({0:.1%})".format(seconds / run_seconds) if run_seconds > 0 else ""
+                lines.append("  {0:<16}{1:10.3f} s{2}".format(phase, seconds, share))
+        for counter, number in sorted(self.counters.items()):
+            lines.append("  {0:<16}{1:10d}".format(counter, number))
+        for worker, busy in sorted(self.workers.items()):
+            lines.append("  {0:<16}{1:10.3f} s busy, {2:.3f} s idle".format(worker, busy,
+                max(0., run_seconds - busy)))
+        return lines
+
+    def save(self, fname):
+        '''Saves the timings and counters to fname as JSON'''
+        with open(fname, 'w') as fidout:
+            json.dump(self.as_dict(), fidout, indent=1, sort_keys=True)
+
+class NullPhase(object):
+    '''Context manager that does nothing'''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+class NullProfiler(Profiler):
+    '''Profiler that records nothing, used when profiling is off'''
+    enabled = False
+    null_phase = NullPhase()
+
+    def add_time(self, phase, seconds):
+        pass
+
+    def count(self, counter, number=1):
+        pass
+
+    def phase(self, name):
+        return self.null_phase
+
+    def add_worker_time(self, worker, seconds):
+        pass
+
+NULL_PROFILER = NullProfiler()
+_profiler = NULL_PROFILER
+
+def get_profiler():
+    '''Returns the profiler runs report to'''
+    return _profiler
+
+def set_profiler(profiler):
+    '''Makes runs report to profiler (a Profiler, or None to stop profiling)'''
+    global _profiler
+    _profiler = NULL_PROFILER if profiler is None else profiler
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+'''resultsfile.py - compact binary format for simulation results.  Requires NumPy.
+
+A results file is the MAGIC string, the length of the JSON header as a little-endian
+uint32, the JSON header itself (padded with spaces to a multiple of 8 bytes) and then
+one RECORD_DTYPE record per resistance reading.  Bit i of a record's failures mask is
+set if the i-th sensor in the header's 'sensors' list had failed.'''
+
+import json
+import struct
+import numpy as np
+from components import sensormasks
+
+MAGIC = b'BDRESULT'
+RECORD_DTYPE = np.dtype([('simulation', '<u8'), ('resistance', '<f8'), ('failures', '<u8')])
+# Number of records read from a file at a time
+CHUNK_SIZE = 1 << 20
+
+def status_log_records(simulation_runs, bits, first_simulation=0):
+    '''Returns a RECORD_DTYPE array of simulation_runs (status logs numbered from first_simulation)'''
+    records = []
+    simulation = first_simulation
+    for simulation_run in simulation_runs:
+        for resistance_reading, failures_str in simulation_run.items():
+            records.append((simulation, float(resistance_reading), sensormasks.failure_mask(failures_str, bits)))
+        simulation += 1
+    return np.array(records, dtype=RECORD_DTYPE)
+
+def records_from_bytes(data):
+    '''Returns the RECORD_DTYPE array packed in the string of bytes data'''
+    return np.frombuffer(data, dtype=RECORD_DTYPE)
+
+def gen_header(part_configurations, num_simulations, num_cycles, seed=None, shard=None):
+    '''Returns the header of a results file as a string of bytes.  shard is the
+    description of the shard of a larger run (see shards.describe_shard()), if any.'''
+    header = {'sensors':sensormasks.sensor_names(part_configurations),
+        'part_configurations':part_configurations,
+        'num_simulations':num_simulations,
+        'num_cycles':num_cycles,
+        'seed':seed}
+    if shard is not None:
+        header['shard'] = shard
+    header_json = json.dumps(header, sort_keys=True)
+    header_json += ' ' * (-(len(MAGIC) + 4 + len(header_json)) % 8)
+    return MAGIC + struct.pack('<I', len(header_json)) + header_json.encode('ascii')
+
+def is_results_file(fname):
+    '''Returns True if fname is a binary results file'''
+    with open(fname, 'rb') as fidin:
+        return fidin.read(len(MAGIC)) == MAGIC
+
+def read_header(fname):
+    '''Returns a tuple (header dict, offset of the first record) of the results file fname'''
+    with open(fname, 'rb') as fidin:
+        if fidin.read(len(MAGIC)) != MAGIC:
+            raise IOError("{0} is not a binary results file".format(fname))
+        header_length = struct.unpack('<I', fidin.read(4))[0]
+        header = json.loads(fidin.read(header_length).decode('ascii'))
+    header['sensors'] = [str(name) for name in header['sensors']]
+    return header, len(MAGIC) + 4 + header_length
+
+def read_results(fname):
+    '''Returns a tuple (header dict, records) of the results file fname; the records
+    are memory-mapped rather than read into memory.'''
+    header, offset = read_header(fname)
+    with open(fname, 'rb') as fidin:
+        fidin.seek(0, 2)
+        num_records = (fidin.tell() - offset) // RECORD_DTYPE.itemsize
+    if num_records == 0:
+        return header, np.zeros(0, dtype=RECORD_DTYPE)
+    return header, np.memmap(fname, dtype=RECORD_DTYPE, mode='r', offset=offset, shape=(num_records,))
+
+def gen_chunks(records, chunk_size=CHUNK_SIZE):
+    '''Generator function returning successive slices of at most chunk_size records'''
+    for start in range(0, len(records), chunk_size):
+        yield records[start:start + chunk_size]
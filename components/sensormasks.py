@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+'''sensormasks.py - bitmasks of combinations of failed sensors.  Bit i of a mask is
+set if the i-th sensor (counting the part configurations with a resistance) has failed.'''
+
+def sensor_names(part_configurations):
+    '''Returns the names of the sensors in part_configurations, in order'''
+    names = []
+    for part_config in part_configurations:
+        if 'resistance' in part_config:
+            name = part_config.get('name', None)
+            if name is None:
+                name = str(part_config.get('resistance'))
+            names.append(name)
+    return names
+
+def name_bits(names):
+    '''Returns a dict mapping each sensor name to the list of bits of the sensors
+    with that name'''
+    if len(names) > 64:
+        raise ValueError("Failure bitmasks support at most 64 sensors")
+    bits = {}
+    for idx, name in enumerate(names):
+        bits.setdefault(name, []).append(1 << idx)
+    return bits
+
+def failure_mask(failures_str, bits):
+    '''Returns the bitmask of the comma-delimited list of failed sensors failures_str.
+    Sensors sharing a name are assigned that name's bits in order.'''
+    mask = 0
+    if failures_str:
+        used = {}
+        for name in failures_str.split(','):
+            count = used.get(name, 0)
+            mask |= bits[name][count]
+            used[name] = count + 1
+    return mask
+
+def failure_names(mask, names):
+    '''Returns the sorted list of the names of the sensors set in mask'''
+    return sorted([name for idx, name in enumerate(names) if mask & (1 << idx)])
@@ -1,165 +1,747 @@
-#!/usr/bin/env python
-
-'''sensornetwork.py - semi-realistic model of a network of instrumented parts'''
-
-from components import instrumentedpart
-from components import resistor
-import operator
-import itertools
-import multiprocessing
-
-class SensorNetwork(object):
-    '''Simulates a network of instrumented parts'''
-
-    def __init__(self, part_params, cycle_number = 0):
-        self.parts = []
-        self.create_parts(part_params)
-        self.failed_parts = []
-        self.status_log = {}
-        self.cycle_num = cycle_number
-
-    def create_parts(self, part_params):
-        '''Creates the instrumented parts'''
-        for part_config in part_params:
-            if 'mttf' and 'resistance' in part_config:
-                mttf = part_config.get('mttf')
-                resistance = part_config.get('resistance')
-                length = part_config.get('length', None)
-                gauge = part_config.get('gauge', None)
-                shape = part_config.get('shape', None)
-                scale = part_config.get('scale', None)
-                name = part_config.get('name', None)
-                self.parts.append(instrumentedpart.Part(mttf, resistance, length, gauge, shape, scale, name))
-        self.parts = sorted(self.parts, key=operator.attrgetter('lifetime'))
-
-    def get_part(self, sensor_name):
-        '''Returns a list of parts with the given name if found,
-        empty list otherwise'''
-        return [part for part in self.parts if part.name == sensor_name]
-
-    @property
-    def resistance(self):
-        '''Returns the current network's electrical resistance in ohms.'''
-        return resistor.ParallelResistance(
-            [part.resistance for part in self.parts])
-
-    @property
-    def cycles(self):
-        '''Returns the number of cycles experienced by the network.'''
-        return self.cycle_num
-    @cycles.setter
-    def cycles(self, cyclenum):
-        '''Sets the number of cycles in this network if at least one sensor is unbroken.'''
-        if not self.complete():
-            self.cycle_num = cyclenum
-            self.failed_parts.extend(itertools.takewhile(
-                lambda x: x.failed(self.cycle_num), self.parts))
-            self.parts[:] = [part for part in self.parts 
-                if not part.failed(self.cycle_num)]
-            res_key = str(round(self.resistance, 1))
-            if res_key not in self.status_log:
-                self.status_log[res_key] = ','.join([part.name for part in self.failed_parts])
-
-    def failures(self):
-        '''Returns a list of the parts that have already failed'''
-        return self.failed_parts
-
-    def complete(self):
-        '''Returns True if all the parts have failed and testing is complete'''
-        return len(self.parts) == 0
-
-def simulate(num_cycles, part_configurations, start_time=0):
-    '''Runs a single simulation of the parts through num_cycles.  Returns a dict of the
-    results - keys are the resistance in ohms of the network at a given condition,
-    values are a comma-delimited string of the sensors that have failed at this resistance.'''
-    sensor_sim = SensorNetwork(part_configurations, start_time)
-    cycle_num = start_time
-    while not sensor_sim.complete() and cycle_num < num_cycles:
-        sensor_sim.cycles += 1
-        cycle_num += 1
-    #for cycle_num in xrange(int(start_time), int(num_cycles)):
-    #    if not sensor_sim.complete():
-    #        sensor_sim.cycles = cycle_num
-    #    else:
-    #        break
-    return sensor_sim.status_log
-
-def gen_header(num_simulations, num_cycles):
-    '''Generates a simple file header for inclusion in the results output.'''
-    header_str = ["# Monte Carlo Simulation Results\n",
-        "# {0} simulations of {1} cycles\n".format(num_simulations, int(num_cycles)),
-        "# Format:  Simulation Number, Resistance In Ohms, List of Failed Sensors\n"]
-    return header_str
-
-def gen_line(num_simulations, num_cycles, part_configurations, start_time):
-    '''Generator function to run the simulation, result is a comma-delimited string
-    (simulation number, resistance in ohms, list of failed sensors)
-    '''
-    simulation = 0
-    while simulation < num_simulations:
-        simulation_run = simulate(num_cycles, part_configurations, start_time)
-        for resistance_reading in simulation_run:
-            output_str = "{0},{1},{2}\n".format(simulation,
-                resistance_reading, simulation_run.get(resistance_reading))
-            yield output_str
-        simulation += 1
-
-def run_simulation(num_simulations, num_cycles, part_configurations, start_time=0, fname="score.csv"):
-    '''Runs num_simulations of a SensorNetwork of the provided
-    parts starting at time cycle_number and running for num_cycles.
-    Results are written to fname as ASCII delimited text.
-    '''
-    with open(fname, "wb") as fidout:
-        fidout.writelines(gen_header(num_simulations, num_cycles))
-        for line in gen_line(num_simulations, num_cycles, part_configurations, start_time):
-            fidout.write(line)
-
-def multirun_simulation(num_simulations, num_cycles, part_configurations, start_time=0, num_processes=None,
-    fname='mcore.csv'):
-    '''Multi-process (defaults to cpu_count()) num_simulations runs of a SensorNetwork
-    of the provided parts starting at time cycle_number and running for num_cycles.
-
-    Results are written to fname as ASCII delimited text.
-    '''
-    if num_processes is None:
-        num_processes = multiprocessing.cpu_count()
-    worker_pool = multiprocessing.Pool(num_processes)
-    with open(fname, 'wb') as fidout:
-        fidout.writelines(gen_header(num_simulations, num_cycles))
-        for simulation in xrange(num_simulations):
-            simulation_run = worker_pool.apply_async(simulate, [num_cycles, part_configurations, start_time]).get()
-            for resistance_reading in simulation_run:
-                output_str = "{0},{1},{2}\n".format(simulation,
-                    resistance_reading, simulation_run.get(resistance_reading))
-                fidout.write(output_str)
-    worker_pool.close()
-    worker_pool.join()
-
-if __name__ == "__main__":
-    # Demonstrates the use of the module, includes a simple timing to compare single vs. multiple core
-    # usage.
-    multiprocessing.freeze_support()
-    import datetime
-    
-    simulations_to_run = 100000
-    resistances = [1e3, 2e3, 3e3, 4e3, 5e3]
-    mean_time_to_failure = 15.
-    part_configs = []
-    for partnum in resistances:
-        part_config = {"mttf":mean_time_to_failure,
-            "resistance":partnum}
-        part_configs.append(part_config)
-    
-    print("Starting single-core run...")
-    tstart = datetime.datetime.utcnow()
-    run_simulation(simulations_to_run, mean_time_to_failure*3,
-        part_configs)
-    tfinish = datetime.datetime.utcnow()
-    print("\n\n *** Single core time: {0} ***\n\n".format(tfinish-tstart))
-
-    print("Starting multi-core run...")
-    tstart2 = datetime.datetime.utcnow()
-    multirun_simulation(simulations_to_run, mean_time_to_failure*3,
-        part_configs)
-    tfinish2 = datetime.datetime.utcnow()
-    print("\n\n *** Multiple core time: {0} ***\n\n".format(tfinish2-tstart2))
+#!/usr/bin/env python
+
+'''sensornetwork.py - semi-realistic model of a network of instrumented parts'''
+
+from components import checkpoints
+from components import instrumentedpart
+from components import profiling
+from components import sensormasks
+from components import streams
+import operator
+import math
+import itertools
+import collections
+import functools
+import json
+import time
+
+# Available simulation engines
+ENGINES = ('cycle', 'event', 'batch')
+# Number of simulations run by each worker task in multirun_simulation
+BLOCK_SIZE = 1000
+# Seconds between checks for Ctrl-C while waiting for a worker's results
+RESULT_TIMEOUT = 0.5
+
+class SensorNetwork(object):
+    '''Simulates a network of instrumented parts.  If compact is True the parts are
+    instrumentedpart.Strand rather than instrumentedpart.Part objects (same results,
+    fewer objects to build).'''
+
+    def __init__(self, part_params, cycle_number = 0, rng=None, compact=False):
+        self.parts = []
+        self.create_parts(part_params, rng, compact)
+        self.failed_parts = []
+        self.status_log = {}
+        self.cycle_num = cycle_number
+
+    def create_parts(self, part_params, rng=None, compact=False):
+        '''Creates the instrumented parts, drawing random numbers from rng
+        (a random.Random instance) or the random module if rng is None'''
+        if compact:
+            part_class = instrumentedpart.Strand
+        else:
+            part_class = instrumentedpart.Part
+        for part_config in part_params:
+            if 'mttf' and 'resistance' in part_config:
+                mttf = part_config.get('mttf')
+                resistance = part_config.get('resistance')
+                length = part_config.get('length', None)
+                gauge = part_config.get('gauge', None)
+                shape = part_config.get('shape', None)
+                scale = part_config.get('scale', None)
+                name = part_config.get('name', None)
+                self.parts.append(part_class(mttf, resistance, length, gauge, shape, scale, name,
+                    rng))
+        self.parts = sorted(self.parts, key=operator.attrgetter('lifetime'))
+        self.calc_conductances()
+
+    def calc_conductances(self):
+        '''Parts fail in order of lifetime, so the network's conductance after its first
+        k parts have failed is the sum of the remaining strands' conductances.  These are
+        worked out once from the cached strand resistances (summing from the longest-lived
+        part, as in batchsim) so a reading doesn't need to visit every part.'''
+        self.conductances = [0.]
+        for part in reversed(self.parts):
+            if part.strand_resistance == 0:
+                strand_conductance = float('inf')
+            else:
+                strand_conductance = 1. / part.strand_resistance
+            self.conductances.append(self.conductances[-1] + strand_conductance)
+        self.conductances.reverse()
+
+    def get_part(self, sensor_name):
+        '''Returns a list of parts with the given name if found,
+        empty list otherwise'''
+        return [part for part in self.parts if part.name == sensor_name]
+
+    @property
+    def resistance(self):
+        '''Returns the current network's electrical resistance in ohms.'''
+        conductance = self.conductances[len(self.failed_parts)]
+        if conductance == 0:
+            return float('inf')
+        return 1. / conductance
+
+    @property
+    def cycles(self):
+        '''Returns the number of cycles experienced by the network.'''
+        return self.cycle_num
+    @cycles.setter
+    def cycles(self, cyclenum):
+        '''Sets the number of cycles in this network if at least one sensor is unbroken.'''
+        if not self.complete():
+            self.cycle_num = cyclenum
+            newly_failed = list(itertools.takewhile(
+                lambda x: x.failed(self.cycle_num), self.parts))
+            self.failed_parts.extend(newly_failed)
+            # Parts are sorted by lifetime, so the failed parts are at the front
+            del self.parts[:len(newly_failed)]
+            res_key = str(round(self.resistance, 1))
+            if res_key not in self.status_log:
+                self.status_log[res_key] = ','.join([part.name for part in self.failed_parts])
+
+    def next_failure(self):
+        '''Returns the first cycle after the current one on which at least one more
+        part will have failed, or None if all the parts have failed.'''
+        if self.complete():
+            return None
+        return self.cycle_num + max(1, int(math.ceil(self.parts[0].lifetime - self.cycle_num)))
+
+    def run_events(self, num_cycles):
+        '''Advances the network until all the parts have failed or num_cycles is reached.
+        Only visits the first cycle and the cycles on which parts fail, so the status_log
+        is the same as stepping through every cycle but run time doesn't depend on num_cycles.'''
+        cycle_num = self.cycle_num + 1
+        while not self.complete() and cycle_num - 1 < num_cycles:
+            self.cycles = cycle_num
+            cycle_num = self.next_failure()
+
+    def failures(self):
+        '''Returns a list of the parts that have already failed'''
+        return self.failed_parts
+
+    def complete(self):
+        '''Returns True if all the parts have failed and testing is complete'''
+        return len(self.parts) == 0
+
+class ProfiledSensorNetwork(SensorNetwork):
+    '''SensorNetwork recording the time spent creating its parts, stepping through
+    cycles and working out its resistance, and the number of cycles stepped, in
+    profiler (a profiling.Profiler)'''
+
+    def __init__(self, part_params, cycle_number=0, rng=None, compact=False, profiler=None):
+        self.profiler = profiler
+        SensorNetwork.__init__(self, part_params, cycle_number, rng, compact)
+
+    def create_parts(self, part_params, rng=None, compact=False):
+        '''Creates the instrumented parts as in SensorNetwork'''
+        with self.profiler.phase('create_parts'):
+            SensorNetwork.create_parts(self, part_params, rng, compact)
+
+    @property
+    def resistance(self):
+        '''Returns the current network's electrical resistance in ohms.'''
+        started = profiling.timer()
+        resistance = SensorNetwork.resistance.fget(self)
+        self.profiler.add_time('resistance', profiling.timer() - started)
+        return resistance
+
+    def set_cycles(self, cyclenum):
+        '''Sets the number of cycles as in SensorNetwork, counting the cycles stepped
+        (several per call from run_events()); the time spent on the resistance isn't
+        counted as stepping'''
+        resistance_seconds = self.profiler.timings.get('resistance', 0.)
+        previous_cycle = self.cycle_num
+        started = profiling.timer()
+        SensorNetwork.cycles.fset(self, cyclenum)
+        elapsed = profiling.timer() - started
+        self.profiler.add_time('step_cycles',
+            elapsed - (self.profiler.timings.get('resistance', 0.) - resistance_seconds))
+        self.profiler.count('cycles', self.cycle_num - previous_cycle)
+
+    cycles = property(SensorNetwork.cycles.fget, set_cycles)
+
+def simulate(num_cycles, part_configurations, start_time=0, rng=None):
+    '''Runs a single simulation of the parts through num_cycles.  Returns a dict of the
+    results - keys are the resistance in ohms of the network at a given condition,
+    values are a comma-delimited string of the sensors that have failed at this resistance.
+    Random numbers are drawn from rng, or the random module if rng is None.'''
+    sensor_sim = SensorNetwork(part_configurations, start_time, rng, compact=True)
+    cycle_num = start_time
+    while not sensor_sim.complete() and cycle_num < num_cycles:
+        sensor_sim.cycles += 1
+        cycle_num += 1
+    #for cycle_num in xrange(int(start_time), int(num_cycles)):
+    #    if not sensor_sim.complete():
+    #        sensor_sim.cycles = cycle_num
+    #    else:
+    #        break
+    return sensor_sim.status_log
+
+def simulate_events(num_cycles, part_configurations, start_time=0, rng=None):
+    '''Event-driven version of simulate():  returns the same results, but only visits the
+    cycles on which the set of failed parts changes.'''
+    sensor_sim = SensorNetwork(part_configurations, start_time, rng, compact=True)
+    sensor_sim.run_events(num_cycles)
+    return sensor_sim.status_log
+
+def simulate_profiled(num_cycles, part_configurations, start_time=0, rng=None, engine='cycle',
+    profiler=None):
+    '''Version of simulate() (or simulate_events() if engine is 'event') recording where
+    the time goes in profiler (see ProfiledSensorNetwork)'''
+    sensor_sim = ProfiledSensorNetwork(part_configurations, start_time, rng, compact=True,
+        profiler=profiler)
+    if engine == 'event':
+        sensor_sim.run_events(num_cycles)
+    else:
+        cycle_num = start_time
+        while not sensor_sim.complete() and cycle_num < num_cycles:
+            sensor_sim.cycles += 1
+            cycle_num += 1
+    return sensor_sim.status_log
+
+def gen_header(num_simulations, num_cycles, seed=None, shard=None):
+    '''Generates a simple file header for inclusion in the results output.  shard
+    is the description of the shard of a larger run (see shards.describe_shard())
+    if the results are one.'''
+    header_str = ["# Monte Carlo Simulation Results\n",
+        "# {0} simulations of {1} cycles\n".format(num_simulations, int(num_cycles))]
+    if seed is not None:
+        header_str.append("# Seed:  {0}\n".format(seed))
+    if shard is not None:
+        header_str.append("# Shard:  {0}\n".format(json.dumps(shard, sort_keys=True)))
+    header_str.append("# Format:  Simulation Number, Resistance In Ohms, List of Failed Sensors\n")
+    return header_str
+
+def gen_runs(num_simulations, num_cycles, part_configurations, start_time=0, engine='cycle',
+    seed=None, first_simulation=0, block_size=BLOCK_SIZE, profiler=profiling.NULL_PROFILER):
+    '''Generator function returning the status log of each simulation, as returned by
+    simulate().  engine is 'cycle' to step each SensorNetwork through every cycle, 'event'
+    to only visit the cycles on which parts fail, or 'batch' to use the vectorized engine
+    in batchsim (requires NumPy).
+
+    If seed is given, simulation number first_simulation + i draws from its own stream
+    derived from seed ('batch' draws one stream per block_size simulations), so the
+    results don't depend on how the simulations are split between processes.
+
+    If profiler is enabled, the time spent in each phase of the simulations is
+    recorded in it (see profiling.py).
+    '''
+    if engine == 'batch':
+        from components import batchsim
+        for block_start, block_simulations in gen_blocks(num_simulations, block_size, first_simulation):
+            random_state = None
+            if seed is not None:
+                random_state = streams.block_random_state(seed, block_start)
+            with profiler.phase('batch_simulate'):
+                block_runs = batchsim.simulate_batch(block_simulations, num_cycles,
+                    part_configurations, start_time, random_state)
+            for simulation_run in block_runs:
+                yield simulation_run
+    elif engine in ('cycle', 'event'):
+        if profiler.enabled:
+            simulator = functools.partial(simulate_profiled, engine=engine, profiler=profiler)
+        else:
+            simulator = simulate if engine == 'cycle' else simulate_events
+        simulation = first_simulation
+        while simulation < first_simulation + num_simulations:
+            rng = None
+            if seed is not None:
+                rng = streams.simulation_random(seed, simulation)
+            yield simulator(num_cycles, part_configurations, start_time, rng)
+            simulation += 1
+    else:
+        raise ValueError("Unknown simulation engine '{0}'".format(engine))
+
+def replay_simulation(simulation, num_cycles, part_configurations, seed, start_time=0, engine='cycle',
+    block_size=BLOCK_SIZE):
+    '''Reruns simulation number simulation of a seeded run and returns its status log.'''
+    if engine == 'batch':
+        # Batch streams are per block; draw the block up to and including simulation
+        block_start = simulation - simulation % block_size
+        simulation_runs = list(gen_runs(simulation - block_start + 1, num_cycles, part_configurations,
+            start_time, engine, seed, block_start, block_size))
+        return simulation_runs[-1]
+    return next(gen_runs(1, num_cycles, part_configurations, start_time, engine, seed, simulation))
+
+def gen_output(simulation_runs, first_simulation=0):
+    '''Generator function formatting simulation_runs (status logs numbered from
+    first_simulation) as comma-delimited strings (simulation number, resistance in ohms,
+    list of failed sensors)
+    '''
+    simulation = first_simulation
+    for simulation_run in simulation_runs:
+        for resistance_reading in simulation_run:
+            output_str = "{0},{1},{2}\n".format(simulation,
+                resistance_reading, simulation_run.get(resistance_reading))
+            yield output_str
+        simulation += 1
+
+def gen_line(num_simulations, num_cycles, part_configurations, start_time, engine='cycle', seed=None):
+    '''Generator function to run the simulation, result is a comma-delimited string
+    (simulation number, resistance in ohms, list of failed sensors)
+    '''
+    return gen_output(gen_runs(num_simulations, num_cycles, part_configurations,
+        start_time, engine, seed))
+
+def gen_blocks(num_simulations, block_size=BLOCK_SIZE, first_simulation=0):
+    '''Generator function splitting num_simulations (numbered from first_simulation) into
+    contiguous blocks, result is a tuple (first simulation number, number of simulations)
+    '''
+    block_start = first_simulation
+    last_simulation = first_simulation + num_simulations
+    while block_start < last_simulation:
+        yield block_start, min(block_size, last_simulation - block_start)
+        block_start += block_size
+
+def simulate_block(block):
+    '''Runs a contiguous block of simulations and returns their output as a single string
+    (text lines, or packed records for binary output), or a histogram.Histogram for
+    histogram output.  block is a tuple (first simulation number, number of simulations, num_cycles,
+    part_configurations, start_time, engine, seed, output_format) - see gen_tasks().
+    The block is profiled if profiling.get_profiler() is enabled.'''
+    (first_simulation, num_simulations, num_cycles, part_configurations, start_time, engine,
+        seed, output_format) = block
+    profiler = profiling.get_profiler()
+    profiler.count('simulations', num_simulations)
+    if engine == 'batch' and output_format in ('binary', 'histogram'):
+        from components import batchsim
+        random_state = None
+        if seed is not None:
+            random_state = streams.block_random_state(seed, first_simulation)
+        with profiler.phase('batch_simulate'):
+            records = batchsim.simulate_records(num_simulations, num_cycles, part_configurations,
+                start_time, random_state, first_simulation)
+        profiler.count('readings', len(records))
+        if output_format == 'binary':
+            with profiler.phase('pack_records'):
+                return records.tobytes()
+        from components import histogram
+        with profiler.phase('histogram'):
+            block_histogram = histogram.Histogram()
+            block_histogram.add_records(records)
+        return block_histogram
+    simulation_runs = gen_runs(num_simulations, num_cycles, part_configurations,
+        start_time, engine, seed, first_simulation, num_simulations, profiler)
+    if profiler.enabled:
+        # Run the simulations first so the phases below only time the output
+        simulation_runs = list(simulation_runs)
+        profiler.count('readings', sum(len(simulation_run) for simulation_run in simulation_runs))
+    if output_format == 'histogram':
+        from components import histogram
+        bits = sensormasks.name_bits(sensormasks.sensor_names(part_configurations))
+        with profiler.phase('histogram'):
+            block_histogram = histogram.Histogram()
+            block_histogram.add_status_logs(simulation_runs, bits)
+        return block_histogram
+    if output_format == 'binary':
+        from components import resultsfile
+        bits = sensormasks.name_bits(sensormasks.sensor_names(part_configurations))
+        with profiler.phase('pack_records'):
+            return resultsfile.status_log_records(simulation_runs, bits, first_simulation).tobytes()
+    with profiler.phase('format_output'):
+        return ''.join(gen_output(simulation_runs, first_simulation))
+
+def profile_block(block):
+    '''Runs simulate_block(block) in a worker process with a new profiling.Profiler.
+    Returns a tuple (output, profile as returned by Profiler.as_dict()).'''
+    import multiprocessing
+    profiler = profiling.Profiler()
+    profiling.set_profiler(profiler)
+    started = profiling.timer()
+    block_output = simulate_block(block)
+    profiler.add_worker_time(multiprocessing.current_process().name, profiling.timer() - started)
+    return block_output, profiler.as_dict()
+
+def gen_profiled_outputs(results, profiler):
+    '''Generator function returning the output of each of the (output, profile) results
+    of profile_block(), merging their profiles into profiler'''
+    for block_output, profile in results:
+        profiler.update(profile)
+        yield block_output
+
+_result_slots = None
+
+def attach_result_slots(result_slots):
+    '''Gives a worker process the shared result slots written by simulate_shared()'''
+    global _result_slots
+    _result_slots = result_slots
+
+def result_slot_size(num_simulations, part_configurations):
+    '''Returns the most bytes of packed records (see resultsfile.RECORD_DTYPE) that a
+    block of num_simulations can give:  a reading for each state of the network'''
+    from components import resultsfile
+    num_sensors = len(sensormasks.sensor_names(part_configurations))
+    return num_simulations * (num_sensors + 1) * resultsfile.RECORD_DTYPE.itemsize
+
+def simulate_shared(slot_task):
+    '''Runs a binary output block in a worker process and copies its packed records into
+    one of the shared result slots set by attach_result_slots(), so only their size is
+    sent back.  slot_task is a tuple (slot number, simulate_block() task, True to
+    profile the block).  Returns a tuple (slot number, number of bytes, profile or
+    None), or (None, output, profile) if the output doesn't fit in the slot.'''
+    import ctypes
+    slot, task, profiled = slot_task
+    if profiled:
+        block_output, profile = profile_block(task)
+    else:
+        block_output, profile = simulate_block(task), None
+    result_slot = _result_slots[slot]
+    if len(block_output) > len(result_slot):
+        return None, block_output, profile
+    ctypes.memmove(result_slot, block_output, len(block_output))
+    return slot, len(block_output), profile
+
+def gen_shared_outputs(results, result_slots, profiler):
+    '''Generator function returning the output of each of the results of
+    simulate_shared() as an array of bytes viewing its shared slot (not a copy), merging
+    any profiles into profiler.  A slot is reused by the task submitted after its
+    output is consumed, so each output must be used before asking for the next.'''
+    import numpy as np
+    for slot, block_output, profile in results:
+        if profile is not None:
+            profiler.update(profile)
+        if slot is not None:
+            block_output = np.frombuffer(result_slots[slot], dtype=np.uint8, count=block_output)
+        yield block_output
+
+def gen_tasks(num_simulations, num_cycles, part_configurations, start_time=0, engine='cycle',
+    seed=None, block_size=BLOCK_SIZE, output_format='text', first_simulation=0):
+    '''Generator function returning the simulate_block() task for each block of simulations
+    (numbered from first_simulation)'''
+    for block_start, block_simulations in gen_blocks(num_simulations, block_size, first_simulation):
+        yield (block_start, block_simulations, num_cycles, part_configurations, start_time,
+            engine, seed, output_format)
+
+def write_header(fidout, num_simulations, num_cycles, part_configurations, seed=None,
+    output_format='text', shard=None):
+    '''Writes the results file header in output_format ('text', 'binary' or 'histogram')
+    to fidout'''
+    if output_format == 'histogram':
+        from components import histogram
+        fidout.writelines(histogram.gen_header(part_configurations, num_simulations, num_cycles, seed,
+            shard=shard))
+    elif output_format == 'binary':
+        from components import resultsfile
+        fidout.write(resultsfile.gen_header(part_configurations, num_simulations, num_cycles, seed,
+            shard))
+    elif output_format == 'text':
+        fidout.writelines(gen_header(num_simulations, num_cycles, seed, shard))
+    else:
+        raise ValueError("Unknown output format '{0}'".format(output_format))
+
+def init_worker(result_slots=None):
+    '''Pool initializer:  workers ignore SIGINT, leaving Ctrl-C to the parent process
+    (which terminates the pool), and are given the shared result slots (if any)
+    written by simulate_shared()'''
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    attach_result_slots(result_slots)
+
+def wait_result(async_result):
+    '''Returns the result of a worker task.  Waits RESULT_TIMEOUT seconds at a time,
+    as Python 2 can't interrupt a wait without a timeout.'''
+    import multiprocessing
+    while True:
+        try:
+            return async_result.get(RESULT_TIMEOUT)
+        except multiprocessing.TimeoutError:
+            pass
+
+def imap_ordered(worker_pool, func, tasks, max_pending):
+    '''Like worker_pool.imap(func, tasks), but only submits a new task once fewer than
+    max_pending results are waiting to be consumed, so memory use stays bounded.
+    Waiting for results can be interrupted with Ctrl-C.'''
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(worker_pool.apply_async(func, (task,)))
+        if len(pending) >= max_pending:
+            yield wait_result(pending.popleft())
+    while pending:
+        yield wait_result(pending.popleft())
+
+def analyze_block(analyzer, block_output, part_configurations, output_format='text'):
+    '''Passes the output of simulate_block() to analyzer (e.g. an analysis.StreamingAnalysis)'''
+    if output_format == 'histogram':
+        analyzer.add_histogram(block_output, sensormasks.sensor_names(part_configurations))
+    elif output_format == 'binary':
+        from components import resultsfile
+        analyzer.add_records(resultsfile.records_from_bytes(block_output),
+            sensormasks.sensor_names(part_configurations))
+    else:
+        analyzer.add_lines(block_output.splitlines())
+
+def analyze_each_block(analyzer, output_format='text'):
+    '''Returns True if each block's output should be passed to analyzer as it is
+    written.  Histograms are analyzed once merged (their bins repeat from block to
+    block) unless the analyzer may stop the run early.'''
+    if analyzer is None:
+        return False
+    return output_format != 'histogram' or analyzer.stops_early()
+
+def reanalyze_output(analyzer, fname, offset, part_configurations, output_format='text'):
+    '''Passes the results already in the first offset bytes of fname (e.g. by a run
+    being resumed) to analyzer'''
+    if output_format == 'binary':
+        from components import resultsfile
+        header, records_offset = resultsfile.read_header(fname)
+        with open(fname, 'rb') as fidin:
+            fidin.seek(records_offset)
+            analyze_block(analyzer, fidin.read(offset - records_offset), part_configurations,
+                output_format)
+    elif output_format == 'text':
+        with open(fname, 'rb') as fidin:
+            analyzer.add_lines(fidin.read(offset).splitlines())
+
+def open_output(fname, run, shard=None, analyzer=None, resume=False):
+    '''Opens the results file fname of run (see checkpoints.describe_run()) for writing.
+    Returns a tuple (results file, number of simulations already completed, run
+    histogram or None).
+
+    If resume is True, the run carries on from its checkpoint:  results written after
+    the checkpoint are discarded, the results before it are passed to analyzer, and
+    the simulations completed are skipped.  Otherwise a new results file is written.'''
+    output_format = run['output_format']
+    run_histogram = None
+    if not resume:
+        checkpoints.remove_checkpoint(checkpoints.checkpoint_fname(fname))
+        fidout = open(fname, 'wb')
+        write_header(fidout, run['num_simulations'], run['num_cycles'], run['part_configurations'],
+            run['seed'], output_format, shard)
+        if output_format == 'histogram':
+            from components import histogram
+            run_histogram = histogram.Histogram()
+        return fidout, 0, run_histogram
+    checkpoint = checkpoints.read_checkpoint(checkpoints.checkpoint_fname(fname))
+    checkpoints.check_checkpoint(checkpoint, run)
+    fidout = open(fname, 'r+b')
+    fidout.seek(0, 2)
+    if fidout.tell() < checkpoint['offset']:
+        fidout.close()
+        raise IOError("{0} is shorter than its checkpoint".format(fname))
+    fidout.seek(checkpoint['offset'])
+    fidout.truncate()
+    if output_format == 'histogram':
+        run_histogram = checkpoints.read_histogram(checkpoint)
+        if analyze_each_block(analyzer, output_format):
+            analyze_block(analyzer, run_histogram, run['part_configurations'], output_format)
+    elif analyzer is not None:
+        reanalyze_output(analyzer, fname, checkpoint['offset'], run['part_configurations'],
+            output_format)
+    return fidout, checkpoint['completed_simulations'], run_histogram
+
+def write_blocks(fidout, block_outputs, run, completed=0, run_histogram=None, analyzer=None,
+    checkpoint_interval=None):
+    '''Writes the outputs of simulate_block() for each of the remaining blocks of run
+    (after the first completed simulations) to fidout, or adds them to run_histogram.
+
+    Blocks are passed to analyzer as they are written (see analyze_each_block()).
+    A checkpoint is saved every checkpoint_interval seconds (never if None), and
+    if the run is interrupted.  Returns a tuple (number of simulations completed,
+    True if analyzer stopped the run).
+
+    Checkpoints only record whole blocks:  (completed, offset) is only replaced once
+    a block has been written, so an interruption part way through writing one leaves
+    it to be truncated and rewritten on resuming.  A histogram can't be rolled back
+    from part way through merging a block, so an interruption then doesn't save a
+    checkpoint and the run resumes from the last periodic one.'''
+    output_format = run['output_format']
+    profiler = profiling.get_profiler()
+    checkpoint = checkpoints.checkpoint_fname(fidout.name)
+    last_checkpoint = time.time()
+    snapshot = (completed, fidout.tell())
+    merging = False
+    try:
+        for block_output in block_outputs:
+            completed, offset = snapshot
+            completed = min(run['num_simulations'], completed + run['block_size'])
+            if output_format == 'histogram':
+                merging = True
+                with profiler.phase('merge_histogram'):
+                    run_histogram.update(block_output)
+                snapshot = (completed, offset)
+                merging = False
+            else:
+                with profiler.phase('write'):
+                    fidout.write(block_output)
+                snapshot = (completed, offset + len(block_output))
+                profiler.count('bytes_written', len(block_output))
+            if analyze_each_block(analyzer, output_format):
+                with profiler.phase('analyze'):
+                    analyze_block(analyzer, block_output, run['part_configurations'], output_format)
+                    analyzer.end_block()
+                if analyzer.should_stop():
+                    return completed, True
+            if checkpoint_interval is not None and time.time() - last_checkpoint >= checkpoint_interval:
+                with profiler.phase('checkpoint'):
+                    checkpoints.save_checkpoint(checkpoint, run, snapshot[0], fidout, snapshot[1],
+                        run_histogram)
+                last_checkpoint = time.time()
+    except KeyboardInterrupt:
+        if checkpoint_interval is not None and not merging:
+            checkpoints.save_checkpoint(checkpoint, run, snapshot[0], fidout, snapshot[1],
+                run_histogram)
+        raise
+    return snapshot[0], False
+
+def finish_output(fidout, run, run_histogram=None, analyzer=None):
+    '''Writes the merged histogram of a histogram run (passing it to analyzer if its
+    blocks weren't) and removes the run's checkpoint'''
+    if run['output_format'] == 'histogram':
+        fidout.writelines(run_histogram.gen_lines(sensormasks.sensor_names(run['part_configurations'])))
+        if analyzer is not None and not analyze_each_block(analyzer, run['output_format']):
+            analyze_block(analyzer, run_histogram, run['part_configurations'], run['output_format'])
+    checkpoints.remove_checkpoint(checkpoints.checkpoint_fname(fidout.name))
+
+def run_seed(fname, seed=None, resume=False):
+    '''Returns the seed of a run:  seed if given, else the seed of the run being
+    resumed from its checkpoint, else a new seed'''
+    if seed is not None:
+        return seed
+    if resume:
+        return checkpoints.read_checkpoint(checkpoints.checkpoint_fname(fname))['seed']
+    return streams.new_seed()
+
+def run_simulation(num_simulations, num_cycles, part_configurations, start_time=0, fname="score.csv",
+    engine='cycle', seed=None, block_size=BLOCK_SIZE, output_format='text', analyzer=None,
+    first_simulation=0, shard=None, checkpoint_interval=None, resume=False):
+    '''Runs num_simulations of a SensorNetwork of the provided
+    parts starting at time cycle_number and running for num_cycles.
+    Results are written to fname as ASCII delimited text, in the
+    resultsfile binary format if output_format is 'binary', or as a
+    histogram file if output_format is 'histogram' (the blocks' histograms
+    are merged and written once all the simulations have run).
+
+    Random numbers are derived from seed (a new seed is drawn if None, and is
+    recorded in the file header); the same seed and block_size give the same
+    results as multirun_simulation.
+
+    Each block of results is also passed to analyzer (if not None) as it is
+    written; the run stops early once analyzer.should_stop() is True.  Returns
+    the number of simulations run.
+
+    Simulations are numbered from first_simulation; to run a shard of a larger
+    run, pass the shard's first simulation (a multiple of block_size) and its
+    description (see shards.describe_shard()) for the header.
+
+    If checkpoint_interval is given, the run's progress is saved to a checkpoint
+    (see checkpoints.py) every checkpoint_interval seconds; resume=True carries on
+    an interrupted run of the same settings from its checkpoint, appending to fname.
+
+    Where the time goes is recorded in profiling.get_profiler(), if enabled.
+    '''
+    seed = run_seed(fname, seed, resume)
+    run = checkpoints.describe_run(num_simulations, num_cycles, part_configurations, start_time, seed,
+        engine, block_size, output_format, first_simulation)
+    profiler = profiling.get_profiler()
+    started = profiling.timer()
+    fidout, completed, run_histogram = open_output(fname, run, shard, analyzer, resume)
+    with fidout:
+        block_outputs = (simulate_block(task) for task in gen_tasks(num_simulations - completed,
+            num_cycles, part_configurations, start_time, engine, seed, block_size, output_format,
+            first_simulation + completed))
+        completed, stopped = write_blocks(fidout, block_outputs, run, completed, run_histogram,
+            analyzer, checkpoint_interval)
+        finish_output(fidout, run, run_histogram, analyzer)
+    profiler.add_time('run', profiling.timer() - started)
+    return completed
+
+def multirun_simulation(num_simulations, num_cycles, part_configurations, start_time=0, num_processes=None,
+    fname='mcore.csv', engine='cycle', block_size=BLOCK_SIZE, seed=None, output_format='text',
+    analyzer=None, first_simulation=0, shard=None, checkpoint_interval=None, resume=False):
+    '''Multi-process (defaults to cpu_count()) num_simulations runs of a SensorNetwork
+    of the provided parts starting at time cycle_number and running for num_cycles.
+    Each worker runs block_size simulations at a time; blocks are written in order
+    as they complete.
+
+    Results are written to fname as in run_simulation:  ASCII delimited text, the
+    resultsfile binary format or a histogram.  Random numbers are derived from
+    seed as in run_simulation, so the output doesn't depend on num_processes.
+    Blocks are passed to analyzer, shards are run, and runs are checkpointed and
+    resumed as in run_simulation.  Returns the number of simulations run.
+
+    If profiling.get_profiler() is enabled, each worker profiles its blocks and the
+    phase timings and counters are added up in it, along with the time each worker
+    spent busy.
+
+    Binary output isn't pickled back from the workers:  each worker copies its block's
+    records into a ring of shared memory slots (one per block in flight) and sends
+    back the slot number, and the records are written and analyzed straight from the
+    slot.
+    '''
+    import multiprocessing
+    if num_processes is None:
+        num_processes = multiprocessing.cpu_count()
+    seed = run_seed(fname, seed, resume)
+    run = checkpoints.describe_run(num_simulations, num_cycles, part_configurations, start_time, seed,
+        engine, block_size, output_format, first_simulation)
+    profiler = profiling.get_profiler()
+    started = profiling.timer()
+    fidout, completed, run_histogram = open_output(fname, run, shard, analyzer, resume)
+    with fidout:
+        tasks = gen_tasks(num_simulations - completed, num_cycles, part_configurations, start_time,
+            engine, seed, block_size, output_format, first_simulation + completed)
+        max_pending = 2*num_processes
+        if output_format == 'binary':
+            from multiprocessing import sharedctypes
+            import ctypes
+            slot_size = result_slot_size(block_size, part_configurations)
+            result_slots = [sharedctypes.RawArray(ctypes.c_char, slot_size) for slot in range(max_pending)]
+            worker_pool = multiprocessing.Pool(num_processes, init_worker, (result_slots,))
+            # imap_ordered() submits task i + max_pending once the output of task i is consumed
+            slot_tasks = ((idx % max_pending, task, profiler.enabled) for idx, task in enumerate(tasks))
+            block_outputs = gen_shared_outputs(imap_ordered(worker_pool, simulate_shared, slot_tasks,
+                max_pending), result_slots, profiler)
+        elif profiler.enabled:
+            worker_pool = multiprocessing.Pool(num_processes, init_worker)
+            # Each worker profiles its blocks and sends back the results with the output
+            block_outputs = gen_profiled_outputs(imap_ordered(worker_pool, profile_block, tasks,
+                max_pending), profiler)
+        else:
+            worker_pool = multiprocessing.Pool(num_processes, init_worker)
+            block_outputs = imap_ordered(worker_pool, simulate_block, tasks, max_pending)
+        try:
+            completed, stopped = write_blocks(fidout, block_outputs, run, completed, run_histogram,
+                analyzer, checkpoint_interval)
+        except KeyboardInterrupt:
+            worker_pool.terminate()
+            raise
+        if stopped:
+            # Drop the blocks still being simulated
+            worker_pool.terminate()
+        else:
+            worker_pool.close()
+        finish_output(fidout, run, run_histogram, analyzer)
+    worker_pool.join()
+    profiler.add_time('run', profiling.timer() - started)
+    return completed
+
+if __name__ == "__main__":
+    # Demonstrates the use of the module, includes a simple timing to compare single vs. multiple core
+    # usage.
+    import multiprocessing
+    multiprocessing.freeze_support()
+    import datetime
+    
+    simulations_to_run = 100000
+    resistances = [1e3, 2e3, 3e3, 4e3, 5e3]
+    mean_time_to_failure = 15.
+    part_configs = []
+    for partnum in resistances:
+        part_config = {"mttf":mean_time_to_failure,
+            "resistance":partnum}
+        part_configs.append(part_config)
+    
+    print("Starting single-core run...")
+    tstart = datetime.datetime.utcnow()
+    run_simulation(simulations_to_run, mean_time_to_failure*3,
+        part_configs)
+    tfinish = datetime.datetime.utcnow()
+    print("\n\n *** Single core time: {0} ***\n\n".format(tfinish-tstart))
+
+    print("Starting multi-core run...")
+    tstart2 = datetime.datetime.utcnow()
+    multirun_simulation(simulations_to_run, mean_time_to_failure*3,
+        part_configs)
+    tfinish2 = datetime.datetime.utcnow()
+    print("\n\n *** Multiple core time: {0} ***\n\n".format(tfinish2-tstart2))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+'''shards.py - splits a seeded run into shards that can be simulated on different
+machines, and merges the shards' results files.
+
+Shards are made of whole blocks of simulations and keep their global simulation
+numbers, so every simulation draws from the same stream it would in a single run:
+merging all the shards gives exactly the results of the unsharded run with that seed.'''
+
+import json
+import shutil
+from components import sensornetwork
+
+# Appended to a shard's results file name to give its analysis index (see
+# analysis.StreamingAnalysis.save_index)
+INDEX_SUFFIX = '.index'
+# Settings that must match for shards to belong to the same run
+RUN_SETTINGS = ('num_shards', 'total_simulations', 'num_cycles', 'seed', 'engine',
+    'block_size', 'part_configurations')
+
+def parse_shard(shard_str):
+    '''Returns a tuple (shard, number of shards) from a string 'i/k' (shards are
+    numbered from 0)'''
+    try:
+        shard, num_shards = [int(element) for element in shard_str.split('/')]
+    except ValueError:
+        raise ValueError("Shard must be given as i/k, e.g. 0/4")
+    if num_shards < 1 or not 0 <= shard < num_shards:
+        raise ValueError("Shard {0} must be between 0 and {1}".format(shard, num_shards - 1))
+    return shard, num_shards
+
+def shard_range(num_simulations, shard, num_shards, block_size=sensornetwork.BLOCK_SIZE):
+    '''Returns a tuple (first simulation, number of simulations) of shard number shard
+    of num_shards, splitting num_simulations as evenly as possible into whole blocks'''
+    num_blocks = (num_simulations + block_size - 1) // block_size
+    first_block = shard * num_blocks // num_shards
+    last_block = (shard + 1) * num_blocks // num_shards
+    first_simulation = first_block * block_size
+    return first_simulation, min(last_block * block_size, num_simulations) - first_simulation
+
+def describe_shard(shard, num_shards, num_simulations, num_cycles, part_configurations, seed,
+    engine='cycle', block_size=sensornetwork.BLOCK_SIZE):
+    '''Returns the description of a shard written to its results file header'''
+    first_simulation, shard_simulations = shard_range(num_simulations, shard, num_shards, block_size)
+    return {'shard':shard,
+        'num_shards':num_shards,
+        'first_simulation':first_simulation,
+        'num_simulations':shard_simulations,
+        'total_simulations':num_simulations,
+        'num_cycles':num_cycles,
+        'seed':seed,
+        'engine':engine,
+        'block_size':block_size,
+        'part_configurations':part_configurations}
+
+def index_fname(fname):
+    '''Returns the name of the analysis index of the shard results file fname'''
+    return fname + INDEX_SUFFIX
+
+def is_binary(fname):
+    '''Returns True if fname holds binary (not text) results'''
+    with open(fname, 'rb') as results:
+        return results.read(1) not in (b'', b'#')
+
+def read_description(fname):
+    '''Returns the shard description from the header of the results file fname'''
+    if is_binary(fname):
+        from components import resultsfile
+        header, offset = resultsfile.read_header(fname)
+        if 'shard' in header:
+            return header['shard']
+    else:
+        with open(fname, 'rb') as results:
+            for line in results:
+                if not line.startswith('#'):
+                    break
+                if line.startswith('# Shard:'):
+                    return json.loads(line.split(':', 1)[1])
+    raise IOError("{0} is not a shard results file".format(fname))
+
+def is_histogram_file(fname):
+    '''Returns True if fname holds histogram results'''
+    from components import histogram
+    return histogram.is_histogram_file(fname)
+
+def merge_histograms(shard_fnames, run, fname):
+    '''Writes the merged histograms of shard_fnames to fname (run is the description
+    of the shards' run)'''
+    from components import histogram
+    run_histogram = None
+    for shard_fname in shard_fnames:
+        shard_histogram, names = histogram.read_histogram(shard_fname)
+        if run_histogram is None:
+            run_histogram = histogram.Histogram(shard_histogram.bin_width)
+        elif shard_histogram.bin_width != run_histogram.bin_width:
+            raise ValueError("Shards have different histogram bin widths")
+        run_histogram.update(shard_histogram)
+    with open(fname, 'wb') as fidout:
+        fidout.writelines(histogram.gen_header(run['part_configurations'], run['total_simulations'],
+            run['num_cycles'], run['seed'], run_histogram.bin_width))
+        fidout.writelines(run_histogram.gen_lines(names))
+
+def check_shards(descriptions):
+    '''Checks the shard descriptions make up one complete run:  the same settings and
+    every shard present once.  Returns the descriptions in order of shard; raises
+    ValueError if they don't.'''
+    if len(descriptions) == 0:
+        raise ValueError("No shards given")
+    for setting in RUN_SETTINGS:
+        if any(description[setting] != descriptions[0][setting] for description in descriptions):
+            raise ValueError("Shards are from different runs ({0} differs)".format(setting))
+    ordered = sorted(descriptions, key=lambda description: description['shard'])
+    shard_numbers = [description['shard'] for description in ordered]
+    if shard_numbers != list(range(descriptions[0]['num_shards'])):
+        raise ValueError("Expected shards 0-{0}, found {1}".format(descriptions[0]['num_shards'] - 1,
+            ', '.join(str(shard) for shard in shard_numbers)))
+    return ordered
+
+def merge_results(shard_fnames, fname):
+    '''Combines the results files of every shard of a run into a single results file
+    fname, in the same format, identical to running all the simulations at once.
+    Returns the merged run's description.'''
+    descriptions = [read_description(shard_fname) for shard_fname in shard_fnames]
+    shard_files = dict((description['shard'], shard_fname)
+        for description, shard_fname in zip(descriptions, shard_fnames))
+    descriptions = check_shards(descriptions)
+    run = descriptions[0]
+    if is_histogram_file(shard_files[0]):
+        merge_histograms([shard_files[description['shard']] for description in descriptions], run, fname)
+        return run
+    binary = is_binary(shard_files[0])
+    if any(is_binary(shard_fname) != binary for shard_fname in shard_fnames):
+        raise ValueError("Shards must all be text or all binary")
+    with open(fname, 'wb') as fidout:
+        sensornetwork.write_header(fidout, run['total_simulations'], run['num_cycles'],
+            run['part_configurations'], run['seed'], 'binary' if binary else 'text')
+        for description in descriptions:
+            with open(shard_files[description['shard']], 'rb') as fidin:
+                if binary:
+                    from components import resultsfile
+                    header, offset = resultsfile.read_header(shard_files[description['shard']])
+                    fidin.seek(offset)
+                    shutil.copyfileobj(fidin, fidout)
+                else:
+                    for line in fidin:
+                        if not line.startswith('#'):
+                            fidout.write(line)
+    return run
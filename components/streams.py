@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+
+'''streams.py - reproducible random number streams derived from a master seed'''
+
+import hashlib
+import random
+
+def new_seed():
+    '''Returns a new master seed drawn from the OS entropy pool'''
+    return random.SystemRandom().getrandbits(63)
+
+def derive_seed(master_seed, *path):
+    '''Returns a 128-bit seed derived from master_seed and path (e.g. ('simulation', 12)).
+    Different paths give independent seeds, and the same master seed and path always give
+    the same seed regardless of which process asks for it.'''
+    key = ':'.join(str(element) for element in (master_seed,) + path)
+    return int(hashlib.sha256(key.encode('ascii')).hexdigest()[:32], 16)
+
+def simulation_random(master_seed, simulation):
+    '''Returns the random.Random stream for simulation number simulation'''
+    return random.Random(derive_seed(master_seed, 'simulation', simulation))
+
+def random_state(master_seed, *path):
+    '''Returns the NumPy RandomState stream for path (requires NumPy)'''
+    import numpy as np
+    seed = derive_seed(master_seed, *path)
+    return np.random.RandomState([(seed >> shift) & 0xffffffff for shift in (0, 32, 64, 96)])
+
+def block_random_state(master_seed, first_simulation):
+    '''Returns the NumPy RandomState stream for the block of simulations
+    starting at first_simulation (requires NumPy)'''
+    return random_state(master_seed, 'block', first_simulation)
@@ -1,67 +1,125 @@
-#!/usr/bin/env python
-
-'''wire.py - semi-realistic model of copper wire'''
-
-import math
-from components import resistor
-
-class Wire(object):
-    '''Model of Copper Wire'''
-    resistivity = 6.69e-7
-
-    def __init__(self, length, wire_gauge):
-        self.gauge = wire_gauge
-        self.length = length
-        self.diameter = 0.
-        self.nominal_resistance = 0.
-        self.resistance = 0.
-        self.maxcurrent = 0.
-        self.calc_diameter()
-        self.xsection = math.pi * math.pow(self.diameter/2, 2)
-        self.broken = False
-
-    @property
-    def broken(self):
-        '''Returns True if the wire is broken'''
-        return self._broken
-    @broken.setter
-    def broken(self, is_broken=True):
-        '''Breaks the wire - resistance goes to infinity, max current to 0'''
-        self._broken = is_broken
-        self.calc_resistance()
-        self.calc_maxcurrent()
-        
-    def get_ratio(self, gauge):
-        '''Returns the conversion factor between successive gauges.  Returns the gauge itself
-        if 0-36; returns (1-# of zeroes) if '00' ('2/0'), '000' ('3/0'), '0000' ('4/0') are given.
-        '''
-        try:        
-            if '/' in gauge:
-                n = 1 - int(gauge.split('/')[0])
-            elif int(gauge) == 0:
-                n = 1 - int(gauge.count('0'))
-            return n
-        except (TypeError, ValueError):
-            return int(gauge)
-
-    def calc_diameter(self):
-        '''Calculates the wire's diameter in inches based on its gauge'''
-        self.diameter = 0.005 * math.pow(92., (36. - self.get_ratio(self.gauge))/39.)
-
-    def calc_resistance(self):
-        '''Calculates the nominal and actual resistance of the wire'''
-        if not self.broken:
-            self.nominal_resistance = Wire.resistivity * self.length / self.xsection
-            self.resistance = resistor.Resistor(nominal_resistance = self.nominal_resistance, 
-                tolerance = 0.01).resistance
-        else:
-            self.nominal_resistance = float('inf')
-            self.resistance = float('inf')
-
-    def calc_maxcurrent(self):
-        '''Calculates the wire's current-carrying capability based on the 700 cmils / A rule of thumb'''
-        if not self.broken:
-            xsection_cmils = 4e6 * self.xsection / math.pi
-            self.maxcurrent = xsection_cmils / 700.
-        else:
-            self.maxcurrent = 0.
\ No newline at end of file
+#!/usr/bin/env python
+
+'''wire.py - semi-realistic model of copper wire'''
+
+import collections
+import itertools
+import math
+import random
+
+# Number of (length, gauge) pairs whose WireSpec is kept by wire_spec()
+SPEC_CACHE_SIZE = 64
+
+WireSpec = collections.namedtuple('WireSpec',
+    ['diameter', 'xsection', 'nominal_resistance', 'maxcurrent'])
+
+class Wire(object):
+    '''Model of Copper Wire.  The geometry, nominal resistance and max current
+    come from wire_spec(), so only the resistance within tolerance is drawn
+    for each wire.'''
+    resistivity = 6.69e-7
+    tolerance = 0.01
+
+    def __init__(self, length, wire_gauge, rng=None):
+        self.rng = rng
+        self.gauge = wire_gauge
+        self.length = length
+        self.diameter = 0.
+        self.nominal_resistance = 0.
+        self.resistance = 0.
+        self.maxcurrent = 0.
+        self.spec = wire_spec(length, wire_gauge)
+        self.diameter = self.spec.diameter
+        self.xsection = self.spec.xsection
+        self.broken = False
+
+    @property
+    def broken(self):
+        '''Returns True if the wire is broken'''
+        return self._broken
+    @broken.setter
+    def broken(self, is_broken=True):
+        '''Breaks the wire - resistance goes to infinity, max current to 0'''
+        self._broken = is_broken
+        self.calc_resistance()
+        self.calc_maxcurrent()
+        
+    def get_ratio(self, gauge):
+        '''Returns the conversion factor between successive gauges (see gauge_ratio())'''
+        return gauge_ratio(gauge)
+
+    def calc_diameter(self):
+        '''Calculates the wire's diameter in inches based on its gauge'''
+        self.diameter = gauge_diameter(self.gauge)
+
+    def calc_resistance(self):
+        '''Calculates the nominal and actual resistance of the wire'''
+        if not self.broken:
+            rng = self.rng
+            if rng is None:
+                rng = random
+            self.nominal_resistance = self.spec.nominal_resistance
+            self.resistance = rng.uniform(self.nominal_resistance * (1 - Wire.tolerance),
+                self.nominal_resistance * (1 + Wire.tolerance))
+        else:
+            self.nominal_resistance = float('inf')
+            self.resistance = float('inf')
+
+    def calc_maxcurrent(self):
+        '''Calculates the wire's current-carrying capability based on the 700 cmils / A rule of thumb'''
+        if not self.broken:
+            self.maxcurrent = self.spec.maxcurrent
+        else:
+            self.maxcurrent = 0.
+
+def gauge_ratio(gauge):
+    '''Returns the conversion factor between successive gauges.  Returns the gauge itself
+    if 0-36; returns (1-# of zeroes) if '00' ('2/0'), '000' ('3/0'), '0000' ('4/0') are given.
+    '''
+    try:        
+        if '/' in gauge:
+            n = 1 - int(gauge.split('/')[0])
+        elif int(gauge) == 0:
+            n = 1 - int(gauge.count('0'))
+        return n
+    except (TypeError, ValueError):
+        return int(gauge)
+
+def gauge_diameter(gauge):
+    '''Returns the diameter in inches of wire of the given gauge'''
+    return 0.005 * math.pow(92., (36. - gauge_ratio(gauge))/39.)
+
+# {(length, gauge):[WireSpec, last use]}
+_spec_cache = {}
+_spec_uses = itertools.count()
+
+def wire_spec(length, wire_gauge):
+    '''Returns the WireSpec (diameter, cross-section, nominal resistance and max
+    current) of an unbroken wire.  Specs of the SPEC_CACHE_SIZE most recently
+    used (length, gauge) pairs are cached, since networks reuse a few of them;
+    call clear_spec_cache() after changing Wire.resistivity.  A hit only updates
+    the entry's last use, and the least recently used entry is found when one
+    has to be evicted.'''
+    key = (length, wire_gauge)
+    entry = _spec_cache.get(key)
+    if entry is None:
+        diameter = gauge_diameter(wire_gauge)
+        xsection = math.pi * math.pow(diameter/2, 2)
+        # 700 cmils / A rule of thumb
+        xsection_cmils = 4e6 * xsection / math.pi
+        spec = WireSpec(diameter, xsection, Wire.resistivity * length / xsection,
+            xsection_cmils / 700.)
+        if len(_spec_cache) >= SPEC_CACHE_SIZE:
+            del _spec_cache[min(_spec_cache, key=lambda cached: _spec_cache[cached][1])]
+        entry = _spec_cache[key] = [spec, 0]
+    entry[1] = next(_spec_uses)
+    return entry[0]
+
+def clear_spec_cache():
+    '''Empties the cache of wire_spec()'''
+    _spec_cache.clear()
+
+def nominal_resistance(length, wire_gauge):
+    '''Returns the nominal resistance in ohms of an unbroken Wire, without
+    building one (or drawing its random resistance)'''
+    return wire_spec(length, wire_gauge).nominal_resistance
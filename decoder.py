@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+''' decoder.py - works out which sensors have failed from measured network resistances
+(requires NumPy) '''
+
+import numpy as np
+import analysis
+from components import sensormasks
+
+class FailureDecoder(object):
+    '''Decodes network resistance readings into the failed sensors most likely to
+    give them.  The resistance of every subset of intact strands (as ParallelResistance
+    would compute it) is worked out once and sorted; a reading is decoded to the
+    nearest one by ratio, using a binary search of the geometric midpoints between
+    neighbouring resistances.
+
+    If given, strand_minimum and strand_maximum (e.g. from the resistors' tolerances)
+    give each combination of failed sensors a band of readings; a reading is flagged
+    as ambiguous if it falls within more than one band, and as unexplained if it
+    falls within none.
+
+    names - the sensors' names; bit i of a failures bitmask is sensor i
+    failures - bitmask of the failed sensors of each entry of the table
+    resistances - the network resistance of each entry, in ascending order
+    '''
+    def __init__(self, strand_resistances, names=None, strand_minimum=None, strand_maximum=None):
+        strand_resistances = np.asarray(strand_resistances, dtype=np.float64)
+        num_sensors = len(strand_resistances)
+        if names is None:
+            names = [str(resistance) for resistance in strand_resistances]
+        self.names = list(names)
+        all_failed = (1 << num_sensors) - 1
+        with np.errstate(divide='ignore'):
+            resistances = 1. / analysis.subset_conductances(strand_resistances)
+        order = np.argsort(resistances, kind='mergesort')
+        self.resistances = resistances[order]
+        self.failures = (np.uint64(all_failed) ^ np.arange(1 << num_sensors, dtype=np.uint64))[order]
+        with np.errstate(invalid='ignore'):
+            self.boundaries = np.sqrt(self.resistances[1:] * self.resistances[:-1])
+        if strand_minimum is None:
+            strand_minimum = strand_maximum = strand_resistances
+        minimum, maximum = analysis.resistance_bands(np.asarray(strand_minimum, dtype=np.float64),
+            np.asarray(strand_maximum, dtype=np.float64))
+        self.band_minimum = np.sort(minimum)
+        self.band_maximum = np.sort(maximum)
+
+    @classmethod
+    def from_part_configurations(cls, part_configurations):
+        '''Returns the decoder of a network design:  nominal strand resistances, with
+        bands from the resistor and wire tolerances (as analysis.NetworkBands).  The
+        failures bitmasks are those of the sensormasks and binary results files.'''
+        from components import batchsim
+        from components import wire
+        parameters = batchsim.NetworkParameters(part_configurations)
+        nominal = parameters.resistance + parameters.wire_resistance
+        strand_minimum = (parameters.resistance * (1 - parameters.tolerance) +
+            parameters.wire_resistance * (1 - wire.Wire.tolerance))
+        strand_maximum = (parameters.resistance * (1 + parameters.tolerance) +
+            parameters.wire_resistance * (1 + wire.Wire.tolerance))
+        return cls(nominal, sensormasks.sensor_names(part_configurations), strand_minimum,
+            strand_maximum)
+
+    @classmethod
+    def from_network(cls, network, tolerance=0.):
+        '''Returns the decoder of a built sensornetwork.SensorNetwork, from its intact
+        strands' resistances (e.g. as measured), each known to within tolerance (a
+        fraction of the resistance)'''
+        strand_resistances = np.array([part.strand_resistance for part in network.parts])
+        return cls(strand_resistances, [part.name for part in network.parts],
+            strand_resistances * (1 - tolerance), strand_resistances * (1 + tolerance))
+
+    def decode(self, readings):
+        '''Decodes an array of readings in ohms.  Returns a tuple of arrays (failures
+        bitmask of the nearest combination, number of bands holding the reading):
+        more than 1 is ambiguous, 0 is outside every band.'''
+        readings = np.asarray(readings, dtype=np.float64)
+        nearest = np.searchsorted(self.boundaries, readings, side='right')
+        num_bands = (np.searchsorted(self.band_minimum, readings, side='right') -
+            np.searchsorted(self.band_maximum, readings, side='left'))
+        return self.failures[nearest], num_bands
+
+    def decode_reading(self, reading):
+        '''Returns a tuple (sorted names of the failed sensors, True if ambiguous) for
+        a single reading in ohms'''
+        failures, num_bands = self.decode([reading])
+        return self.failure_names(failures[0]), bool(num_bands[0] > 1)
+
+    def failure_names(self, mask):
+        '''Returns the sorted names of the failed sensors of bitmask mask'''
+        return sensormasks.failure_names(int(mask), self.names)
+
+def decode_file(decoder, fname, output_fname, chunk_size=1000000):
+    '''Decodes a log of readings (one reading in ohms per line; lines starting with
+    # are skipped) about chunk_size readings at a time, writing the reading, the
+    number of bands holding it and the failed sensors of each to output_fname.
+    Returns a tuple (number of readings, number ambiguous, number outside every band).'''
+    counts = [0, 0, 0]
+    names = {}
+    with open(fname, 'rb') as fidin:
+        with open(output_fname, 'wb') as fidout:
+            fidout.write("# Decoded readings\n# Sensors:  {0}\n".format(','.join(decoder.names)))
+            fidout.write("# Format:  Resistance In Ohms, Number Of Matching Bands, List of Failed Sensors\n")
+            while True:
+                lines = fidin.readlines(chunk_size * 16)
+                if not lines:
+                    break
+                readings = np.array([float(line) for line in lines
+                    if line.strip() and not line.startswith('#')])
+                failures, num_bands = decoder.decode(readings)
+                for mask in np.unique(failures).tolist():
+                    if mask not in names:
+                        names[mask] = ','.join(decoder.failure_names(mask))
+                fidout.writelines("{0!r},{1},{2}\n".format(reading, bands, names[mask])
+                    for reading, bands, mask in zip(readings.tolist(), num_bands.tolist(),
+                        failures.tolist()))
+                counts[0] += len(readings)
+                counts[1] += int(np.count_nonzero(num_bands > 1))
+                counts[2] += int(np.count_nonzero(num_bands == 0))
+    return tuple(counts)
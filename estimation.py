@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+''' estimation.py - estimates the Weibull lifetime distribution of parts from the
+cycles on which they were seen to fail (requires NumPy).
+
+Parts draw their lifetimes as mttf * Weibull(shape, scale) (see partfailure.Part), so
+the characteristic life of a part is mttf * scale.  WeibullFit finds the shape and
+characteristic life by maximum likelihood from the failure times of the parts that
+failed and the running times of the parts still intact when the test stopped (right
+censored).  WeibullFit.bootstrap() gives percentile confidence intervals from
+thousands of resamples.
+
+Failure times are cycle counts, so a test of any number of parts has only a few
+distinct (time, failed) values:  the data are kept as those values and their counts,
+a bootstrap resample is a multinomial draw of new counts, and a block of resamples is
+fitted at once by Newton's method on arrays.  Blocks are spread across a process pool,
+each drawing from its own random stream (see streams.py) so the intervals only depend
+on the seed. '''
+
+import argparse
+import csv
+import math
+import numpy as np
+from components import batchsim
+from components import instrumentedpart
+from components import sensornetwork
+from components import streams
+
+# Bootstrap resamples drawn by default
+NUM_RESAMPLES = 2000
+# Resamples fitted by each bootstrap task
+RESAMPLE_BLOCK = 250
+# Most values (resamples * distinct times) held by a bootstrap task at once
+MAX_CELLS = 1 << 20
+# Default confidence of the bootstrap intervals
+CONFIDENCE = 0.95
+# Newton's method stops once the shape changes by less than this fraction
+TOLERANCE = 1e-10
+MAX_ITERATIONS = 100
+# Parameters of a fit, in the order they're reported
+PARAMETERS = ('shape', 'characteristic_life', 'mean_life')
+
+def compress(failure_times, censored_times=()):
+    '''Returns a tuple of arrays (distinct times, True if failures, number of parts)
+    of the failure times and the running times of censored parts'''
+    failure_times = np.asarray(failure_times, dtype=np.float64)
+    censored_times = np.asarray(censored_times, dtype=np.float64)
+    times = np.concatenate((failure_times, censored_times))
+    if not np.all((times > 0) & np.isfinite(times)):
+        raise ValueError("Failure and censoring times must be positive")
+    # Times are positive, so censored times can be told apart by their sign
+    keys, counts = np.unique(np.concatenate((failure_times, -censored_times)), return_counts=True)
+    return np.abs(keys), keys > 0, counts
+
+def fit_weighted(times, failed, weights, initial_shape=1.):
+    '''Fits the Weibull distribution to each row of weights (the number of parts at each
+    of the distinct times).  Returns a tuple of arrays (shape, characteristic life) with
+    an entry per row; rows without any failures are NaN.
+
+    The likelihood is maximized over the characteristic life for a given shape, leaving
+    the shape as the root of an increasing function found by Newton's method.'''
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    # Measure log times from the longest so exp(shape * log_times) can't overflow
+    log_reference = math.log(times.max())
+    log_times = np.log(times) - log_reference
+    num_failures = weights[:, failed].sum(axis=1)
+    valid = num_failures > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        failed_log_mean = np.dot(weights[:, failed], log_times[failed]) / num_failures
+    shape = np.where(valid, initial_shape, np.nan)
+    active = valid.copy()
+    for iteration in range(MAX_ITERATIONS):
+        if not np.any(active):
+            break
+        rows = np.nonzero(active)[0]
+        row_shape = shape[rows]
+        weighted = weights[rows] * np.exp(row_shape[:, np.newaxis] * log_times)
+        total = weighted.sum(axis=1)
+        mean = np.dot(weighted, log_times) / total
+        variance = np.dot(weighted, log_times ** 2) / total - mean ** 2
+        value = mean - 1. / row_shape - failed_log_mean[rows]
+        new_shape = row_shape - value / (variance + 1. / row_shape ** 2)
+        # Newton's method can overshoot past zero from a shape far too large
+        new_shape = np.where(new_shape > 0, new_shape, row_shape / 2.)
+        shape[rows] = new_shape
+        active[rows] = np.abs(new_shape - row_shape) > TOLERANCE * new_shape
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total = (weights * np.exp(shape[:, np.newaxis] * log_times)).sum(axis=1)
+        characteristic_life = np.exp(log_reference + np.log(total / num_failures) / shape)
+    return shape, characteristic_life
+
+def mean_life(shape, characteristic_life):
+    '''Returns the mean lifetime of the Weibull distribution (arrays or numbers)'''
+    gamma = np.vectorize(lambda value: math.gamma(value) if np.isfinite(value) else np.nan,
+        otypes=[np.float64])
+    return characteristic_life * gamma(1. + 1. / np.asarray(shape, dtype=np.float64))
+
+_sample = None
+
+def set_sample(times, failed, counts):
+    '''Sets the data resampled by bootstrap_block() (also the initializer of the
+    bootstrap worker processes)'''
+    global _sample
+    _sample = (times, failed, counts)
+
+def bootstrap_block(task):
+    '''Fits a block of bootstrap resamples of the data set by set_sample().  task is a
+    tuple (seed, block number, number of resamples, initial shape); returns a tuple
+    of arrays (shape, characteristic life).'''
+    seed, block, num_resamples, initial_shape = task
+    times, failed, counts = _sample
+    random_state = streams.random_state(seed, 'bootstrap', block)
+    weights = random_state.multinomial(counts.sum(), counts / float(counts.sum()), size=num_resamples)
+    return fit_weighted(times, failed, weights, initial_shape)
+
+class WeibullFit(object):
+    '''Maximum likelihood Weibull fit of failure and right-censored running times.
+
+    shape, characteristic_life, mean_life - the estimates; the characteristic life is
+    the part configuration's mttf * scale
+    num_failures, num_censored - numbers of parts failed and still intact
+    intervals - {parameter:(lower, upper)} once bootstrap() has been run
+
+    If failures are only seen at the end of each period of resolution (e.g. 1 for
+    failure cycles read off a rig), a part seen failed at t failed somewhere after
+    t - resolution; it's taken to have failed halfway through, as taking t would
+    overstate every lifetime.
+    '''
+    def __init__(self, failure_times, censored_times=(), resolution=0.):
+        failure_times = np.asarray(failure_times, dtype=np.float64) - resolution / 2.
+        self.times, self.failed, self.counts = compress(failure_times, censored_times)
+        self.num_failures = int(self.counts[self.failed].sum())
+        self.num_censored = int(self.counts[~self.failed].sum())
+        if self.num_failures == 0:
+            raise ValueError("Can't fit a lifetime distribution without any failures")
+        shape, characteristic_life = fit_weighted(self.times, self.failed, self.counts)
+        self.shape = float(shape[0])
+        self.characteristic_life = float(characteristic_life[0])
+        self.mean_life = float(mean_life(self.shape, self.characteristic_life))
+        self.confidence = None
+        self.intervals = {}
+
+    def mttf(self, scale=instrumentedpart.DEFAULT_SCALE):
+        '''Returns the part configuration mttf giving this fit with the Weibull scale scale'''
+        return self.characteristic_life / scale
+
+    def bootstrap(self, num_resamples=NUM_RESAMPLES, confidence=CONFIDENCE, seed=None, num_processes=1):
+        '''Sets and returns the intervals holding each parameter with probability
+        confidence, from the percentiles of num_resamples bootstrap fits spread across
+        num_processes processes (None for cpu_count())'''
+        if seed is None:
+            seed = streams.new_seed()
+        block_size = max(1, min(RESAMPLE_BLOCK, MAX_CELLS // len(self.times)))
+        tasks = [(seed, block, min(block_size, num_resamples - first), self.shape)
+            for block, first in enumerate(range(0, num_resamples, block_size))]
+        if num_processes == 1:
+            set_sample(self.times, self.failed, self.counts)
+            results = [bootstrap_block(task) for task in tasks]
+        else:
+            import multiprocessing
+            worker_pool = multiprocessing.Pool(num_processes, set_sample,
+                (self.times, self.failed, self.counts))
+            try:
+                results = worker_pool.map(bootstrap_block, tasks)
+            finally:
+                worker_pool.terminate()
+                worker_pool.join()
+        shape = np.concatenate([result[0] for result in results])
+        characteristic_life = np.concatenate([result[1] for result in results])
+        estimates = {'shape':shape, 'characteristic_life':characteristic_life,
+            'mean_life':mean_life(shape, characteristic_life)}
+        tail = 50. * (1. - confidence)
+        self.confidence = confidence
+        self.intervals = dict((parameter, tuple(np.nanpercentile(estimates[parameter], [tail, 100. - tail]).tolist()))
+            for parameter in PARAMETERS)
+        return self.intervals
+
+    def summary(self):
+        '''Returns a list of lines summarizing the fit'''
+        lines = ["Weibull fit of {0} failures and {1} censored parts:".format(self.num_failures,
+            self.num_censored)]
+        for parameter in PARAMETERS:
+            line = "  {0:<20}{1:12.4g}".format(parameter, getattr(self, parameter))
+            if parameter in self.intervals:
+                line += "  ({0:.0%} interval {1:.4g} - {2:.4g})".format(self.confidence,
+                    *self.intervals[parameter])
+            lines.append(line)
+        return lines
+
+def simulated_times(num_simulations, num_cycles, part_configurations, seed=None,
+    block_size=sensornetwork.BLOCK_SIZE):
+    '''Returns a tuple of arrays (failure cycles, censored running times) of the parts of
+    num_simulations networks run for num_cycles, as a rig would see them:  each part is
+    seen failed on the first whole cycle at or after its lifetime (so fit them with a
+    resolution of 1), and the parts still intact are censored when the test stops.  The
+    lifetimes are drawn as the batch engine draws them, so with the same seed and
+    block_size they're the parts of a batch run.'''
+    if seed is None:
+        seed = streams.new_seed()
+    parameters = batchsim.NetworkParameters(part_configurations)
+    ticks = batchsim.num_ticks(num_cycles)
+    failure_times = []
+    censored_times = []
+    for first_simulation, block_simulations in sensornetwork.gen_blocks(num_simulations, block_size):
+        lifetimes = parameters.draw(block_simulations,
+            streams.block_random_state(seed, first_simulation))[0].ravel()
+        fail_cycles = np.maximum(1., np.ceil(lifetimes))
+        seen = fail_cycles <= ticks
+        failure_times.append(fail_cycles[seen])
+        censored_times.append(np.full(np.count_nonzero(~seen), float(ticks)))
+    return np.concatenate(failure_times), np.concatenate(censored_times)
+
+def network_times(network_states, end_time):
+    '''Returns a tuple of arrays (failure times, censored running times) of the sensors of
+    monitor.NetworkState objects, with the sensors not seen failed censored at end_time'''
+    failure_times = []
+    censored_times = []
+    for state in network_states:
+        for name in state.decoder.names:
+            if name in state.failure_times:
+                failure_times.append(state.failure_times[name])
+            else:
+                censored_times.append(end_time)
+    return np.array(failure_times), np.array(censored_times)
+
+def read_failures(fname, networks, end_time):
+    '''Returns a tuple of arrays (failure times, censored running times) from a file of
+    failures as saved by monitor.py (network,sensor,timestamp), given the monitored
+    networks ({network id:part configurations}); sensors without a failure are censored
+    at end_time'''
+    from components import sensormasks
+    failures = {}
+    with open(fname, 'rb') as fidin:
+        for network_id, name, timestamp in csv.reader(fidin):
+            failures.setdefault((network_id, name), []).append(float(timestamp))
+    failure_times = []
+    censored_times = []
+    for network_id, part_configurations in networks.items():
+        names = sensormasks.sensor_names(part_configurations)
+        for name in set(names):
+            # Sensors sharing a name fail in turn
+            times = sorted(failures.get((network_id, name), []))[:names.count(name)]
+            failure_times.extend(times)
+            censored_times.extend([end_time] * (names.count(name) - len(times)))
+    return np.array(failure_times), np.array(censored_times)
+
+def main():
+    '''Main entry point of the lifetime fits'''
+    import monitor
+    parser = argparse.ArgumentParser(description="Fits the Weibull lifetime distribution of parts from their failures")
+    parser.add_argument('failures', help="File of failures saved by monitor.py -o")
+    parser.add_argument('config', help="JSON file of the monitored networks (as for monitor.py)")
+    parser.add_argument('-e', '--end-time', type=float, required=True,
+        help="Timestamp at which monitoring stopped; sensors not failed by then are censored")
+    parser.add_argument('--resolution', type=float, default=0.,
+        help="Failures are only seen this often, e.g. 1 for timestamps in whole cycles")
+    parser.add_argument('-r', '--resamples', type=int, default=NUM_RESAMPLES,
+        help="Number of bootstrap resamples (default {0})".format(NUM_RESAMPLES))
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE,
+        help="Confidence of the bootstrap intervals (default {0})".format(CONFIDENCE))
+    parser.add_argument('-s', '--seed', type=int, default=None, help="Seed of the bootstrap resamples")
+    parser.add_argument('-m', '--multiprocess', action='store_true',
+        help="Spread the bootstrap across all CPUs")
+    args = parser.parse_args()
+    failure_times, censored_times = read_failures(args.failures, monitor.read_config(args.config),
+        args.end_time)
+    weibull_fit = WeibullFit(failure_times, censored_times, args.resolution)
+    if args.resamples > 0:
+        weibull_fit.bootstrap(args.resamples, args.confidence, args.seed,
+            None if args.multiprocess else 1)
+    for line in weibull_fit.summary():
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+
+''' monitor.py - watches the resistance readings of many test rigs as they arrive and
+records the timestamp at which each sensor fails (requires NumPy).
+
+Readings are lines of text
+
+    network,timestamp,resistance
+
+where network names one of the monitored sensor networks, timestamp is when the
+reading was taken (e.g. the rig's cycle count) and resistance is in ohms.  Rigs send
+them over local TCP connections or append them to log files the monitor tails; a
+single thread multiplexes every source with select(), so one core keeps up with many
+rigs.  Readings are buffered per network and decoded a batch at a time with
+decoder.FailureDecoder.  Sensors don't heal, so a sensor is recorded as failed at the
+first unambiguous reading that decodes it as failed, and unambiguous readings missing
+a sensor already seen failed are counted as inconsistent. '''
+
+import argparse
+import json
+import os
+import select
+import socket
+import sys
+import time
+import timeit
+import numpy as np
+import decoder
+from components import sensornetwork
+from components import streams
+
+# Readings of a network buffered before they're decoded
+BATCH_SIZE = 1000
+# Longest wait in seconds for a socket to have data before tailed files are checked again
+POLL_INTERVAL = 0.1
+# Bytes read from a connection or tailed file at a time
+READ_SIZE = 65536
+
+class NetworkState(object):
+    '''What is known of one monitored network.
+
+    failure_times - {sensor name:timestamp of the first reading decoding it as failed}
+    failures - bitmask of the sensors seen failed
+    num_readings, num_ambiguous, num_unexplained, num_inconsistent - counts of the
+    readings decoded, falling within more than one band, within none, and unambiguous
+    but missing a sensor already seen failed
+    '''
+    def __init__(self, network_id, failure_decoder):
+        self.network_id = network_id
+        self.decoder = failure_decoder
+        self.failure_times = {}
+        self.failures = np.uint64(0)
+        self.num_readings = 0
+        self.num_ambiguous = 0
+        self.num_unexplained = 0
+        self.num_inconsistent = 0
+
+    def add_readings(self, timestamps, readings):
+        '''Decodes a batch of readings (in order of timestamp) and returns a list of
+        (sensor name, timestamp) of the sensors newly seen failed'''
+        masks, num_bands = self.decoder.decode(readings)
+        unambiguous = num_bands == 1
+        self.num_readings += len(readings)
+        self.num_ambiguous += int(np.count_nonzero(num_bands > 1))
+        self.num_unexplained += int(np.count_nonzero(num_bands == 0))
+        # The sensors seen failed after each reading are the union of every unambiguous
+        # reading so far, so new failures are wherever the running union grows
+        seen = np.bitwise_or.accumulate(np.concatenate(([self.failures],
+            np.where(unambiguous, masks, np.uint64(0)))))
+        self.num_inconsistent += int(np.count_nonzero(unambiguous & (masks != seen[1:])))
+        failed = []
+        for idx in np.nonzero(seen[1:] != seen[:-1])[0].tolist():
+            newly_failed = int(seen[idx + 1] & ~seen[idx])
+            for bit, name in enumerate(self.decoder.names):
+                if newly_failed & (1 << bit) and name not in self.failure_times:
+                    self.failure_times[name] = timestamps[idx]
+                    failed.append((name, timestamps[idx]))
+        self.failures = seen[-1]
+        return failed
+
+    def summary(self):
+        '''Returns a line summarizing the network's readings and failures'''
+        failed = ', '.join('{0} @ {1:g}'.format(name, timestamp) for name, timestamp in
+            sorted(self.failure_times.items(), key=lambda item: item[1]))
+        return "{0}:  {1} readings ({2} ambiguous, {3} unexplained, {4} inconsistent), failed:  {5}".format(
+            self.network_id, self.num_readings, self.num_ambiguous, self.num_unexplained,
+            self.num_inconsistent, failed or 'none')
+
+class Monitor(object):
+    '''Decodes readings from every source into the failures of each network.
+
+    networks - {network id:part configurations}
+    on_failure - optional function called with (network id, sensor name, timestamp)
+    as each failure is recorded
+    states - {network id:NetworkState}
+    events - list of (network id, sensor name, timestamp) in the order recorded
+    num_malformed - number of lines skipped as unreadable or for an unknown network
+    '''
+    def __init__(self, networks, batch_size=BATCH_SIZE, on_failure=None):
+        self.states = dict((network_id, NetworkState(network_id,
+            decoder.FailureDecoder.from_part_configurations(part_configurations)))
+            for network_id, part_configurations in networks.items())
+        self.batch_size = batch_size
+        self.on_failure = on_failure
+        self.pending = dict((network_id, ([], [])) for network_id in self.states)
+        self.events = []
+        self.num_malformed = 0
+        self.listeners = []
+        self.connections = {}
+        self.tailed = {}
+
+    def listen(self, port=0, host='127.0.0.1'):
+        '''Accepts connections from rigs on host:port (port 0 picks a free port) and
+        returns the (host, port) listened on'''
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, port))
+        listener.listen(16)
+        listener.setblocking(False)
+        self.listeners.append(listener)
+        return listener.getsockname()
+
+    def tail(self, fname, from_start=True):
+        '''Reads the readings appended to the log file fname, starting from its
+        beginning if from_start is True or from its current end otherwise'''
+        fidin = open(fname, 'rb')
+        if not from_start:
+            fidin.seek(0, os.SEEK_END)
+        self.tailed[fname] = [fidin, '']
+
+    def add_data(self, data, partial=''):
+        '''Adds the readings in a chunk of data read from a source, given the partial
+        line left over from its last chunk; returns the partial line left over from this one'''
+        lines = (partial + data).split('\n')
+        for line in lines[:-1]:
+            self.add_line(line)
+        return lines[-1]
+
+    def add_line(self, line):
+        '''Adds a single reading line, decoding its network's batch once it's full'''
+        try:
+            network_id, timestamp, reading = line.split(',')
+            timestamps, readings = self.pending[network_id]
+            timestamp, reading = float(timestamp), float(reading)
+        except (ValueError, KeyError):
+            if line.strip() and not line.startswith('#'):
+                self.num_malformed += 1
+            return
+        timestamps.append(timestamp)
+        readings.append(reading)
+        if len(readings) >= self.batch_size:
+            self.flush(network_id)
+
+    def flush(self, network_id=None):
+        '''Decodes the buffered readings of network_id (or every network if None)'''
+        network_ids = list(self.pending) if network_id is None else [network_id]
+        for network_id in network_ids:
+            timestamps, readings = self.pending[network_id]
+            if readings:
+                self.pending[network_id] = ([], [])
+                for name, timestamp in self.states[network_id].add_readings(timestamps, readings):
+                    self.events.append((network_id, name, timestamp))
+                    if self.on_failure is not None:
+                        self.on_failure(network_id, name, timestamp)
+
+    def poll(self, timeout=POLL_INTERVAL):
+        '''Waits up to timeout seconds for connections or readings, reads everything
+        available from every source and decodes it.  Returns the number of bytes read.'''
+        num_bytes = 0
+        sockets = self.listeners + list(self.connections)
+        if sockets:
+            readable = select.select(sockets, [], [], timeout)[0]
+        else:
+            readable = []
+        for sock in readable:
+            if sock in self.listeners:
+                try:
+                    connection = sock.accept()[0]
+                except socket.error:
+                    continue
+                connection.setblocking(False)
+                self.connections[connection] = ''
+                continue
+            try:
+                data = sock.recv(READ_SIZE)
+            except socket.error:
+                continue
+            if data:
+                self.connections[sock] = self.add_data(data, self.connections[sock])
+                num_bytes += len(data)
+            else:
+                self.add_data('\n', self.connections.pop(sock))
+                sock.close()
+        for source in self.tailed.values():
+            data = source[0].read(READ_SIZE)
+            while data:
+                source[1] = self.add_data(data, source[1])
+                num_bytes += len(data)
+                data = source[0].read(READ_SIZE)
+        self.flush()
+        return num_bytes
+
+    def run(self, duration=None, timeout=POLL_INTERVAL):
+        '''Polls the sources until duration seconds have passed (forever if None) or
+        the monitor is interrupted'''
+        started = timeit.default_timer()
+        try:
+            while duration is None or timeit.default_timer() - started < duration:
+                if self.poll(timeout) == 0 and not self.listeners and not self.connections:
+                    # Only tailing files, so select() didn't wait for more readings
+                    time.sleep(timeout)
+        except KeyboardInterrupt:
+            pass
+        self.flush()
+
+    def close(self):
+        '''Closes every connection, listener and tailed file'''
+        for sock in self.listeners + list(self.connections):
+            sock.close()
+        for fidin, partial in self.tailed.values():
+            fidin.close()
+        self.listeners = []
+        self.connections = {}
+        self.tailed = {}
+
+    def summary(self):
+        '''Returns a list of lines summarizing each network'''
+        lines = [self.states[network_id].summary() for network_id in sorted(self.states)]
+        if self.num_malformed:
+            lines.append("{0} malformed lines skipped".format(self.num_malformed))
+        return lines
+
+class SimulatedRig(object):
+    '''Stand-in for a test rig:  a SensorNetwork for each network id, stepped through
+    cycles as in sensornetwork.simulate(), reporting every network's reading each cycle.
+    Each network draws from the random stream of its position in sorted order (see
+    streams.simulation_random) so a seeded rig is reproducible.
+
+    lifetimes - {network id:{sensor name:cycles until the part fails}}
+    '''
+    def __init__(self, networks, seed=None, start_time=0):
+        if seed is None:
+            seed = streams.new_seed()
+        self.network_ids = sorted(networks)
+        self.networks = {}
+        self.lifetimes = {}
+        for idx, network_id in enumerate(self.network_ids):
+            network = sensornetwork.SensorNetwork(networks[network_id], start_time,
+                streams.simulation_random(seed, idx), compact=True)
+            self.networks[network_id] = network
+            self.lifetimes[network_id] = dict((part.name, part.lifetime) for part in network.parts)
+        self.start_time = start_time
+        self.cycle_num = start_time
+
+    def failure_cycles(self, network_id):
+        '''Returns {sensor name:first cycle on which the rig reported it failed} of the
+        sensors failed so far'''
+        failure_cycles = {}
+        for name, lifetime in self.lifetimes[network_id].items():
+            if lifetime <= self.cycle_num:
+                failure_cycles[name] = max(self.start_time + 1, int(np.ceil(lifetime)))
+        return failure_cycles
+
+    def gen_lines(self, num_cycles):
+        '''Generator function advancing the rig num_cycles and returning a reading line
+        for every network each cycle'''
+        for cycle in range(num_cycles):
+            self.cycle_num += 1
+            for network_id in self.network_ids:
+                network = self.networks[network_id]
+                network.cycles = self.cycle_num
+                yield "{0},{1},{2!r}\n".format(network_id, self.cycle_num, network.resistance)
+
+    def write(self, fidout, num_cycles):
+        '''Advances the rig num_cycles, appending its readings to the open file fidout'''
+        fidout.writelines(self.gen_lines(num_cycles))
+        fidout.flush()
+
+    def send(self, address, num_cycles):
+        '''Advances the rig num_cycles, sending its readings to the monitor listening
+        on address (host, port)'''
+        connection = socket.create_connection(address)
+        try:
+            connection.sendall(''.join(self.gen_lines(num_cycles)))
+        finally:
+            connection.close()
+
+def read_config(fname):
+    '''Returns {network id:part configurations} from the JSON config file fname, e.g.
+    {"networks":{"rig1":{"resistances":[2e6, 3e6, 4e6, 5e6], "mttf":15}}}; each network
+    is a design as in sweep.py or a list of part configurations'''
+    import sweep
+    with open(fname, 'r') as fidin:
+        config = json.load(fidin)
+    networks = {}
+    for network_id, design in config['networks'].items():
+        if isinstance(design, dict):
+            design = sweep.build_design(design)['part_configurations']
+        networks[network_id] = design
+    return networks
+
+def main():
+    '''Main entry point of the monitor'''
+    parser = argparse.ArgumentParser(description="Records sensor failures from live rig readings")
+    parser.add_argument('config', help="JSON file of the networks to monitor")
+    parser.add_argument('-p', '--port', type=int, default=None,
+        help="Accept readings on this local TCP port")
+    parser.add_argument('-t', '--tail', action='append', default=[], metavar='LOG_FILE',
+        help="Read the readings appended to this file (may be repeated)")
+    parser.add_argument('-o', '--output', default=None,
+        help="Append each failure (network,sensor,timestamp) to this file")
+    parser.add_argument('-d', '--duration', type=float, default=None,
+        help="Stop after this many seconds (default runs until interrupted)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+        help="Readings of a network decoded at a time (default {0})".format(BATCH_SIZE))
+    args = parser.parse_args()
+    fidout = open(args.output, 'a') if args.output else None
+    def record_failure(network_id, name, timestamp):
+        line = "{0},{1},{2!r}\n".format(network_id, name, timestamp)
+        sys.stdout.write(line)
+        if fidout is not None:
+            fidout.write(line)
+            fidout.flush()
+    monitor = Monitor(read_config(args.config), args.batch_size, record_failure)
+    if args.port is not None:
+        print("Listening on {0}:{1}".format(*monitor.listen(args.port)))
+    for fname in args.tail:
+        monitor.tail(fname)
+    monitor.run(args.duration)
+    monitor.close()
+    if fidout is not None:
+        fidout.close()
+    for line in monitor.summary():
+        print(line)
+
+if __name__ == "__main__":
+    main()
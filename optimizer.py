@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+''' optimizer.py - searches for sensor resistances that keep every combination
+of failed sensors distinguishable (requires NumPy) '''
+
+import multiprocessing
+import numpy as np
+import analysis
+from components import instrumentedpart
+from components import resistor
+from components import streams
+from components import wire
+
+# Standard resistor values per decade
+ESERIES = {
+    'E6':[1.0, 1.5, 2.2, 3.3, 4.7, 6.8],
+    'E12':[1.0, 1.2, 1.5, 1.8, 2.2, 2.7, 3.3, 3.9, 4.7, 5.6, 6.8, 8.2],
+    'E24':[1.0, 1.1, 1.2, 1.3, 1.5, 1.6, 1.8, 2.0, 2.2, 2.4, 2.7, 3.0,
+        3.3, 3.6, 3.9, 4.3, 4.7, 5.1, 5.6, 6.2, 6.8, 7.5, 8.2, 9.1]
+}
+# Values per decade searched when not restricted to an E-series
+STEPS_PER_DECADE = 96
+
+def candidate_values(minimum, maximum, series=None):
+    '''Returns the sorted array of resistances between minimum and maximum ohms that may be
+    used:  the values of the named E-series, or STEPS_PER_DECADE log-spaced values per
+    decade if series is None.'''
+    first_decade = int(np.floor(np.log10(minimum)))
+    last_decade = int(np.ceil(np.log10(maximum)))
+    if series is None:
+        values = 10 ** np.linspace(first_decade, last_decade,
+            (last_decade - first_decade) * STEPS_PER_DECADE + 1)
+    else:
+        values = np.array([round(value * 10 ** decade, 1 - decade)
+            for decade in range(first_decade, last_decade + 1) for value in ESERIES[series]])
+    values = values[(values >= minimum * (1 - 1e-9)) & (values <= maximum * (1 + 1e-9))]
+    return np.unique(values)
+
+class DesignScorer(object):
+    '''Scores candidate networks by the smallest relative gap between the resistance
+    bands of their combinations of failed sensors (see analysis.band_separation).
+    Every sensor uses wire of the given length and gauge (the instrumentedpart defaults
+    if None) and resistors of resistor.DEFAULT_TOLERANCE.'''
+    def __init__(self, length=None, gauge=None):
+        if length is None:
+            length = instrumentedpart.DEFAULT_LENGTH
+        if gauge is None:
+            gauge = instrumentedpart.DEFAULT_GAUGE
+        self.tolerance = resistor.DEFAULT_TOLERANCE
+        self.wire_resistance = wire.nominal_resistance(length, gauge)
+
+    def score(self, resistances):
+        '''Returns the separation of each candidate network, given an array of shape
+        (number of candidates, number of sensors) of nominal resistances'''
+        strand_minimum = (resistances * (1 - self.tolerance) +
+            self.wire_resistance * (1 - wire.Wire.tolerance))
+        strand_maximum = (resistances * (1 + self.tolerance) +
+            self.wire_resistance * (1 + wire.Wire.tolerance))
+        minimum, maximum = analysis.resistance_bands(strand_minimum, strand_maximum)
+        return analysis.band_separation(minimum, maximum)
+
+def local_search(values, num_sensors, scorer, random_state, max_rounds=50):
+    '''Starting from a random choice of values, repeatedly replaces one sensor at a time
+    with whichever value scores best until no single change helps.  Returns a tuple
+    (separation, resistances).'''
+    design = np.sort(random_state.choice(values, size=num_sensors, replace=False))
+    best_score = float(scorer.score(design[np.newaxis, :])[0])
+    for search_round in range(max_rounds):
+        improved = False
+        for sensor in range(num_sensors):
+            candidates = np.repeat(design[np.newaxis, :], len(values), axis=0)
+            candidates[:, sensor] = values
+            scores = scorer.score(candidates)
+            best = int(np.argmax(scores))
+            if scores[best] > best_score:
+                best_score = float(scores[best])
+                design = candidates[best]
+                improved = True
+        if not improved:
+            break
+    return best_score, np.sort(design).tolist()
+
+def run_search(task):
+    '''Runs one local search.  task is a tuple (restart number, num_sensors, minimum,
+    maximum, series, seed, length, gauge).'''
+    restart, num_sensors, minimum, maximum, series, seed, length, gauge = task
+    random_state = streams.random_state(seed, 'optimizer', restart)
+    values = candidate_values(minimum, maximum, series)
+    return local_search(values, num_sensors, DesignScorer(length, gauge), random_state)
+
+def optimize(num_sensors, minimum=1e3, maximum=1e7, series=None, restarts=32, num_processes=None,
+    seed=None, length=None, gauge=None):
+    '''Searches for num_sensors nominal resistances between minimum and maximum ohms (from
+    the named E-series if given) that maximize the separation between the resistance bands
+    of every combination of failed sensors.  Runs restarts independent local searches
+    across num_processes processes (defaults to cpu_count(); 1 runs in this process).
+    Returns a tuple (separation, resistances) of the best design found; a negative
+    separation means no design without overlapping bands was found.'''
+    if len(candidate_values(minimum, maximum, series)) < num_sensors:
+        raise ValueError("Not enough resistor values between {0} and {1} ohms".format(minimum, maximum))
+    if seed is None:
+        seed = streams.new_seed()
+    tasks = [(restart, num_sensors, minimum, maximum, series, seed, length, gauge)
+        for restart in range(restarts)]
+    if num_processes == 1:
+        results = [run_search(task) for task in tasks]
+    else:
+        if num_processes is None:
+            num_processes = multiprocessing.cpu_count()
+        worker_pool = multiprocessing.Pool(num_processes)
+        results = worker_pool.map(run_search, tasks)
+        worker_pool.close()
+        worker_pool.join()
+    return max(results)
+
+def build_part_configs(resistances, mttf, length=None, gauge=None):
+    '''Returns the part configurations of a design, ready for use in break_detector'''
+    part_configs = []
+    for resistance in resistances:
+        part_config = {"mttf":mttf, "resistance":resistance}
+        if length is not None:
+            part_config["length"] = length
+        if gauge is not None:
+            part_config["gauge"] = gauge
+        part_configs.append(part_config)
+    return part_configs
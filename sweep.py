@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+''' sweep.py - simulates and analyzes many network designs in one job.  The designs
+are read from a JSON config file, e.g.
+
+    {"designs":[{"name":"baseline", "resistances":[2e6, 3e6, 4e6, 5e6], "mttf":15}],
+     "grid":{"resistances":[[1e3, 2e3, 3e3], [1e3, 3e3, 9e3]], "mttf":[15, 30],
+        "shape":[1.5, 3], "gauge":[24, 30]}}
+
+Each entry of "designs" gives the resistances and (optionally) the mttf, Weibull
+shape and scale, wire gauge and length shared by its sensors, or a complete list of
+"part_configurations"; "grid" adds a design for every combination of the listed
+values.  A design may also set its "num_cycles" (defaults to 3 * mttf).
+
+Every block of simulations of every design is run on one worker pool, and each
+design's results are analyzed as they arrive; only the summary is kept. '''
+
+import csv
+import itertools
+import json
+import multiprocessing
+import analysis
+from components import sensornetwork
+from components import streams
+
+# Design parameters shared by every sensor of a design, in the order they're named
+PART_PARAMETERS = ('mttf', 'shape', 'scale', 'gauge', 'length')
+# Columns of the summary table
+SUMMARY_FIELDS = ('design', 'sensors', 'num_cycles', 'simulations', 'readings',
+    'distinct_readings', 'combinations', 'obvious_collisions', 'collisions', 'seed')
+
+def expand_grid(grid):
+    '''Returns a design for every combination of the values listed in grid'''
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*[grid[name] for name in names])]
+
+def design_name(design):
+    '''Returns a name for a design without one, from its parameters'''
+    elements = ['/'.join('{0:g}'.format(resistance) for resistance in design['resistances'])]
+    elements.extend('{0}={1:g}'.format(parameter, design[parameter])
+        for parameter in PART_PARAMETERS if design.get(parameter) is not None)
+    return ' '.join(elements)
+
+def build_design(design):
+    '''Returns the design (from a config file) with its name, part_configurations and
+    num_cycles filled in'''
+    design = dict(design)
+    if 'part_configurations' not in design:
+        if 'resistances' not in design or 'mttf' not in design:
+            raise ValueError("Designs need resistances and an mttf, or part_configurations")
+        design['part_configurations'] = []
+        for resistance in design['resistances']:
+            part_config = {'resistance':resistance}
+            for parameter in PART_PARAMETERS:
+                if design.get(parameter) is not None:
+                    part_config[parameter] = design[parameter]
+            design['part_configurations'].append(part_config)
+        design.setdefault('name', design_name(design))
+    design.setdefault('name', 'design')
+    if design.get('num_cycles') is None:
+        design['num_cycles'] = 3 * max(part_config['mttf'] for part_config in design['part_configurations'])
+    return design
+
+def read_config(fname):
+    '''Returns the list of designs in the JSON sweep config file fname'''
+    with open(fname, 'r') as fidin:
+        config = json.load(fidin)
+    designs = list(config.get('designs', []))
+    if 'grid' in config:
+        designs.extend(expand_grid(config['grid']))
+    if len(designs) == 0:
+        raise ValueError("{0} doesn't list any designs".format(fname))
+    return [build_design(design) for design in designs]
+
+def design_seed(seed, design):
+    '''Returns the seed of design number design of a sweep seeded with seed; running
+    the design alone with this seed gives the same results'''
+    return streams.derive_seed(seed, 'design', design) >> 65
+
+def gen_sweep_tasks(designs, num_simulations, seed, engine='cycle', block_size=sensornetwork.BLOCK_SIZE):
+    '''Generator function returning a tuple (design number, sensornetwork.simulate_block()
+    task) for every block of every design'''
+    output_format = 'binary' if engine == 'batch' else 'text'
+    for design_number, design in enumerate(designs):
+        for task in sensornetwork.gen_tasks(num_simulations, design['num_cycles'],
+            design['part_configurations'], 0, engine, design_seed(seed, design_number), block_size,
+            output_format):
+            yield design_number, task
+
+def run_sweep_task(sweep_task):
+    '''Runs a task of gen_sweep_tasks() and returns a tuple (design number, output)'''
+    design_number, task = sweep_task
+    return design_number, sensornetwork.simulate_block(task)
+
+def summarize(design, analyzer, num_simulations, seed):
+    '''Returns the summary row of a design, given its analysis'''
+    return {'design':design['name'],
+        'sensors':len(design['part_configurations']),
+        'num_cycles':design['num_cycles'],
+        'simulations':num_simulations,
+        'readings':analyzer.num_readings,
+        'distinct_readings':len(analyzer.pairs),
+        'combinations':len(analyzer.counts),
+        'obvious_collisions':len(analyzer.obvious_collisions),
+        'collisions':len(analyzer.collisions),
+        'seed':seed}
+
+def run_sweep(designs, num_simulations, seed=None, engine='cycle', threshold=0.1, num_processes=None,
+    block_size=sensornetwork.BLOCK_SIZE):
+    '''Runs num_simulations of every design across num_processes processes (defaults
+    to cpu_count(); 1 runs in this process) and returns a list of their summary rows
+    (see summarize()), in order of design.  Collisions are called within threshold
+    as in analysis.StreamingAnalysis.'''
+    if seed is None:
+        seed = streams.new_seed()
+    analyzers = [analysis.StreamingAnalysis(threshold) for design in designs]
+    output_format = 'binary' if engine == 'batch' else 'text'
+    tasks = gen_sweep_tasks(designs, num_simulations, seed, engine, block_size)
+    if num_processes == 1:
+        results = (run_sweep_task(task) for task in tasks)
+    else:
+        if num_processes is None:
+            num_processes = multiprocessing.cpu_count()
+        worker_pool = multiprocessing.Pool(num_processes, sensornetwork.init_worker)
+        results = sensornetwork.imap_ordered(worker_pool, run_sweep_task, tasks, 2*num_processes)
+    try:
+        for design_number, block_output in results:
+            sensornetwork.analyze_block(analyzers[design_number], block_output,
+                designs[design_number]['part_configurations'], output_format)
+    except:
+        # Stop the workers if a task, the analysis or Ctrl-C ends the sweep early
+        if num_processes != 1:
+            worker_pool.terminate()
+            worker_pool.join()
+        raise
+    if num_processes != 1:
+        worker_pool.close()
+        worker_pool.join()
+    return [summarize(design, analyzer, num_simulations, design_seed(seed, design_number))
+        for design_number, (design, analyzer) in enumerate(zip(designs, analyzers))]
+
+def write_summary(summaries, fname):
+    '''Writes the summary rows to fname as comma-delimited text'''
+    with open(fname, 'wb') as fidout:
+        writer = csv.DictWriter(fidout, SUMMARY_FIELDS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(summaries)
+
+def format_summary(summaries):
+    '''Returns the summary rows as a list of lines of an aligned table'''
+    columns = ('design', 'readings', 'distinct_readings', 'combinations', 'obvious_collisions',
+        'collisions')
+    rows = [columns] + [tuple(str(summary[column]) for column in columns) for summary in summaries]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(columns))]
+    return ['  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows]
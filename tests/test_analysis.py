@@ -1,54 +1,215 @@
-#!/usr/bin/env python
-
-'''test_analysis.py - tests the Analysis class'''
-
-import unittest
-import analysis
-import os.path
-import sys
-
-class TestAnalysis(unittest.TestCase):
-    '''Tests the Analysis class'''
-    def setUp(self):
-        self.sample_file = os.path.join(sys.path[0],
-            "results.csv")
-        self.threshold = 0.1
-        self.analyzer = analysis.Analysis(self.sample_file, self.threshold)
-
-    def test_badinitnofile(self):
-        '''Verify exception if no filename provided'''
-        with self.assertRaises(TypeError):
-            analyzer = analysis.Analysis()
-
-    def test_init(self):
-        '''Verify creation of Analysis class'''
-        analyzer = analysis.Analysis(self.sample_file, self.threshold)
-        self.assertEqual(self.sample_file, analyzer.results_fn)
-        self.assertEqual(self.threshold, analyzer.threshold)
-        self.assertDictEqual({}, analyzer.resistances)
-
-    def test_checknoresultsfile(self):
-        '''Verify IOError raised if sim file not found'''
-        sim = os.path.join(sys.path[0],
-            "no_such_simulation_file.csv")
-        analyzer = analysis.Analysis(sim)
-        with self.assertRaises(IOError):
-            collisions = analyzer.check_obvious_collisions()
-
-    def test_check_obviousgoodresults(self):
-        '''Verify that a known good simulation run (no collisions)
-        checks out as ok with check_obvious_collisions()'''
-        known_good_sim = os.path.join(sys.path[0],
-            "known_good.csv")
-        analyzer = analysis.Analysis(known_good_sim)
-        collisions = analyzer.check_obvious_collisions()
-        self.assertTrue(len(collisions)==0)
-
-    def test_check_obviousbadresults(self):
-        '''Verify that a known bad simulation run (collisions)
-        checks out as not ok with check_obvious_collisions()'''
-        known_bad_sim = os.path.join(sys.path[0],
-            "known_collisions.csv")
-        analyzer = analysis.Analysis(known_bad_sim)
-        collisions = analyzer.check_obvious_collisions()
-        self.assertTrue(len(collisions)>0)
\ No newline at end of file
+#!/usr/bin/env python
+
+'''test_analysis.py - tests the Analysis class'''
+
+import unittest
+import analysis
+import os.path
+import random
+import sys
+import tempfile
+
+class TestAnalysis(unittest.TestCase):
+    '''Tests the Analysis class'''
+    def setUp(self):
+        self.sample_file = os.path.join(sys.path[0],
+            "results.csv")
+        self.threshold = 0.1
+        self.analyzer = analysis.Analysis(self.sample_file, self.threshold)
+
+    def test_badinitnofile(self):
+        '''Verify exception if no filename provided'''
+        with self.assertRaises(TypeError):
+            analyzer = analysis.Analysis()
+
+    def test_init(self):
+        '''Verify creation of Analysis class'''
+        analyzer = analysis.Analysis(self.sample_file, self.threshold)
+        self.assertEqual(self.sample_file, analyzer.results_fn)
+        self.assertEqual(self.threshold, analyzer.threshold)
+        self.assertDictEqual({}, analyzer.resistances)
+
+    def test_checknoresultsfile(self):
+        '''Verify IOError raised if sim file not found'''
+        sim = os.path.join(sys.path[0],
+            "no_such_simulation_file.csv")
+        analyzer = analysis.Analysis(sim)
+        with self.assertRaises(IOError):
+            collisions = analyzer.check_obvious_collisions()
+
+    def test_check_obviousgoodresults(self):
+        '''Verify that a known good simulation run (no collisions)
+        checks out as ok with check_obvious_collisions()'''
+        known_good_sim = os.path.join(sys.path[0],
+            "known_good.csv")
+        analyzer = analysis.Analysis(known_good_sim)
+        collisions = analyzer.check_obvious_collisions()
+        self.assertTrue(len(collisions)==0)
+
+    def test_check_obviousbadresults(self):
+        '''Verify that a known bad simulation run (collisions)
+        checks out as not ok with check_obvious_collisions()'''
+        known_bad_sim = os.path.join(sys.path[0],
+            "known_collisions.csv")
+        analyzer = analysis.Analysis(known_bad_sim)
+        collisions = analyzer.check_obvious_collisions()
+        self.assertTrue(len(collisions)>0)
+
+    def test_check_collisions(self):
+        '''Verify check_collisions() flags different failure combinations within
+        the tolerance of each other'''
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy not installed")
+        sim = os.path.join(tempfile.gettempdir(), "tolerance.csv")
+        with open(sim, 'wb') as results:
+            results.writelines(["# Monte Carlo Simulation Results\n",
+                "0,1000.0,\n", "0,1500.0,a\n", "1,1005.0,\n", "1,1540.0,b\n",
+                "2,3000.0,a,b\n", "3,3000.0,b,a\n"])
+        collisions = analysis.Analysis(sim, threshold=0.05).check_collisions()
+        self.assertEqual(collisions, {'1500.0':(['a'], ['b'])})
+        collisions = analysis.Analysis(sim, threshold=0.01).check_collisions()
+        self.assertEqual(len(collisions), 0)
+        collisions = analysis.Analysis(sim, threshold=0.5).check_collisions()
+        self.assertTrue('1005.0' in collisions)
+        combination_names = analysis.Analysis(sim).distinct_readings()[2]
+        self.assertEqual(sorted(combination_names.values()), [[], ['a'], ['a', 'b'], ['b']])
+        os.remove(sim)
+
+    def test_headerless_results(self):
+        '''Verify text results without a header are read as text'''
+        sim = os.path.join(tempfile.gettempdir(), "headerless.csv")
+        try:
+            with open(sim, 'wb') as results:
+                results.write("0,10.5,A\n1,10.5,B")
+            analyzer = analysis.Analysis(sim)
+            self.assertFalse(analyzer.is_binary())
+            self.assertEqual(analyzer.check_obvious_collisions(), {'10.5':(['A'], ['B'])})
+        finally:
+            os.remove(sim)
+
+class TestStreamingAnalysis(unittest.TestCase):
+    '''Tests the StreamingAnalysis class'''
+    def test_obvious_collisions(self):
+        '''Verify a reading from two combinations is an obvious collision'''
+        analyzer = analysis.StreamingAnalysis(threshold=0.)
+        analyzer.add_lines(["# Monte Carlo Simulation Results\n", "0,1000.0,\n",
+            "0,1500.0,a\n", "1,1500.0,a\n", "2,1500.0,b\n", "3,3000.0,b,a\n", "4,3000.0,a,b\n"])
+        self.assertEqual(analyzer.obvious_collisions, {'1500.0':(['a'], ['b'])})
+        self.assertEqual(analyzer.counts[('a', 'b')], 2)
+        self.assertEqual(analyzer.counts[()], 1)
+        self.assertEqual(len(analyzer.collisions), 0)
+
+    def test_collisions(self):
+        '''Verify readings within the tolerance of each other are collisions'''
+        lines = ["0,1000.0,\n", "0,1500.0,a\n", "1,1005.0,\n", "1,1540.0,b\n", "2,3000.0,a,b\n"]
+        analyzer = analysis.StreamingAnalysis(threshold=0.05)
+        analyzer.add_lines(lines)
+        self.assertEqual(analyzer.collisions, {(('a',), ('b',)):(1500., 1540.)})
+        analyzer = analysis.StreamingAnalysis(threshold=0.01)
+        analyzer.add_lines(lines)
+        self.assertEqual(len(analyzer.collisions), 0)
+        self.assertFalse(analyzer.found_collisions())
+
+    def test_matches_pairwise(self):
+        '''Verify the bucketed check finds the same colliding combinations as
+        comparing every pair of readings'''
+        rng = random.Random(3)
+        threshold = 0.1
+        readings = [(round(rng.uniform(100., 300.), 1), rng.choice(['', 'a', 'b', 'c']))
+            for reading in range(300)]
+        analyzer = analysis.StreamingAnalysis(threshold)
+        analyzer.add_lines(["0,{0},{1}\n".format(*reading) for reading in readings])
+        expected = set()
+        for lower, lower_failure in readings:
+            for upper, upper_failure in readings:
+                if lower_failure != upper_failure and lower <= upper <= lower * (1 + threshold):
+                    expected.add(frozenset([lower_failure, upper_failure]))
+        actual = set(frozenset(name for failures in pair for name in failures or ('',))
+            for pair in analyzer.collisions)
+        self.assertEqual(actual, expected)
+
+    def test_stop_on_collision(self):
+        '''Verify the analysis only asks to stop once a collision is found'''
+        analyzer = analysis.StreamingAnalysis(threshold=0.1, stop_on_collision=True)
+        analyzer.add_lines(["0,1000.0,\n", "0,2000.0,a\n"])
+        self.assertFalse(analyzer.should_stop())
+        analyzer.add_lines(["1,1050.0,b\n"])
+        self.assertTrue(analyzer.should_stop())
+
+class TestConvergence(unittest.TestCase):
+    '''Tests the adaptive stopping rule'''
+    def test_patience(self):
+        '''Verify a run converges after patience blocks without new combinations
+        or band growth'''
+        analyzer = analysis.StreamingAnalysis(threshold=0.1,
+            convergence=analysis.Convergence(patience=2, band_growth=0.01))
+        analyzer.add_lines(["0,1000.0,\n", "0,2000.0,a\n"])
+        analyzer.end_block()
+        self.assertFalse(analyzer.should_stop())
+        # Growth of less than band_growth doesn't count
+        analyzer.add_lines(["1,1005.0,\n", "1,2001.0,a\n"])
+        analyzer.end_block()
+        self.assertFalse(analyzer.should_stop())
+        # A wider band starts the count again
+        analyzer.add_lines(["2,1100.0,\n"])
+        analyzer.end_block()
+        analyzer.end_block()
+        self.assertFalse(analyzer.should_stop())
+        analyzer.end_block()
+        self.assertTrue(analyzer.should_stop())
+        self.assertEqual(analyzer.convergence.bands[()], [1000., 1100.])
+
+    def test_new_combination(self):
+        '''Verify a new combination of failed sensors starts the count again'''
+        convergence = analysis.Convergence(patience=1)
+        convergence.add_reading(1000., ())
+        self.assertFalse(convergence.end_block({():1}, 1))
+        convergence.add_reading(2000., ('a',))
+        self.assertFalse(convergence.end_block({():1, ('a',):1}, 2))
+        self.assertTrue(convergence.end_block({():1, ('a',):1}, 2))
+
+    def test_confidence(self):
+        '''Verify a run converges once combinations seen only once are rare enough'''
+        convergence = analysis.Convergence(patience=10, confidence=0.9)
+        convergence.add_reading(1000., ())
+        convergence.add_reading(2000., ('a',))
+        self.assertAlmostEqual(convergence.unseen_probability({():9, ('a',):1}, 10), 0.1)
+        self.assertFalse(convergence.end_block({():9, ('a',):1}, 10))
+        self.assertTrue(convergence.end_block({():19, ('a',):1}, 20))
+
+class TestNetworkBands(unittest.TestCase):
+    '''Tests the analytic NetworkBands check'''
+    def setUp(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy not installed")
+
+    def part_configs(self, resistances):
+        '''Returns part configurations for the given resistances'''
+        return [{'mttf':15., 'resistance':resistance} for resistance in resistances]
+
+    def test_bands(self):
+        '''Verify a band is computed for every combination of failed sensors'''
+        bands = analysis.NetworkBands(self.part_configs([1e3, 2e3, 3e3]))
+        self.assertEqual(len(bands.failures), 8)
+        self.assertTrue((bands.minimum <= bands.maximum).all())
+        all_failed = list(bands.failures).index(7)
+        self.assertEqual(bands.minimum[all_failed], float('inf'))
+        none_failed = list(bands.failures).index(0)
+        self.assertEqual(bands.failure_names(none_failed), [])
+        self.assertAlmostEqual(bands.minimum[none_failed], 1/(1/1e3 + 1/2e3 + 1/3e3),
+            delta=0.06*bands.minimum[none_failed])
+
+    def test_overlaps(self):
+        '''Verify overlapping bands are reported and widely spaced designs pass'''
+        bands = analysis.NetworkBands(self.part_configs([1e3, 2e3, 3e3, 4e3, 5e3]))
+        overlaps = bands.overlaps()
+        self.assertTrue(len(overlaps) > 0)
+        for lower_band, upper_band in overlaps:
+            self.assertTrue(bands.minimum[upper_band] <= bands.maximum[lower_band])
+            self.assertTrue(bands.minimum[lower_band] <= bands.minimum[upper_band])
+        bands = analysis.NetworkBands(self.part_configs([1e3, 3e3]))
+        self.assertEqual(bands.overlaps(), [])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+
+'''test_batchsim.py - tests the vectorized batch simulation engine'''
+
+import unittest
+from components import sensormasks
+from components import sensornetwork
+try:
+    import numpy as np
+    from components import batchsim
+except ImportError:
+    np = None
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class TestBatchSim(unittest.TestCase):
+    '''Unit tests for batchsim'''
+    def setUp(self):
+        self.mean_time_to_failure = 15.
+        self.resistances = [1e3, 2e3, 3e3, 4e3, 5e3]
+        self.part_configs = []
+        for resistance in self.resistances:
+            part_config = {'mttf':self.mean_time_to_failure,
+                'resistance':resistance}
+            self.part_configs.append(part_config)
+
+    def test_parameters(self):
+        '''Verify part configurations are converted to arrays'''
+        parameters = batchsim.NetworkParameters(self.part_configs)
+        self.assertEqual(parameters.num_parts, len(self.resistances))
+        self.assertEqual(parameters.names, [str(resistance) for resistance in self.resistances])
+        lifetimes, strand_resistances = parameters.draw(100)
+        self.assertEqual(lifetimes.shape, (100, len(self.resistances)))
+        self.assertTrue(np.all(strand_resistances >= parameters.resistance * 0.95))
+
+    def test_matches_simulate(self):
+        '''Verify the batch engine gives the same status log as stepping a
+        SensorNetwork through every cycle'''
+        for start_time, num_cycles in [(0, 3*self.mean_time_to_failure), (0, 12.5), (5, 20)]:
+            for trial in range(20):
+                network = sensornetwork.SensorNetwork(self.part_configs, start_time)
+                lifetimes = np.array([[part.lifetime for part in network.parts]])
+                strand_resistances = np.array([[part.resistance for part in network.parts]])
+                names = [part.name for part in network.parts]
+                cycle_num = start_time
+                while not network.complete() and cycle_num < num_cycles:
+                    network.cycles += 1
+                    cycle_num += 1
+                result = batchsim.evaluate(lifetimes, strand_resistances, num_cycles, start_time)
+                self.assertDictEqual(result.status_logs(names)[0], network.status_log)
+
+    def test_simulate_batch(self):
+        '''Verify a batch returns one status log per simulation'''
+        sim_results = batchsim.simulate_batch(50, 3*self.mean_time_to_failure, self.part_configs)
+        self.assertEqual(len(sim_results), 50)
+        names = set(str(resistance) for resistance in self.resistances)
+        for sim_result in sim_results:
+            for key, failures_str in sim_result.items():
+                float(key)
+                if failures_str != '':
+                    self.assertTrue(set(failures_str.split(',')).issubset(names))
+
+    def test_replay_simulation(self):
+        '''Verify a simulation of a seeded batch run can be replayed'''
+        simulation_runs = list(sensornetwork.gen_runs(25, 3*self.mean_time_to_failure,
+            self.part_configs, engine='batch', seed=11, block_size=10))
+        replayed = sensornetwork.replay_simulation(13, 3*self.mean_time_to_failure,
+            self.part_configs, seed=11, engine='batch', block_size=10)
+        self.assertDictEqual(simulation_runs[13], replayed)
+
+    def test_records(self):
+        '''Verify the batch records hold the same readings as the status logs'''
+        parameters = batchsim.NetworkParameters(self.part_configs)
+        lifetimes, strand_resistances = parameters.draw(40)
+        result = batchsim.evaluate(lifetimes, strand_resistances, 3*self.mean_time_to_failure)
+        records = result.records(first_simulation=100)
+        expected = []
+        for simulation, status_log in enumerate(result.status_logs(parameters.names)):
+            for reading, failures in status_log.items():
+                expected.append((simulation + 100, float(reading),
+                    tuple(sorted(failures.split(','))) if failures else ()))
+        actual = [(simulation, resistance, tuple(sensormasks.failure_names(mask, parameters.names)))
+            for simulation, resistance, mask in records.tolist()]
+        self.assertEqual(sorted(actual), sorted(expected))
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+'''test_benchmarks.py - tests the benchmark suite'''
+
+import unittest
+import benchmarks
+
+class TestBenchmarks(unittest.TestCase):
+    '''Tests the benchmarks module'''
+    @classmethod
+    def setUpClass(cls):
+        cls.benchmarks = benchmarks.run_benchmarks(engines=['cycle', 'event'], sensor_counts=[3],
+            mttfs=[5.], simulation_counts=[20], num_processes=1, num_calls=10,
+            startup_runs=1)
+
+    def test_results(self):
+        '''Verify every benchmark reports a rate for each point of the sweep'''
+        names = set(entry['benchmark'] for entry in self.benchmarks['results'])
+        self.assertEqual(names, set(['startup', 'ParallelResistance', 'SensorNetwork', 'Part', 'Strand', 'simulate',
+            'run_simulation', 'multirun_simulation', 'check_obvious_collisions', 'streaming_analysis']))
+        for entry in self.benchmarks['results']:
+            self.assertTrue(entry['rate'] > 0)
+        self.assertTrue('python' in self.benchmarks['machine'])
+
+    def test_compare(self):
+        '''Verify results are matched to the baseline by their parameters'''
+        baseline = {'results':[dict(entry, rate=entry['rate'] * 2)
+            for entry in self.benchmarks['results']]}
+        comparisons = benchmarks.compare_results(baseline, self.benchmarks)
+        self.assertEqual(len(comparisons), len(self.benchmarks['results']))
+        for entry, ratio, regression in comparisons:
+            self.assertAlmostEqual(ratio, 0.5)
+            self.assertTrue(regression)
+
+    def test_startup_modules(self):
+        '''Verify break_detector doesn't load modules only some modes need at startup'''
+        self.assertEqual(benchmarks.startup_modules(), [])
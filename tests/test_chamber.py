@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+
+'''test_chamber.py - tests the chamber simulation'''
+
+import unittest
+import os
+import os.path
+import tempfile
+from components import sensornetwork
+try:
+    import numpy as np
+    import chamber
+except ImportError:
+    np = None
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class TestChamber(unittest.TestCase):
+    '''Unit tests for chamber'''
+    def setUp(self):
+        self.part_configs = [{'mttf':15., 'resistance':resistance}
+            for resistance in [1e3, 2e3, 4e3, 8e3]]
+
+    def test_matches_networks(self):
+        '''Verify each network's readings are those of stepping a SensorNetwork through
+        every cycle'''
+        networks = [sensornetwork.SensorNetwork(self.part_configs) for network in range(30)]
+        parts = [sorted(network.parts, key=lambda part: part.name) for network in networks]
+        lifetimes = np.array([[part.lifetime for part in network_parts] for network_parts in parts])
+        strand_resistances = np.array([[part.strand_resistance for part in network_parts]
+            for network_parts in parts])
+        result = chamber.run_chamber(lifetimes, strand_resistances, 20, self.part_configs)
+        for network_number, network in enumerate(networks):
+            readings = []
+            for cycle in range(1, 21):
+                network.cycles = cycle
+                failed = sorted(part.name for part in network.failures())
+                if not readings or readings[-1][2] != failed:
+                    readings.append((cycle, network.resistance, failed))
+                if network.complete():
+                    break
+            rows = result.columns['network'] == network_number
+            actual = [(cycle, resistance, sorted(result.names[bit] for bit in range(4) if mask & (1 << bit)))
+                for cycle, resistance, mask in zip(result.columns['cycle'][rows].tolist(),
+                    result.columns['resistance'][rows].tolist(), result.columns['failures'][rows].tolist())]
+            self.assertEqual([(cycle, failed) for cycle, resistance, failed in actual],
+                [(cycle, failed) for cycle, resistance, failed in readings])
+            for (cycle, resistance, failed), reading in zip(actual, readings):
+                self.assertAlmostEqual(resistance, reading[1])
+            if network.complete():
+                self.assertEqual(result.complete_cycle[network_number], readings[-1][0])
+            else:
+                self.assertEqual(result.complete_cycle[network_number], np.inf)
+
+    def test_decoded(self):
+        '''Verify networks are only fully decoded once complete, if every reading was unambiguous'''
+        result = chamber.simulate_chamber(2000, 45, self.part_configs, seed=4)
+        self.assertEqual(result.num_networks, 2000)
+        for network in range(result.num_networks):
+            rows = result.columns['network'] == network
+            if np.all(result.columns['num_bands'][rows] == 1):
+                self.assertEqual(result.decoded_cycle[network], result.complete_cycle[network])
+            else:
+                self.assertEqual(result.decoded_cycle[network], np.inf)
+        num_decoded = int(np.count_nonzero(np.isfinite(result.decoded_cycle)))
+        self.assertTrue(0 < num_decoded < 2000)
+        cycles, counts = result.decoded_curve()
+        self.assertEqual(counts[-1], num_decoded)
+        self.assertEqual(result.time_to_decode(1), cycles[0])
+        self.assertEqual(result.time_to_decode(num_decoded), cycles[-1])
+        self.assertEqual(result.time_to_decode(num_decoded + 1), np.inf)
+        self.assertEqual(result.networks_decoded(cycles[-1]), num_decoded)
+        self.assertEqual(len(result.summary()), 4)
+
+    def test_seed(self):
+        '''Verify the same seed gives the same chamber'''
+        first = chamber.simulate_chamber(100, 45, self.part_configs, seed=9)
+        second = chamber.simulate_chamber(100, 45, self.part_configs, seed=9)
+        for column in chamber.COLUMNS:
+            self.assertTrue(np.array_equal(first.columns[column], second.columns[column]))
+
+    def test_write_csv(self):
+        '''Verify the table is written a reading per line'''
+        result = chamber.simulate_chamber(50, 45, self.part_configs, seed=2)
+        fname = os.path.join(tempfile.gettempdir(), 'test_chamber.txt')
+        try:
+            result.write_csv(fname)
+            with open(fname, 'rb') as fidin:
+                lines = [line for line in fidin if not line.startswith('#')]
+            self.assertEqual(len(lines), len(result))
+            self.assertEqual(lines[0].strip().split(',')[:2], ['0', '1'])
+        finally:
+            os.remove(fname)
+
+if __name__ == "__main__":
+    unittest.main()
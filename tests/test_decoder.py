@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+
+'''test_decoder.py - tests the failure decoder'''
+
+import unittest
+import os
+import os.path
+import tempfile
+from components import resistor
+from components import sensornetwork
+try:
+    import numpy as np
+    import decoder
+except ImportError:
+    np = None
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class TestDecoder(unittest.TestCase):
+    '''Unit tests for decoder'''
+    def setUp(self):
+        self.part_configs = [{'mttf':15., 'resistance':resistance}
+            for resistance in [2e6, 3e6, 4e6, 5e6]]
+
+    def test_table(self):
+        '''Verify the table holds the ParallelResistance of every subset of intact strands'''
+        strands = [1e3, 2.5e3, 7e3]
+        failure_decoder = decoder.FailureDecoder(strands, ['a', 'b', 'c'])
+        self.assertEqual(len(failure_decoder.resistances), 8)
+        self.assertTrue(np.all(np.diff(failure_decoder.resistances) >= 0))
+        for resistance, mask in zip(failure_decoder.resistances.tolist(), failure_decoder.failures.tolist()):
+            intact = [strand for idx, strand in enumerate(strands) if not mask & (1 << idx)]
+            self.assertAlmostEqual(resistance, resistor.ParallelResistance(intact))
+
+    def test_decode(self):
+        '''Verify readings decode to the nearest combination of failed sensors'''
+        failure_decoder = decoder.FailureDecoder([1e3, 2.5e3, 7e3], ['a', 'b', 'c'])
+        for names in [[], ['a'], ['a', 'b'], ['a', 'b', 'c']]:
+            intact = [strand for strand, name in zip([1e3, 2.5e3, 7e3], 'abc') if name not in names]
+            reading = resistor.ParallelResistance(intact)
+            self.assertEqual(failure_decoder.decode_reading(reading * 1.001), (names, False))
+        failures, num_bands = failure_decoder.decode([7.2e3, float('inf')])
+        self.assertEqual(failures.tolist(), [3, 7])
+        self.assertEqual(num_bands.tolist(), [0, 1])
+
+    def test_simulated_readings(self):
+        '''Verify simulated readings decode to the sensors that had failed unless ambiguous'''
+        failure_decoder = decoder.FailureDecoder.from_part_configurations(self.part_configs)
+        ambiguous = 0
+        for status_log in sensornetwork.gen_runs(200, 45., self.part_configs, seed=6):
+            for reading, failures_str in status_log.items():
+                names, is_ambiguous = failure_decoder.decode_reading(float(reading))
+                if is_ambiguous:
+                    ambiguous += 1
+                else:
+                    self.assertEqual(names, sorted(name for name in failures_str.split(',') if name))
+        self.assertTrue(ambiguous > 0)
+
+    def test_from_network(self):
+        '''Verify a decoder of a built network's strands decodes its readings exactly'''
+        network = sensornetwork.SensorNetwork(self.part_configs)
+        failure_decoder = decoder.FailureDecoder.from_network(network)
+        while not network.complete():
+            network.cycles += 1
+        for reading, failures_str in network.status_log.items():
+            self.assertEqual(failure_decoder.decode_reading(float(reading)),
+                (sorted(name for name in failures_str.split(',') if name), False))
+
+    def test_decode_file(self):
+        '''Verify a log of readings is decoded a chunk at a time'''
+        failure_decoder = decoder.FailureDecoder([1e3, 2.5e3, 7e3], ['a', 'b', 'c'])
+        log_file = os.path.join(tempfile.gettempdir(), 'readings.log')
+        output_file = os.path.join(tempfile.gettempdir(), 'decoded.csv')
+        readings = [1e3 * (1 + 0.2 * reading) for reading in range(50)]
+        with open(log_file, 'wb') as fidout:
+            fidout.write("# Chamber log\n")
+            fidout.writelines("{0!r}\n".format(reading) for reading in readings)
+        counts = decoder.decode_file(failure_decoder, log_file, output_file, chunk_size=8)
+        with open(output_file, 'rb') as decoded:
+            lines = [line.strip().split(',') for line in decoded if not line.startswith('#')]
+        os.remove(log_file)
+        os.remove(output_file)
+        self.assertEqual([float(line[0]) for line in lines], readings)
+        failures, num_bands = failure_decoder.decode(readings)
+        self.assertEqual([line[2:] if line[2:] != [''] else [] for line in lines],
+            [failure_decoder.failure_names(mask) for mask in failures])
+        self.assertEqual(counts, (50, 0, 50 - int(np.count_nonzero(num_bands))))
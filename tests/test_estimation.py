@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+
+'''test_estimation.py - tests the Weibull lifetime fits'''
+
+import unittest
+import os
+import os.path
+import tempfile
+try:
+    import numpy as np
+    import estimation
+except ImportError:
+    np = None
+
+def log_likelihood(failure_times, censored_times, shape, characteristic_life):
+    '''Returns the log likelihood of the Weibull distribution given failure and
+    right-censored times'''
+    failed = np.asarray(failure_times) / characteristic_life
+    censored = np.asarray(censored_times) / characteristic_life
+    return (np.sum(np.log(shape / characteristic_life) + (shape - 1) * np.log(failed) - failed ** shape) -
+        np.sum(censored ** shape))
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class TestEstimation(unittest.TestCase):
+    '''Unit tests for estimation'''
+    def setUp(self):
+        self.part_configs = [{'mttf':15., 'shape':2., 'resistance':resistance}
+            for resistance in [1e3, 2e3, 4e3, 8e3]]
+        random_state = np.random.RandomState(7)
+        lifetimes = 15. * random_state.weibull(2., 400)
+        self.failure_times = lifetimes[lifetimes < 20]
+        self.censored_times = np.full(np.count_nonzero(lifetimes >= 20), 20.)
+
+    def test_compress(self):
+        '''Verify times are reduced to distinct values and counts'''
+        times, failed, counts = estimation.compress([3, 1, 3, 2], [3, 5])
+        self.assertEqual(times.tolist(), [5., 3., 1., 2., 3.])
+        self.assertEqual(failed.tolist(), [False, False, True, True, True])
+        self.assertEqual(counts.tolist(), [1, 1, 1, 1, 2])
+        self.assertRaises(ValueError, estimation.compress, [0, 1])
+
+    def test_maximum_likelihood(self):
+        '''Verify the fit maximizes the likelihood of the failure and censored times'''
+        weibull_fit = estimation.WeibullFit(self.failure_times, self.censored_times)
+        self.assertEqual(weibull_fit.num_failures + weibull_fit.num_censored, 400)
+        best = log_likelihood(self.failure_times, self.censored_times, weibull_fit.shape,
+            weibull_fit.characteristic_life)
+        for shape_change, life_change in [(1.01, 1), (0.99, 1), (1, 1.01), (1, 0.99)]:
+            self.assertLess(log_likelihood(self.failure_times, self.censored_times,
+                weibull_fit.shape * shape_change, weibull_fit.characteristic_life * life_change), best)
+        self.assertAlmostEqual(weibull_fit.mttf(), weibull_fit.characteristic_life)
+        self.assertRaises(ValueError, estimation.WeibullFit, [], [20., 20.])
+
+    def test_fit_weighted(self):
+        '''Verify each row of weights is fitted on its own, and rows without failures are NaN'''
+        times, failed, counts = estimation.compress(self.failure_times, self.censored_times)
+        shape, characteristic_life = estimation.fit_weighted(times, failed,
+            [counts, 2 * counts, np.where(failed, 0, counts)])
+        self.assertAlmostEqual(shape[0], shape[1])
+        self.assertAlmostEqual(characteristic_life[0], characteristic_life[1])
+        self.assertTrue(np.isnan(shape[2]))
+
+    def test_simulated_times(self):
+        '''Verify the fit recovers the parameters of simulated parts seen failing on
+        whole cycles'''
+        failure_times, censored_times = estimation.simulated_times(20000, 20, self.part_configs, seed=3)
+        self.assertEqual(len(failure_times) + len(censored_times), 80000)
+        self.assertTrue(np.all(failure_times == np.round(failure_times)))
+        self.assertTrue(np.all(censored_times == 20))
+        weibull_fit = estimation.WeibullFit(failure_times, censored_times, resolution=1)
+        self.assertAlmostEqual(weibull_fit.shape, 2., delta=0.05)
+        self.assertAlmostEqual(weibull_fit.characteristic_life, 15., delta=0.2)
+
+    def test_bootstrap(self):
+        '''Verify the bootstrap intervals hold the estimates and only depend on the seed'''
+        weibull_fit = estimation.WeibullFit(self.failure_times, self.censored_times)
+        intervals = weibull_fit.bootstrap(500, seed=11)
+        for parameter in estimation.PARAMETERS:
+            lower, upper = intervals[parameter]
+            self.assertTrue(lower < getattr(weibull_fit, parameter) < upper)
+        self.assertTrue(intervals['shape'][0] < 2. < intervals['shape'][1])
+        self.assertDictEqual(weibull_fit.bootstrap(500, seed=11, num_processes=2), intervals)
+        self.assertEqual(len(weibull_fit.summary()), 4)
+
+    def test_read_failures(self):
+        '''Verify sensors missing from a file of failures are censored'''
+        fname = os.path.join(tempfile.gettempdir(), 'test_failures.csv')
+        try:
+            with open(fname, 'wb') as fidout:
+                fidout.write("rig1,a,5.0\nrig1,b,12.0\nrig2,1000.0,7.0\n")
+            networks = {'rig1':[{'resistance':1e3, 'mttf':15, 'name':name} for name in 'abc'],
+                'rig2':[{'resistance':1e3, 'mttf':15}, {'resistance':1e3, 'mttf':15}]}
+            failure_times, censored_times = estimation.read_failures(fname, networks, 30.)
+            self.assertEqual(sorted(failure_times.tolist()), [5., 7., 12.])
+            self.assertEqual(censored_times.tolist(), [30., 30.])
+        finally:
+            os.remove(fname)
+
+if __name__ == "__main__":
+    unittest.main()
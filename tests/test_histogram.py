@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+'''test_histogram.py - tests the aggregated histogram results'''
+
+import os
+import os.path
+import tempfile
+import unittest
+import analysis
+from components import histogram
+from components import sensormasks
+from components import sensornetwork
+try:
+    import numpy as np
+    from components import batchsim
+except ImportError:
+    np = None
+
+class TestHistogram(unittest.TestCase):
+    '''Unit tests for histogram'''
+    def setUp(self):
+        self.mean_time_to_failure = 15.
+        self.part_configs = [{'mttf':self.mean_time_to_failure, 'resistance':resistance}
+            for resistance in [1e3, 2e3, 3e3]]
+        self.names = sensormasks.sensor_names(self.part_configs)
+        self.bits = sensormasks.name_bits(self.names)
+        self.fname = os.path.join(tempfile.gettempdir(), 'histogram.txt')
+
+    def tearDown(self):
+        if os.path.exists(self.fname):
+            os.remove(self.fname)
+
+    def test_add(self):
+        '''Verify readings are counted per combination and bin'''
+        results = histogram.Histogram(bin_width=0.01)
+        for resistance in [100.2, 100.6, 102., 100.9]:
+            results.add(1, resistance)
+        results.add(2, 100.6)
+        results.add(3, float('inf'))
+        self.assertEqual(results.num_readings, 6)
+        self.assertEqual(results.bins[(1, results.bin_number(100.2))], [3, 100.2, 100.9])
+        self.assertEqual(results.bins[(1, results.bin_number(102.))], [1, 102., 102.])
+        self.assertEqual(results.bins[(3, histogram.OPEN_BIN)], [1, float('inf'), float('inf')])
+        merged = histogram.Histogram(bin_width=0.01)
+        merged.update(results)
+        merged.update(results)
+        self.assertEqual(merged.bins[(1, results.bin_number(100.2))], [6, 100.2, 100.9])
+
+    def test_read_histogram(self):
+        '''Verify histograms are written and read back'''
+        simulation_runs = list(sensornetwork.gen_runs(50, 3*self.mean_time_to_failure,
+            self.part_configs, seed=1))
+        results = histogram.Histogram()
+        results.add_status_logs(simulation_runs, self.bits)
+        self.assertEqual(results.num_readings, sum(len(run) for run in simulation_runs))
+        with open(self.fname, 'wb') as fidout:
+            fidout.writelines(histogram.gen_header(self.part_configs, 50, 3*self.mean_time_to_failure, 1))
+            fidout.writelines(results.gen_lines(self.names))
+        self.assertTrue(histogram.is_histogram_file(self.fname))
+        read_results, names = histogram.read_histogram(self.fname)
+        self.assertEqual(names, self.names)
+        self.assertEqual(read_results.bins, results.bins)
+
+    def test_run_simulation(self):
+        '''Verify a histogram run counts the same readings as a text run with the same
+        seed, and its analysis finds the same colliding combinations'''
+        num_simulations = 60
+        text_analyzer = analysis.StreamingAnalysis()
+        sensornetwork.run_simulation(num_simulations, 3*self.mean_time_to_failure, self.part_configs,
+            fname=self.fname, seed=4, block_size=20, analyzer=text_analyzer)
+        histogram_analyzer = analysis.StreamingAnalysis()
+        sensornetwork.multirun_simulation(num_simulations, 3*self.mean_time_to_failure,
+            self.part_configs, num_processes=2, fname=self.fname, seed=4, block_size=20,
+            output_format='histogram', analyzer=histogram_analyzer)
+        read_results, names = histogram.read_histogram(self.fname)
+        self.assertEqual(read_results.num_readings, text_analyzer.num_readings)
+        self.assertEqual(histogram_analyzer.num_readings, text_analyzer.num_readings)
+        self.assertEqual(histogram_analyzer.counts, text_analyzer.counts)
+        self.assertEqual(set(frozenset(pair) for pair in histogram_analyzer.collisions),
+            set(frozenset(pair) for pair in text_analyzer.collisions))
+
+    @unittest.skipIf(np is None, "NumPy not installed")
+    def test_add_records(self):
+        '''Verify records are binned the same way as status logs'''
+        parameters = batchsim.NetworkParameters(self.part_configs)
+        lifetimes, strand_resistances = parameters.draw(200)
+        result = batchsim.evaluate(lifetimes, strand_resistances, 3*self.mean_time_to_failure)
+        from_records = histogram.Histogram()
+        from_records.add_records(result.records())
+        from_logs = histogram.Histogram()
+        from_logs.add_status_logs(result.status_logs(parameters.names), self.bits)
+        self.assertEqual(from_records.bins, from_logs.bins)
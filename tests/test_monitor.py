@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+
+'''test_monitor.py - tests the live readings monitor'''
+
+import unittest
+import os
+import os.path
+import tempfile
+import threading
+try:
+    import numpy as np
+    import monitor
+except ImportError:
+    np = None
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class TestMonitor(unittest.TestCase):
+    '''Unit tests for monitor'''
+    def setUp(self):
+        self.networks = {'rig1':[{'mttf':15., 'resistance':resistance} for resistance in [1e3, 2.2e3, 4.7e3]],
+            'rig2':[{'mttf':30., 'resistance':resistance, 'name':name}
+                for resistance, name in [(1e3, 'a'), (2e3, 'b'), (4e3, 'c'), (8e3, 'd')]]}
+        self.temp_fname = os.path.join(tempfile.gettempdir(), 'test_monitor.log')
+
+    def tearDown(self):
+        if os.path.exists(self.temp_fname):
+            os.remove(self.temp_fname)
+
+    def check_failures(self, live_monitor, rig):
+        '''Verify live_monitor recorded each sensor of rig as failed on the cycle it did'''
+        for network_id in rig.network_ids:
+            self.assertDictEqual(live_monitor.states[network_id].failure_times, rig.failure_cycles(network_id))
+            self.assertEqual(live_monitor.states[network_id].num_inconsistent, 0)
+
+    def test_add_readings(self):
+        '''Verify failures are recorded from the first unambiguous reading showing them'''
+        live_monitor = monitor.Monitor(self.networks, batch_size=4)
+        state = live_monitor.states['rig2']
+        lines = ['rig2,{0},{1!r}'.format(cycle, reading) for cycle, reading in
+            enumerate([1 / (1 / 1e3 + 1 / 2e3 + 1 / 4e3 + 1 / 8e3), 1 / (1 / 2e3 + 1 / 4e3 + 1 / 8e3),
+                1 / (1 / 1e3 + 1 / 2e3 + 1 / 4e3 + 1 / 8e3), 1 / (1 / 2e3 + 1 / 8e3), 8e3, float('inf')])]
+        live_monitor.add_data('\n'.join(lines) + '\nrig3,1,1e3\nnonsense\n# comment\n\n')
+        live_monitor.flush()
+        self.assertEqual(state.num_readings, 6)
+        self.assertEqual(state.num_inconsistent, 1)
+        self.assertEqual(live_monitor.num_malformed, 2)
+        self.assertDictEqual(state.failure_times, {'a':1., 'c':3., 'b':4., 'd':5.})
+        self.assertEqual(live_monitor.events, [('rig2', 'a', 1.), ('rig2', 'c', 3.), ('rig2', 'b', 4.),
+            ('rig2', 'd', 5.)])
+
+    def test_tail(self):
+        '''Verify the failures of a simulated rig are recorded from a tailed log file,
+        including readings appended after tailing starts'''
+        rig = monitor.SimulatedRig(self.networks, seed=5)
+        events = []
+        live_monitor = monitor.Monitor(self.networks, batch_size=50,
+            on_failure=lambda *event: events.append(event))
+        with open(self.temp_fname, 'wb') as fidout:
+            rig.write(fidout, 20)
+            live_monitor.tail(self.temp_fname)
+            live_monitor.poll(0)
+            rig.write(fidout, 130)
+            fidout.write('rig1,151,')
+            fidout.flush()
+            live_monitor.poll(0)
+        live_monitor.close()
+        self.assertEqual(events, live_monitor.events)
+        self.assertEqual(live_monitor.states['rig1'].num_readings, 150)
+        self.check_failures(live_monitor, rig)
+
+    def test_listen(self):
+        '''Verify the failures of simulated rigs are recorded from local connections'''
+        rig_networks = [dict(('{0}-{1}'.format(network_id, rig), part_configs)
+            for network_id, part_configs in self.networks.items()) for rig in range(3)]
+        live_monitor = monitor.Monitor(dict(item for networks in rig_networks for item in networks.items()))
+        address = live_monitor.listen()
+        rigs = [monitor.SimulatedRig(networks, seed=seed) for seed, networks in enumerate(rig_networks)]
+        senders = [threading.Thread(target=rig.send, args=(address, 150)) for rig in rigs]
+        for sender in senders:
+            sender.start()
+        for attempt in range(100):
+            live_monitor.poll(0.1)
+            if sum(state.num_readings for state in live_monitor.states.values()) == 900:
+                break
+        for sender in senders:
+            sender.join()
+        live_monitor.close()
+        self.assertEqual(live_monitor.num_malformed, 0)
+        for rig in rigs:
+            self.check_failures(live_monitor, rig)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+
+'''test_optimizer.py - tests the network design optimizer'''
+
+import unittest
+import analysis
+try:
+    import numpy as np
+    import optimizer
+except ImportError:
+    np = None
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class TestOptimizer(unittest.TestCase):
+    '''Unit tests for optimizer'''
+    def test_candidate_values(self):
+        '''Verify E-series and log-spaced candidate values'''
+        values = optimizer.candidate_values(1e3, 1e4, 'E12')
+        self.assertEqual(values.tolist(), [1000., 1200., 1500., 1800., 2200., 2700., 3300.,
+            3900., 4700., 5600., 6800., 8200., 10000.])
+        values = optimizer.candidate_values(1e3, 1e4)
+        self.assertEqual(len(values), optimizer.STEPS_PER_DECADE + 1)
+
+    def test_score(self):
+        '''Verify candidates are scored the same as the analytic band check'''
+        resistances = [2e6, 3e6, 4e6, 5e6]
+        part_configs = optimizer.build_part_configs(resistances, 15.)
+        scores = optimizer.DesignScorer().score(np.array([resistances, [1e3, 3e3, 1e4, 3e4]]))
+        self.assertAlmostEqual(scores[0], analysis.NetworkBands(part_configs).separation())
+        self.assertTrue(scores[0] < 0)
+
+    def test_optimize(self):
+        '''Verify the search finds a design without overlapping bands when one exists'''
+        separation, resistances = optimizer.optimize(2, 1e3, 1e4, 'E12', restarts=4,
+            num_processes=1, seed=3)
+        self.assertEqual(len(resistances), 2)
+        self.assertTrue(separation > 0)
+        self.assertTrue(all([1e3 <= resistance <= 1e4 for resistance in resistances]))
+        self.assertEqual((separation, resistances), optimizer.optimize(2, 1e3, 1e4, 'E12',
+            restarts=4, num_processes=2, seed=3))
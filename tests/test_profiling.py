@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+
+'''test_profiling.py - tests the profiling hooks'''
+
+import unittest
+import os
+import os.path
+import tempfile
+from components import profiling
+from components import sensornetwork
+
+class TestProfiling(unittest.TestCase):
+    '''Unit tests for profiling'''
+    def setUp(self):
+        self.part_configs = [{'mttf':15., 'resistance':resistance}
+            for resistance in [1e3, 2e3, 3e3, 4e3, 5e3]]
+        self.output_file = os.path.join(tempfile.gettempdir(), 'profiled.csv')
+
+    def tearDown(self):
+        profiling.set_profiler(None)
+        if os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+    def test_profiler(self):
+        '''Verify timings, counters and worker times add up and merge'''
+        profiler = profiling.Profiler()
+        with profiler.phase('write'):
+            pass
+        profiler.add_time('write', 1.)
+        profiler.count('readings', 3)
+        profiler.count('readings')
+        profiler.add_time('run', 5.)
+        profiler.add_worker_time('PoolWorker-1', 2.)
+        other = profiling.Profiler()
+        other.update(profiler.as_dict())
+        other.update(profiler.as_dict())
+        self.assertTrue(2. <= other.timings['write'] < 2.1)
+        self.assertEqual(other.counters['readings'], 8)
+        self.assertEqual(other.as_dict()['idle'], {'PoolWorker-1':6.})
+        self.assertEqual(len(other.summary()), 4)
+
+    def test_cycles_counted(self):
+        '''Verify the cycles stepped are counted, however many each step covers'''
+        for engine in ['cycle', 'event']:
+            profiler = profiling.Profiler()
+            network = sensornetwork.ProfiledSensorNetwork(self.part_configs, profiler=profiler)
+            if engine == 'event':
+                network.run_events(200.)
+            else:
+                while not network.complete():
+                    network.cycles += 1
+            network.cycles += 5
+            self.assertTrue(network.complete())
+            self.assertEqual(profiler.counters['cycles'], network.cycles)
+
+    def test_null_profiler(self):
+        '''Verify runs report to a NullProfiler that records nothing by default'''
+        profiler = profiling.get_profiler()
+        self.assertFalse(profiler.enabled)
+        with profiler.phase('write'):
+            profiler.count('readings')
+        self.assertEqual(profiler.as_dict(), {'timings':{}, 'counters':{}, 'workers':{}, 'idle':{}})
+
+    def test_profiled_run(self):
+        '''Verify a profiled run writes the same results and counts what it did'''
+        sensornetwork.run_simulation(30, 45., self.part_configs, fname=self.output_file, seed=5,
+            block_size=7)
+        with open(self.output_file, 'rb') as results:
+            expected = results.read()
+        for multirun in [False, True]:
+            profiler = profiling.Profiler()
+            profiling.set_profiler(profiler)
+            if multirun:
+                sensornetwork.multirun_simulation(30, 45., self.part_configs, num_processes=2,
+                    fname=self.output_file, seed=5, block_size=7)
+                self.assertTrue(len(profiler.workers) > 0)
+            else:
+                sensornetwork.run_simulation(30, 45., self.part_configs, fname=self.output_file,
+                    seed=5, block_size=7)
+            with open(self.output_file, 'rb') as results:
+                output = results.read()
+            self.assertEqual(output, expected)
+            readings = len([line for line in output.splitlines() if not line.startswith('#')])
+            self.assertEqual(profiler.counters['simulations'], 30)
+            self.assertEqual(profiler.counters['readings'], readings)
+            self.assertTrue(profiler.counters['cycles'] >= readings)
+            self.assertTrue(profiler.counters['bytes_written'] < len(output))
+            for phase in ['run', 'create_parts', 'step_cycles', 'resistance', 'format_output', 'write']:
+                self.assertTrue(phase in profiler.timings)
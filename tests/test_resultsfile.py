@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+
+'''test_resultsfile.py - tests the binary results format'''
+
+import unittest
+import os
+import os.path
+import tempfile
+import analysis
+from components import sensormasks
+from components import sensornetwork
+try:
+    import numpy as np
+    from components import resultsfile
+except ImportError:
+    np = None
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class TestResultsFile(unittest.TestCase):
+    '''Unit tests for resultsfile'''
+    def setUp(self):
+        self.mean_time_to_failure = 15.
+        self.resistances = [1e3, 2e3, 3e3, 4e3, 5e3]
+        self.part_configs = []
+        for resistance in self.resistances:
+            part_config = {'mttf':self.mean_time_to_failure,
+                'resistance':resistance}
+            self.part_configs.append(part_config)
+        self.names = sensormasks.sensor_names(self.part_configs)
+        self.output_file = os.path.join(tempfile.gettempdir(), 'results.bdr')
+
+    def tearDown(self):
+        if os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+    def write_results(self, simulation_runs):
+        '''Writes simulation_runs to the output file'''
+        with open(self.output_file, 'wb') as fidout:
+            fidout.write(resultsfile.gen_header(self.part_configs, len(simulation_runs), 45, seed=3))
+            fidout.write(resultsfile.status_log_records(simulation_runs,
+                sensormasks.name_bits(self.names)).tobytes())
+
+    def test_failure_mask(self):
+        '''Verify failed sensors are converted to and from bitmasks'''
+        bits = sensormasks.name_bits(self.names)
+        self.assertEqual(sensormasks.failure_mask('', bits), 0)
+        self.assertEqual(sensormasks.failure_mask('3000.0,1000.0', bits), 5)
+        self.assertEqual(sensormasks.failure_names(5, self.names), ['1000.0', '3000.0'])
+
+    def test_duplicate_names(self):
+        '''Verify sensors sharing a name get their own bits'''
+        bits = sensormasks.name_bits(['a', 'b', 'a'])
+        self.assertEqual(sensormasks.failure_mask('a', bits), 1)
+        self.assertEqual(sensormasks.failure_mask('a,b,a', bits), 7)
+
+    def test_read_results(self):
+        '''Verify the header and records can be read back'''
+        self.write_results([{'545.5':'', 'inf':'1000.0,2000.0'}, {'611.2':'2000.0'}])
+        header, records = resultsfile.read_results(self.output_file)
+        self.assertEqual(header['sensors'], self.names)
+        self.assertEqual(header['seed'], 3)
+        self.assertEqual(len(records), 3)
+        self.assertEqual(sorted(records['simulation'].tolist()), [0, 0, 1])
+        self.assertTrue(np.isinf(records['resistance']).any())
+
+    def test_binary_collisions(self):
+        '''Verify Analysis finds collisions in binary results'''
+        self.write_results([{'545.5':'', '700.1':'1000.0'}, {'545.5':'', '700.1':'2000.0'}])
+        collisions = analysis.Analysis(self.output_file).check_obvious_collisions()
+        self.assertEqual(collisions, {'700.1':(['1000.0'], ['2000.0'])})
+        self.write_results([{'545.5':'', '700.1':'1000.0'}, {'545.5':'', '700.1':'1000.0'}])
+        collisions = analysis.Analysis(self.output_file).check_obvious_collisions()
+        self.assertEqual(len(collisions), 0)
+
+    def test_simulation_output(self):
+        '''Verify single and multi-process binary output is identical to the text output'''
+        text_file = os.path.join(tempfile.gettempdir(), 'results_text.csv')
+        sensornetwork.run_simulation(num_simulations=20, num_cycles=3*self.mean_time_to_failure,
+            part_configurations=self.part_configs, fname=text_file, seed=5)
+        sensornetwork.multirun_simulation(num_simulations=20, num_cycles=3*self.mean_time_to_failure,
+            part_configurations=self.part_configs, num_processes=2, fname=self.output_file, seed=5,
+            block_size=6, output_format='binary')
+        with open(text_file, 'rb') as results:
+            text_readings = sorted((int(elements[0]), float(elements[1]))
+                for elements in [line.strip().split(',') for line in results if not line.startswith('#')])
+        os.remove(text_file)
+        header, records = resultsfile.read_results(self.output_file)
+        self.assertEqual(header['num_simulations'], 20)
+        self.assertEqual(sorted(zip(records['simulation'].tolist(), records['resistance'].tolist())),
+            text_readings)
@@ -1,144 +1,518 @@
-#!/usr/bin/env python
-
-
-'''test_sensornetwork.py - tests the SensorNetwork class'''
-
-import unittest
-import os
-import os.path
-import tempfile
-from components import sensornetwork
-from components import resistor
-
-class TestNetwork(unittest.TestCase):
-    '''Unit tests for SensorNetwork'''
-    def setUp(self):
-        self.mean_time_to_failure = 15.
-        self.shape = 3.
-        self.resistances = [1e3, 2e3, 3e3, 4e3, 5e3]
-        self.part_configs = []
-        for resistance in self.resistances:
-            part_config = {'mttf':self.mean_time_to_failure,
-                'resistance':resistance}
-            self.part_configs.append(part_config)
-        self.sensor_net = sensornetwork.SensorNetwork(self.part_configs)
-
-    def test_initial_time(self):
-        '''Verify sensor network starts at time = 0 cycles '''
-        self.assertEqual(self.sensor_net.cycle_num, 0)
-
-    def test_initial_resistance(self):
-        '''Verify initial resistance of the network'''
-        self.assertAlmostEqual(self.sensor_net.resistance,
-            resistor.ParallelResistance(self.resistances),
-            delta=resistor.ParallelResistance(self.resistances)/10.)
-
-    def test_initial_failures(self):
-        '''Verify no parts of the network are broken at start time'''
-        self.assertEqual(len(self.sensor_net.failures()), 0)
-
-    def test_find_part_unspecified_name(self):
-        '''Verify that an instrumented part can be found by an unspecified name'''
-        part_one_config = {'mttf':self.mean_time_to_failure, 
-            'resistance':self.resistances[0],
-            'length':18., 
-            'gauge':24}
-        part_two_config = {'mttf':self.mean_time_to_failure, 
-            'resistance':self.resistances[0],
-            'length':18., 
-            'gauge':24, 
-            'name':'Kevlar Strand 33'}
-        sensor_net = sensornetwork.SensorNetwork([part_one_config, part_two_config])
-        part_one_name = str(part_one_config["resistance"])
-        part_one_search = sensor_net.get_part(part_one_name)
-        self.assertEqual(part_one_name, part_one_search[0].name)
-        self.assertAlmostEqual(part_one_config["resistance"], part_one_search[0].resistance,
-            delta=part_one_config["resistance"]/10.)
-
-    def test_find_part_specified_name(self):
-        '''Verify that an instrumented part can be found by a specified name'''
-        part_one_config = {'mttf':self.mean_time_to_failure, 
-            'resistance':self.resistances[0],
-            'length':18., 
-            'gauge':24}
-        part_two_config = {'mttf':self.mean_time_to_failure, 
-            'resistance':self.resistances[0],
-            'length':18., 
-            'gauge':24, 
-            'name':'Kevlar Strand 33'}
-        sensor_net = sensornetwork.SensorNetwork([part_one_config, part_two_config])
-        part_two_search = sensor_net.get_part(part_two_config["name"])
-        self.assertEqual(part_two_config["name"], part_two_search[0].name)
-        self.assertAlmostEqual(part_two_config["resistance"], part_two_search[0].resistance,
-            delta=part_two_config["resistance"]/10.)
-
-    def test_find_nopart(self):
-        '''Verify that a search for an instrumented part not in the
-        network returns an empty list'''
-        self.assertEqual([], self.sensor_net.get_part("Nylon Strand Delta"))
-
-    def test_complete_failures(self):
-        '''Verify at some distant point in the future that all the parts
-        have failed'''
-        part_configs = []
-        for resistance in self.resistances:
-            part_config = {'mttf':self.mean_time_to_failure,
-                'resistance':resistance}
-            part_configs.append(part_config)
-        sensor_net = sensornetwork.SensorNetwork(part_configs)
-        sensor_net.cycles = self.mean_time_to_failure * 1001
-        self.assertEqual(len(sensor_net.failures()),
-            len(self.resistances))
-
-    def test_resistance_complete_failures(self):
-        '''Verify at some distant point in the future the sensor network's
-        resistance goes to infinity (open circuit)'''
-        sensor_net = sensornetwork.SensorNetwork(self.part_configs)
-        sensor_net.cycles = self.mean_time_to_failure * 3135
-        self.assertEqual(sensor_net.resistance, float('inf'))
-
-    def test_complete_sim(self):
-        '''Verify that the sensor network reports complete at some point in the testing'''
-        num_cycles = self.mean_time_to_failure * 3
-        part_configs = []
-        for resistance in self.resistances:
-            part_config = {'mttf':self.mean_time_to_failure,
-                'resistance':resistance}
-            part_configs.append(part_config)
-        sensor_net = sensornetwork.SensorNetwork(part_configs)
-        for cycle in xrange(int(num_cycles)):
-            sensor_net.cycles = cycle
-        self.assertTrue(sensor_net.complete())
-
-    def test_simulate_returns_dict(self):
-        '''Verify a single run of a simulation returns a dict of resistance, failures'''
-        sim_result = sensornetwork.simulate(num_cycles=3*self.mean_time_to_failure,
-            part_configurations = self.part_configs)
-        self.assertIsInstance(sim_result, dict)
-
-    def test_simulate(self):
-        '''Verify a single simulation run returns 0 or more failures per resistance reading'''
-        sim_result = sensornetwork.simulate(num_cycles=3*self.mean_time_to_failure,
-            part_configurations=self.part_configs)
-        for key, failures_str in sim_result.items():
-            # Ensure float() doesn't raise ValueError in converting key
-            float(key)
-            if failures_str != '':
-                failures = failures_str.split(',')
-                self.assertTrue(len(failures)>0)
-
-    def test_singlecore_simulation_output(self):
-        '''Verify the single-core run produces an output file'''
-        output_file = os.path.join(tempfile.gettempdir(), 'single_core.csv')
-        sensornetwork.run_simulation(num_simulations=2, num_cycles=self.mean_time_to_failure*3,
-            part_configurations=self.part_configs, start_time=0, fname=output_file)
-        self.assertTrue(os.path.getsize(output_file) > 0)
-        os.remove(output_file)
-
-    def test_multicore_simulation_output(self):
-        '''Verify the multi-core run produces an output file'''
-        output_file = os.path.join(tempfile.gettempdir(), 'multi_core.csv')
-        sensornetwork.run_simulation(num_simulations=2, num_cycles=self.mean_time_to_failure*3,
-            part_configurations=self.part_configs, start_time=0, fname=output_file)
-        self.assertTrue(os.path.getsize(output_file) > 0)
-        os.remove(output_file)
+#!/usr/bin/env python
+
+
+'''test_sensornetwork.py - tests the SensorNetwork class'''
+
+import unittest
+import os
+import os.path
+import tempfile
+import copy
+import random
+from components import sensornetwork
+from components import resistor
+
+class TestNetwork(unittest.TestCase):
+    '''Unit tests for SensorNetwork'''
+    def setUp(self):
+        self.mean_time_to_failure = 15.
+        self.shape = 3.
+        self.resistances = [1e3, 2e3, 3e3, 4e3, 5e3]
+        self.part_configs = []
+        for resistance in self.resistances:
+            part_config = {'mttf':self.mean_time_to_failure,
+                'resistance':resistance}
+            self.part_configs.append(part_config)
+        self.sensor_net = sensornetwork.SensorNetwork(self.part_configs)
+
+    def test_initial_time(self):
+        '''Verify sensor network starts at time = 0 cycles '''
+        self.assertEqual(self.sensor_net.cycle_num, 0)
+
+    def test_initial_resistance(self):
+        '''Verify initial resistance of the network'''
+        self.assertAlmostEqual(self.sensor_net.resistance,
+            resistor.ParallelResistance(self.resistances),
+            delta=resistor.ParallelResistance(self.resistances)/10.)
+
+    def test_initial_failures(self):
+        '''Verify no parts of the network are broken at start time'''
+        self.assertEqual(len(self.sensor_net.failures()), 0)
+
+    def test_find_part_unspecified_name(self):
+        '''Verify that an instrumented part can be found by an unspecified name'''
+        part_one_config = {'mttf':self.mean_time_to_failure, 
+            'resistance':self.resistances[0],
+            'length':18., 
+            'gauge':24}
+        part_two_config = {'mttf':self.mean_time_to_failure, 
+            'resistance':self.resistances[0],
+            'length':18., 
+            'gauge':24, 
+            'name':'Kevlar Strand 33'}
+        sensor_net = sensornetwork.SensorNetwork([part_one_config, part_two_config])
+        part_one_name = str(part_one_config["resistance"])
+        part_one_search = sensor_net.get_part(part_one_name)
+        self.assertEqual(part_one_name, part_one_search[0].name)
+        self.assertAlmostEqual(part_one_config["resistance"], part_one_search[0].resistance,
+            delta=part_one_config["resistance"]/10.)
+
+    def test_find_part_specified_name(self):
+        '''Verify that an instrumented part can be found by a specified name'''
+        part_one_config = {'mttf':self.mean_time_to_failure, 
+            'resistance':self.resistances[0],
+            'length':18., 
+            'gauge':24}
+        part_two_config = {'mttf':self.mean_time_to_failure, 
+            'resistance':self.resistances[0],
+            'length':18., 
+            'gauge':24, 
+            'name':'Kevlar Strand 33'}
+        sensor_net = sensornetwork.SensorNetwork([part_one_config, part_two_config])
+        part_two_search = sensor_net.get_part(part_two_config["name"])
+        self.assertEqual(part_two_config["name"], part_two_search[0].name)
+        self.assertAlmostEqual(part_two_config["resistance"], part_two_search[0].resistance,
+            delta=part_two_config["resistance"]/10.)
+
+    def test_find_nopart(self):
+        '''Verify that a search for an instrumented part not in the
+        network returns an empty list'''
+        self.assertEqual([], self.sensor_net.get_part("Nylon Strand Delta"))
+
+    def test_complete_failures(self):
+        '''Verify at some distant point in the future that all the parts
+        have failed'''
+        part_configs = []
+        for resistance in self.resistances:
+            part_config = {'mttf':self.mean_time_to_failure,
+                'resistance':resistance}
+            part_configs.append(part_config)
+        sensor_net = sensornetwork.SensorNetwork(part_configs)
+        sensor_net.cycles = self.mean_time_to_failure * 1001
+        self.assertEqual(len(sensor_net.failures()),
+            len(self.resistances))
+
+    def test_resistance_complete_failures(self):
+        '''Verify at some distant point in the future the sensor network's
+        resistance goes to infinity (open circuit)'''
+        sensor_net = sensornetwork.SensorNetwork(self.part_configs)
+        sensor_net.cycles = self.mean_time_to_failure * 3135
+        self.assertEqual(sensor_net.resistance, float('inf'))
+
+    def test_complete_sim(self):
+        '''Verify that the sensor network reports complete at some point in the testing'''
+        num_cycles = self.mean_time_to_failure * 3
+        part_configs = []
+        for resistance in self.resistances:
+            part_config = {'mttf':self.mean_time_to_failure,
+                'resistance':resistance}
+            part_configs.append(part_config)
+        sensor_net = sensornetwork.SensorNetwork(part_configs)
+        for cycle in xrange(int(num_cycles)):
+            sensor_net.cycles = cycle
+        self.assertTrue(sensor_net.complete())
+
+    def test_simulate_returns_dict(self):
+        '''Verify a single run of a simulation returns a dict of resistance, failures'''
+        sim_result = sensornetwork.simulate(num_cycles=3*self.mean_time_to_failure,
+            part_configurations = self.part_configs)
+        self.assertIsInstance(sim_result, dict)
+
+    def test_simulate(self):
+        '''Verify a single simulation run returns 0 or more failures per resistance reading'''
+        sim_result = sensornetwork.simulate(num_cycles=3*self.mean_time_to_failure,
+            part_configurations=self.part_configs)
+        for key, failures_str in sim_result.items():
+            # Ensure float() doesn't raise ValueError in converting key
+            float(key)
+            if failures_str != '':
+                failures = failures_str.split(',')
+                self.assertTrue(len(failures)>0)
+
+    def test_singlecore_simulation_output(self):
+        '''Verify the single-core run produces an output file'''
+        output_file = os.path.join(tempfile.gettempdir(), 'single_core.csv')
+        sensornetwork.run_simulation(num_simulations=2, num_cycles=self.mean_time_to_failure*3,
+            part_configurations=self.part_configs, start_time=0, fname=output_file)
+        self.assertTrue(os.path.getsize(output_file) > 0)
+        os.remove(output_file)
+
+    def test_multicore_simulation_output(self):
+        '''Verify the multi-core run produces an output file'''
+        output_file = os.path.join(tempfile.gettempdir(), 'multi_core.csv')
+        sensornetwork.run_simulation(num_simulations=2, num_cycles=self.mean_time_to_failure*3,
+            part_configurations=self.part_configs, start_time=0, fname=output_file)
+        self.assertTrue(os.path.getsize(output_file) > 0)
+        os.remove(output_file)
+
+    def test_batch_simulation_output(self):
+        '''Verify the batch engine produces an output file'''
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy not installed")
+        output_file = os.path.join(tempfile.gettempdir(), 'batch.csv')
+        sensornetwork.run_simulation(num_simulations=2, num_cycles=self.mean_time_to_failure*3,
+            part_configurations=self.part_configs, start_time=0, fname=output_file, engine='batch')
+        self.assertTrue(os.path.getsize(output_file) > 0)
+        os.remove(output_file)
+
+    def test_multirun_ordered_output(self):
+        '''Verify the multi-process run writes every simulation's block in order'''
+        output_file = os.path.join(tempfile.gettempdir(), 'multi_ordered.csv')
+        num_simulations = 25
+        sensornetwork.multirun_simulation(num_simulations=num_simulations,
+            num_cycles=self.mean_time_to_failure*3, part_configurations=self.part_configs,
+            start_time=0, num_processes=2, fname=output_file, block_size=4)
+        with open(output_file, 'rb') as results:
+            simulations = [int(line.split(',')[0]) for line in results if not line.startswith('#')]
+        os.remove(output_file)
+        self.assertEqual(simulations, sorted(simulations))
+        self.assertEqual(set(simulations), set(range(num_simulations)))
+
+    def test_gen_blocks(self):
+        '''Verify simulations are split into contiguous blocks'''
+        blocks = list(sensornetwork.gen_blocks(10, 4))
+        self.assertEqual(blocks, [(0, 4), (4, 4), (8, 2)])
+
+    def test_streaming_analysis(self):
+        '''Verify the results are analyzed as they are written, and the run stops
+        early once a collision is found'''
+        import analysis
+        output_file = os.path.join(tempfile.gettempdir(), 'streaming.csv')
+        analyzer = analysis.StreamingAnalysis(threshold=0.1)
+        simulations_run = sensornetwork.run_simulation(40, self.mean_time_to_failure*3,
+            self.part_configs, fname=output_file, seed=8, block_size=10, analyzer=analyzer)
+        self.assertEqual(simulations_run, 40)
+        offline = analysis.Analysis(output_file, threshold=0.1)
+        self.assertDictEqual(analyzer.obvious_collisions, offline.check_obvious_collisions())
+        with open(output_file, 'rb') as results:
+            num_readings = len([line for line in results if not line.startswith('#')])
+        self.assertEqual(analyzer.num_readings, num_readings)
+        analyzer = analysis.StreamingAnalysis(threshold=0.1, stop_on_collision=True)
+        simulations_run = sensornetwork.multirun_simulation(40, self.mean_time_to_failure*3,
+            self.part_configs, num_processes=2, fname=output_file, seed=8, block_size=10,
+            analyzer=analyzer)
+        os.remove(output_file)
+        # 1-5 kohm sensors collide within the first block
+        self.assertEqual(simulations_run, 10)
+        self.assertTrue(analyzer.found_collisions())
+
+    def test_adaptive_run(self):
+        '''Verify an adaptive run stops once its results converge'''
+        import analysis
+        output_file = os.path.join(tempfile.gettempdir(), 'adaptive.csv')
+        for output_format in ['text', 'histogram']:
+            analyzer = analysis.StreamingAnalysis(convergence=analysis.Convergence(patience=2,
+                band_growth=0.01))
+            simulations_run = sensornetwork.run_simulation(100000, self.mean_time_to_failure*3,
+                self.part_configs, fname=output_file, seed=8, block_size=100, analyzer=analyzer,
+                output_format=output_format)
+            self.assertTrue(analyzer.converged())
+            self.assertTrue(simulations_run < 100000)
+            self.assertEqual(simulations_run, 100*analyzer.convergence.num_blocks)
+        os.remove(output_file)
+
+    def test_incremental_resistance(self):
+        '''Verify the network resistance matches the parallel resistance of the
+        intact parts as they fail'''
+        num_cycles = int(self.mean_time_to_failure * 3)
+        for cycle in range(1, num_cycles):
+            self.sensor_net.cycles = cycle
+            intact = [part.strand_resistance for part in self.sensor_net.parts]
+            self.assertAlmostEqual(self.sensor_net.resistance, resistor.ParallelResistance(intact),
+                delta=1e-9 * self.sensor_net.resistance)
+            for part in self.sensor_net.failures():
+                self.assertEqual(part.resistance, float('inf'))
+        if self.sensor_net.complete():
+            self.assertEqual(self.sensor_net.resistance, float('inf'))
+
+    def test_compact_parts(self):
+        '''Verify a network of Strands gives the same status log as one of Parts'''
+        for trial in range(20):
+            network = sensornetwork.SensorNetwork(self.part_configs, rng=random.Random(trial))
+            compact_network = sensornetwork.SensorNetwork(self.part_configs, rng=random.Random(trial),
+                compact=True)
+            network.run_events(3*self.mean_time_to_failure)
+            compact_network.run_events(3*self.mean_time_to_failure)
+            self.assertDictEqual(network.status_log, compact_network.status_log)
+
+    def test_run_events(self):
+        '''Verify the event-driven run gives the same status log as stepping
+        through every cycle'''
+        for start_time, num_cycles in [(0, 3*self.mean_time_to_failure), (0, 12.5), (4, 20)]:
+            for trial in range(20):
+                stepped_net = sensornetwork.SensorNetwork(self.part_configs, start_time)
+                event_net = copy.deepcopy(stepped_net)
+                cycle_num = start_time
+                while not stepped_net.complete() and cycle_num < num_cycles:
+                    stepped_net.cycles += 1
+                    cycle_num += 1
+                event_net.run_events(num_cycles)
+                self.assertDictEqual(stepped_net.status_log, event_net.status_log)
+                self.assertEqual(len(stepped_net.failures()), len(event_net.failures()))
+
+    def test_next_failure(self):
+        '''Verify the next failure cycle is the first whole cycle at or after the
+        shortest remaining lifetime'''
+        sensor_net = sensornetwork.SensorNetwork(self.part_configs)
+        next_cycle = sensor_net.next_failure()
+        self.assertTrue(next_cycle >= sensor_net.parts[0].lifetime)
+        self.assertTrue(next_cycle - 1 < max(sensor_net.parts[0].lifetime, 1))
+        sensor_net.cycles = self.mean_time_to_failure * 1001
+        self.assertIsNone(sensor_net.next_failure())
+
+    def test_seeded_simulate(self):
+        '''Verify a simulation drawing from a seeded stream is reproducible'''
+        first_run = sensornetwork.simulate(3*self.mean_time_to_failure, self.part_configs,
+            rng=random.Random(1234))
+        second_run = sensornetwork.simulate(3*self.mean_time_to_failure, self.part_configs,
+            rng=random.Random(1234))
+        self.assertDictEqual(first_run, second_run)
+
+    def test_seeded_single_multi_identical(self):
+        '''Verify seeded single and multi-process runs write identical results'''
+        for engine in sensornetwork.ENGINES:
+            if engine == 'batch':
+                try:
+                    import numpy
+                except ImportError:
+                    continue
+            single_file = os.path.join(tempfile.gettempdir(), 'seeded_single.csv')
+            multi_file = os.path.join(tempfile.gettempdir(), 'seeded_multi.csv')
+            sensornetwork.run_simulation(num_simulations=30, num_cycles=self.mean_time_to_failure*3,
+                part_configurations=self.part_configs, fname=single_file, engine=engine,
+                seed=42, block_size=7)
+            sensornetwork.multirun_simulation(num_simulations=30, num_cycles=self.mean_time_to_failure*3,
+                part_configurations=self.part_configs, num_processes=2, fname=multi_file,
+                engine=engine, seed=42, block_size=7)
+            with open(single_file, 'rb') as single_results:
+                single_output = single_results.read()
+            with open(multi_file, 'rb') as multi_results:
+                multi_output = multi_results.read()
+            os.remove(single_file)
+            os.remove(multi_file)
+            self.assertEqual(single_output, multi_output)
+
+    def test_replay_simulation(self):
+        '''Verify a single simulation of a seeded run can be replayed'''
+        for engine in ['cycle', 'event']:
+            simulation_runs = list(sensornetwork.gen_runs(10, 3*self.mean_time_to_failure,
+                self.part_configs, engine=engine, seed=7))
+            replayed = sensornetwork.replay_simulation(6, 3*self.mean_time_to_failure,
+                self.part_configs, seed=7, engine=engine)
+            self.assertDictEqual(simulation_runs[6], replayed)
+
+    def interrupted_run(self, fname, num_simulations, block_size, num_blocks, output_format='text'):
+        '''Starts a seeded run, interrupting it after num_blocks blocks and a partial block'''
+        from components import checkpoints
+        run = checkpoints.describe_run(num_simulations, self.mean_time_to_failure*3,
+            self.part_configs, 0, 42, 'cycle', block_size, output_format)
+        fidout, completed, run_histogram = sensornetwork.open_output(fname, run)
+        tasks = list(sensornetwork.gen_tasks(num_simulations, self.mean_time_to_failure*3,
+            self.part_configs, 0, 'cycle', 42, block_size, output_format))
+        def gen_outputs():
+            for task in tasks[:num_blocks]:
+                yield sensornetwork.simulate_block(task)
+            if output_format != 'histogram':
+                fidout.write(sensornetwork.simulate_block(tasks[num_blocks])[:50])
+            raise KeyboardInterrupt
+        with fidout:
+            self.assertRaises(KeyboardInterrupt, sensornetwork.write_blocks, fidout, gen_outputs(),
+                run, completed, run_histogram, checkpoint_interval=checkpoints.INTERVAL)
+        self.assertEqual(checkpoints.read_checkpoint(checkpoints.checkpoint_fname(fname))[
+            'completed_simulations'], num_blocks*block_size)
+
+    def test_resume(self):
+        '''Verify an interrupted run resumed from its checkpoint, in single or multi-process
+        mode, writes the same results as an uninterrupted run'''
+        from components import checkpoints
+        expected_file = os.path.join(tempfile.gettempdir(), 'uninterrupted.csv')
+        output_file = os.path.join(tempfile.gettempdir(), 'resumed.csv')
+        for output_format in ['text', 'histogram']:
+            sensornetwork.run_simulation(30, self.mean_time_to_failure*3, self.part_configs,
+                fname=expected_file, seed=42, block_size=7, output_format=output_format)
+            with open(expected_file, 'rb') as results:
+                expected = results.read()
+            for multirun in [False, True]:
+                self.interrupted_run(output_file, 30, 7, 2, output_format)
+                if multirun:
+                    simulations_run = sensornetwork.multirun_simulation(30, self.mean_time_to_failure*3,
+                        self.part_configs, num_processes=2, fname=output_file, block_size=7,
+                        output_format=output_format, checkpoint_interval=0, resume=True)
+                else:
+                    simulations_run = sensornetwork.run_simulation(30, self.mean_time_to_failure*3,
+                        self.part_configs, fname=output_file, block_size=7,
+                        output_format=output_format, checkpoint_interval=0, resume=True)
+                self.assertEqual(simulations_run, 30)
+                with open(output_file, 'rb') as results:
+                    self.assertEqual(results.read(), expected)
+                # The checkpoint is removed once the run completes
+                self.assertFalse(os.path.exists(checkpoints.checkpoint_fname(output_file)))
+        os.remove(expected_file)
+        os.remove(output_file)
+
+    def test_resume_interrupted_block(self):
+        '''Verify a run interrupted part way through writing or merging a block resumes
+        from the last whole block'''
+        from components import checkpoints
+        from components import histogram
+        expected_file = os.path.join(tempfile.gettempdir(), 'uninterrupted.csv')
+        output_file = os.path.join(tempfile.gettempdir(), 'resumed.csv')
+        class InterruptedBins(dict):
+            '''Bins interrupted after merging half of them'''
+            def items(self):
+                bins = list(dict.items(self))
+                for idx, item in enumerate(bins):
+                    if idx == len(bins) // 2:
+                        raise KeyboardInterrupt
+                    yield item
+        class InterruptedFile(object):
+            '''Results file interrupted after writing half of its third block'''
+            def __init__(self, fidout):
+                self.fidout = fidout
+                self.num_writes = 0
+            def __getattr__(self, name):
+                return getattr(self.fidout, name)
+            def write(self, data):
+                self.num_writes += 1
+                if self.num_writes == 3:
+                    self.fidout.write(data[:len(data) // 2])
+                    raise KeyboardInterrupt
+                self.fidout.write(data)
+        for output_format in ['text', 'histogram']:
+            sensornetwork.run_simulation(30, self.mean_time_to_failure*3, self.part_configs,
+                fname=expected_file, seed=42, block_size=7, output_format=output_format)
+            with open(expected_file, 'rb') as results:
+                expected = results.read()
+            run = checkpoints.describe_run(30, self.mean_time_to_failure*3, self.part_configs, 0, 42,
+                'cycle', 7, output_format)
+            results_file, completed, run_histogram = sensornetwork.open_output(output_file, run)
+            fidout = results_file
+            block_outputs = [sensornetwork.simulate_block(task) for task in sensornetwork.gen_tasks(30,
+                self.mean_time_to_failure*3, self.part_configs, 0, 'cycle', 42, 7, output_format)]
+            if output_format == 'histogram':
+                interrupted = histogram.Histogram()
+                interrupted.bins = InterruptedBins(block_outputs[2].bins)
+                block_outputs[2] = interrupted
+                checkpoint_interval = 0
+            else:
+                fidout = InterruptedFile(fidout)
+                checkpoint_interval = checkpoints.INTERVAL
+            with results_file:
+                self.assertRaises(KeyboardInterrupt, sensornetwork.write_blocks, fidout, block_outputs,
+                    run, completed, run_histogram, checkpoint_interval=checkpoint_interval)
+            self.assertEqual(checkpoints.read_checkpoint(checkpoints.checkpoint_fname(output_file))[
+                'completed_simulations'], 14)
+            sensornetwork.run_simulation(30, self.mean_time_to_failure*3, self.part_configs,
+                fname=output_file, block_size=7, output_format=output_format, resume=True)
+            with open(output_file, 'rb') as results:
+                self.assertEqual(results.read(), expected)
+        os.remove(expected_file)
+        os.remove(output_file)
+
+    def test_resume_analysis(self):
+        '''Verify the results written before a checkpoint are analyzed on resuming'''
+        import analysis
+        output_file = os.path.join(tempfile.gettempdir(), 'resumed.csv')
+        self.interrupted_run(output_file, 30, 7, 3)
+        analyzer = analysis.StreamingAnalysis(threshold=0.1)
+        sensornetwork.run_simulation(30, self.mean_time_to_failure*3, self.part_configs,
+            fname=output_file, block_size=7, analyzer=analyzer, resume=True)
+        offline = analysis.Analysis(output_file, threshold=0.1)
+        self.assertDictEqual(analyzer.obvious_collisions, offline.check_obvious_collisions())
+        os.remove(output_file)
+
+    def test_resume_different_run(self):
+        '''Verify a run can't resume from the checkpoint of a run with other settings'''
+        output_file = os.path.join(tempfile.gettempdir(), 'resumed.csv')
+        self.interrupted_run(output_file, 30, 7, 2)
+        self.assertRaises(ValueError, sensornetwork.run_simulation, 40, self.mean_time_to_failure*3,
+            self.part_configs, fname=output_file, block_size=7, resume=True)
+        os.remove(output_file)
+        os.remove(output_file + '.checkpoint')
+
+    def test_shared_results(self):
+        '''Verify binary blocks passed back through the shared result slots give the
+        same results and analysis as a single process run, as the slots are reused'''
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy not installed")
+        import analysis
+        single_file = os.path.join(tempfile.gettempdir(), 'shared_single.bin')
+        multi_file = os.path.join(tempfile.gettempdir(), 'shared_multi.bin')
+        for engine in ['cycle', 'batch']:
+            single_analyzer = analysis.StreamingAnalysis(threshold=0.1)
+            multi_analyzer = analysis.StreamingAnalysis(threshold=0.1)
+            sensornetwork.run_simulation(60, self.mean_time_to_failure*3, self.part_configs,
+                fname=single_file, engine=engine, seed=8, block_size=4, output_format='binary',
+                analyzer=single_analyzer)
+            sensornetwork.multirun_simulation(60, self.mean_time_to_failure*3, self.part_configs,
+                num_processes=2, fname=multi_file, engine=engine, seed=8, block_size=4,
+                output_format='binary', analyzer=multi_analyzer)
+            with open(single_file, 'rb') as single_results:
+                single_output = single_results.read()
+            with open(multi_file, 'rb') as multi_results:
+                multi_output = multi_results.read()
+            self.assertEqual(single_output, multi_output)
+            self.assertEqual(single_analyzer.counts, multi_analyzer.counts)
+        os.remove(single_file)
+        os.remove(multi_file)
+
+    def test_shared_result_overflow(self):
+        '''Verify a block's output is sent back directly if it doesn't fit its slot'''
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy not installed")
+        from multiprocessing import sharedctypes
+        import ctypes
+        task = list(sensornetwork.gen_tasks(5, self.mean_time_to_failure*3, self.part_configs, seed=3,
+            output_format='binary'))[0]
+        expected = sensornetwork.simulate_block(task)
+        result_slots = [sharedctypes.RawArray(ctypes.c_char, 8),
+            sharedctypes.RawArray(ctypes.c_char, sensornetwork.result_slot_size(5, self.part_configs))]
+        sensornetwork.attach_result_slots(result_slots)
+        try:
+            self.assertEqual(sensornetwork.simulate_shared((0, task, False)), (None, expected, None))
+            slot, size, profile = sensornetwork.simulate_shared((1, task, False))
+            self.assertEqual((slot, size), (1, len(expected)))
+            self.assertEqual(result_slots[1].raw[:size], expected)
+        finally:
+            sensornetwork.attach_result_slots(None)
+
+    @unittest.skipIf(not hasattr(os, 'killpg'), "Needs POSIX process groups")
+    def test_interrupt_multirun(self):
+        '''Verify Ctrl-C stops a multi-process run and saves its checkpoint'''
+        import signal
+        import subprocess
+        import sys
+        import time
+        from components import checkpoints
+        output_file = os.path.join(tempfile.gettempdir(), 'interrupted.csv')
+        script = ("from components import sensornetwork\n"
+            "sensornetwork.multirun_simulation(10**7, 45, {0!r}, num_processes=2, fname={1!r}, "
+            "seed=3, checkpoint_interval=0)\n".format(self.part_configs, output_file))
+        # Ctrl-C signals the whole process group, workers included
+        process = subprocess.Popen([sys.executable, '-c', script], preexec_fn=os.setsid,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            deadline = time.time() + 30
+            while not os.path.exists(checkpoints.checkpoint_fname(output_file)) and time.time() < deadline:
+                time.sleep(0.1)
+            os.killpg(process.pid, signal.SIGINT)
+            deadline = time.time() + 15
+            while process.poll() is None and time.time() < deadline:
+                time.sleep(0.1)
+            self.assertIsNotNone(process.poll(), "Interrupted run didn't stop")
+            self.assertIn('KeyboardInterrupt', process.communicate()[1])
+            checkpoint = checkpoints.read_checkpoint(checkpoints.checkpoint_fname(output_file))
+            self.assertTrue(checkpoint['completed_simulations'] > 0)
+        finally:
+            if process.poll() is None:
+                os.killpg(process.pid, signal.SIGKILL)
+            for fname in [output_file, checkpoints.checkpoint_fname(output_file)]:
+                if os.path.exists(fname):
+                    os.remove(fname)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+'''test_shards.py - tests splitting runs into shards and merging them'''
+
+import os
+import os.path
+import tempfile
+import unittest
+import analysis
+from components import sensornetwork
+from components import shards
+
+class TestShards(unittest.TestCase):
+    '''Unit tests for shards'''
+    def setUp(self):
+        self.mean_time_to_failure = 15.
+        self.part_configs = [{'mttf':self.mean_time_to_failure, 'resistance':resistance}
+            for resistance in [1e3, 2e3, 3e3]]
+        self.num_simulations = 47
+        self.block_size = 10
+        self.seed = 21
+        self.fnames = []
+
+    def tearDown(self):
+        for fname in self.fnames:
+            for name in (fname, shards.index_fname(fname)):
+                if os.path.exists(name):
+                    os.remove(name)
+
+    def temp_fname(self, name):
+        '''Returns a file name in the temp folder, removed after the test'''
+        fname = os.path.join(tempfile.gettempdir(), name)
+        self.fnames.append(fname)
+        return fname
+
+    def run_shard(self, shard, num_shards):
+        '''Runs a shard and saves its index, returning its file name'''
+        fname = self.temp_fname('shard{0}.csv'.format(shard))
+        description = shards.describe_shard(shard, num_shards, self.num_simulations,
+            self.mean_time_to_failure*3, self.part_configs, self.seed, block_size=self.block_size)
+        analyzer = analysis.StreamingAnalysis()
+        sensornetwork.run_simulation(description['num_simulations'], self.mean_time_to_failure*3,
+            self.part_configs, fname=fname, seed=self.seed, block_size=self.block_size,
+            analyzer=analyzer, first_simulation=description['first_simulation'], shard=description)
+        analyzer.save_index(shards.index_fname(fname), description)
+        return fname
+
+    def test_parse_shard(self):
+        '''Verify shards are given as i/k'''
+        self.assertEqual(shards.parse_shard('2/5'), (2, 5))
+        for shard_str in ['5/5', '1', 'a/b', '-1/3']:
+            with self.assertRaises(ValueError):
+                shards.parse_shard(shard_str)
+
+    def test_shard_range(self):
+        '''Verify the shards cover every simulation once in whole blocks'''
+        for num_shards in range(1, 8):
+            simulations = []
+            for shard in range(num_shards):
+                first_simulation, num_simulations = shards.shard_range(self.num_simulations, shard,
+                    num_shards, self.block_size)
+                self.assertEqual(first_simulation % self.block_size, 0)
+                simulations.extend(range(first_simulation, first_simulation + num_simulations))
+            self.assertEqual(simulations, list(range(self.num_simulations)))
+
+    def test_merge(self):
+        '''Verify merged shards are identical to a single run with the same seed'''
+        shard_fnames = [self.run_shard(shard, 3) for shard in range(3)]
+        description = shards.read_description(shard_fnames[1])
+        self.assertEqual(description['shard'], 1)
+        merged = self.temp_fname('merged.csv')
+        shards.merge_results(list(reversed(shard_fnames)), merged)
+        single = self.temp_fname('single.csv')
+        analyzer = analysis.StreamingAnalysis()
+        sensornetwork.run_simulation(self.num_simulations, self.mean_time_to_failure*3,
+            self.part_configs, fname=single, seed=self.seed, block_size=self.block_size,
+            analyzer=analyzer)
+        with open(merged, 'rb') as merged_file:
+            with open(single, 'rb') as single_file:
+                self.assertEqual(merged_file.read(), single_file.read())
+        merged_analyzer = analysis.merge_indexes([shards.index_fname(fname) for fname in shard_fnames])
+        self.assertEqual(merged_analyzer.num_readings, analyzer.num_readings)
+        self.assertEqual(merged_analyzer.pairs, analyzer.pairs)
+        self.assertEqual(merged_analyzer.counts, analyzer.counts)
+        self.assertEqual(set(merged_analyzer.obvious_collisions), set(analyzer.obvious_collisions))
+
+    def test_missing_shard(self):
+        '''Verify shards can only be merged if every shard of one run is present'''
+        shard_fnames = [self.run_shard(shard, 3) for shard in range(3)]
+        with self.assertRaises(ValueError):
+            shards.merge_results(shard_fnames[:2], self.temp_fname('merged.csv'))
+        with self.assertRaises(ValueError):
+            analysis.merge_indexes([shards.index_fname(fname) for fname in shard_fnames[1:]])
+        with self.assertRaises(IOError):
+            shards.read_description(shards.index_fname(shard_fnames[0]))
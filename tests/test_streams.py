@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+
+
+'''test_streams.py - tests the random number streams'''
+
+import unittest
+from components import streams
+
+class TestStreams(unittest.TestCase):
+    '''Unit tests for streams'''
+    def test_derive_seed(self):
+        '''Verify derived seeds are repeatable and differ between paths'''
+        self.assertEqual(streams.derive_seed(1, 'simulation', 5), streams.derive_seed(1, 'simulation', 5))
+        self.assertNotEqual(streams.derive_seed(1, 'simulation', 5), streams.derive_seed(1, 'simulation', 6))
+        self.assertNotEqual(streams.derive_seed(1, 'simulation', 5), streams.derive_seed(2, 'simulation', 5))
+
+    def test_simulation_random(self):
+        '''Verify each simulation's stream is repeatable'''
+        first_stream = streams.simulation_random(99, 3)
+        second_stream = streams.simulation_random(99, 3)
+        self.assertEqual([first_stream.random() for i in range(5)],
+            [second_stream.random() for i in range(5)])
+
+    def test_new_seed(self):
+        '''Verify new master seeds are drawn at random'''
+        self.assertNotEqual(streams.new_seed(), streams.new_seed())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+
+'''test_sweep.py - tests the parameter sweep runner'''
+
+import unittest
+import json
+import multiprocessing
+import os
+import os.path
+import tempfile
+import analysis
+import sweep
+from components import sensornetwork
+
+class TestSweep(unittest.TestCase):
+    '''Unit tests for sweep'''
+    def setUp(self):
+        self.config = {'designs':[{'name':'wide', 'resistances':[1e3, 4e3, 16e3], 'mttf':15.}],
+            'grid':{'resistances':[[1e3, 2e3], [1e3, 3e3]], 'mttf':[15., 30.], 'shape':[3.]}}
+        self.config_file = os.path.join(tempfile.gettempdir(), 'sweep.json')
+        with open(self.config_file, 'w') as fidout:
+            json.dump(self.config, fidout)
+
+    def tearDown(self):
+        os.remove(self.config_file)
+
+    def test_expand_grid(self):
+        '''Verify the grid gives a design for every combination of values'''
+        designs = sweep.expand_grid(self.config['grid'])
+        self.assertEqual(len(designs), 4)
+        self.assertTrue({'resistances':[1e3, 3e3], 'mttf':30., 'shape':3.} in designs)
+
+    def test_build_design(self):
+        '''Verify designs are given part configurations, a name and a horizon'''
+        design = sweep.build_design({'resistances':[1e3, 2e3], 'mttf':10., 'gauge':30})
+        self.assertEqual(design['part_configurations'],
+            [{'resistance':1e3, 'mttf':10., 'gauge':30}, {'resistance':2e3, 'mttf':10., 'gauge':30}])
+        self.assertEqual(design['name'], '1000/2000 mttf=10 gauge=30')
+        self.assertEqual(design['num_cycles'], 30.)
+        self.assertRaises(ValueError, sweep.build_design, {'resistances':[1e3]})
+
+    def test_read_config(self):
+        '''Verify the listed designs come first, followed by the grid'''
+        designs = sweep.read_config(self.config_file)
+        self.assertEqual(len(designs), 5)
+        self.assertEqual(designs[0]['name'], 'wide')
+
+    def test_run_sweep(self):
+        '''Verify each design's summary matches analyzing a run of the design alone
+        with its seed, in single or multi-process mode'''
+        designs = sweep.read_config(self.config_file)[:3]
+        summaries = sweep.run_sweep(designs, 20, seed=4, num_processes=1, block_size=8)
+        self.assertEqual(sweep.run_sweep(designs, 20, seed=4, num_processes=2, block_size=8), summaries)
+        output_file = os.path.join(tempfile.gettempdir(), 'sweep_design.csv')
+        for design, summary in zip(designs, summaries):
+            analyzer = analysis.StreamingAnalysis()
+            sensornetwork.run_simulation(20, design['num_cycles'], design['part_configurations'],
+                fname=output_file, seed=summary['seed'], block_size=8, analyzer=analyzer)
+            self.assertEqual(summary, sweep.summarize(design, analyzer, 20, summary['seed']))
+        os.remove(output_file)
+        sweep.write_summary(summaries, output_file)
+        with open(output_file, 'rb') as summary_file:
+            self.assertEqual(len(summary_file.readlines()), 4)
+        os.remove(output_file)
+        self.assertEqual(len(sweep.format_summary(summaries)), 4)
+
+    def test_run_sweep_error(self):
+        '''Verify a design that fails in the workers raises and stops the pool'''
+        designs = sweep.read_config(self.config_file)[:1] + [{'name':'broken', 'num_cycles':30.,
+            'part_configurations':[{'resistance':1e3}, {'resistance':2e3}]}]
+        self.assertRaises(TypeError, sweep.run_sweep, designs, 20, seed=4, num_processes=2,
+            block_size=8)
+        self.assertEqual(multiprocessing.active_children(), [])